@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Approximate Nearest Neighbour Index for VitalAid
+Inverted-file (IVF) cosine similarity search over embedding matrices in NumPy
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_NPROBE = 8
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """float32 copy of ``vectors`` scaled to unit length (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def spherical_kmeans(vectors: np.ndarray, num_lists: int, iterations: int = 10,
+                     seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit-length centroids and the centroid of each (unit-length) vector"""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), num_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=num_lists)
+        # Re-seed empty lists with random vectors so every list stays in use
+        empty = counts == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+
+    return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+class IVFIndex:
+    def __init__(self, embeddings: np.ndarray, centroids: np.ndarray, list_ids: np.ndarray,
+                 list_offsets: np.ndarray):
+        """Cosine-similarity IVF index
+
+        ``list_ids`` holds row numbers of ``embeddings`` grouped by
+        centroid; list ``i`` is ``list_ids[list_offsets[i]:list_offsets[i + 1]]``.
+        Embeddings may be stored as float16; they are searched as float32
+        because NumPy has no fast float16 matrix product.
+        """
+        self.embeddings = embeddings
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.list_ids = np.asarray(list_ids, dtype=np.int64)
+        self.list_offsets = np.asarray(list_offsets, dtype=np.int64)
+        # Vectors in list order, so every probed list is one contiguous slice
+        self.vectors = normalize_rows(embeddings)[self.list_ids]
+
+    def __len__(self) -> int:
+        return len(self.list_ids)
+
+    @classmethod
+    def build(cls, embeddings: np.ndarray, num_lists: Optional[int] = None, iterations: int = 10,
+              seed: int = 42) -> 'IVFIndex':
+        """Cluster the embeddings into ``num_lists`` lists (default: about sqrt(n))"""
+        vectors = normalize_rows(embeddings)
+        num_lists = min(num_lists or max(1, int(np.sqrt(len(vectors)))), len(vectors))
+        centroids, assignments = spherical_kmeans(vectors, num_lists, iterations, seed)
+
+        list_ids = np.argsort(assignments, kind='stable')
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=num_lists))])
+        return cls(embeddings, centroids, list_ids, list_offsets)
+
+    def search(self, query: np.ndarray, k: int = 1, nprobe: int = DEFAULT_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """Row numbers and cosine similarities of the ``k`` best matches among the ``nprobe`` closest lists"""
+        query = normalize_rows(query)
+        nprobe = min(nprobe, len(self.centroids))
+        centroid_scores = self.centroids @ query
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe] if nprobe < len(self.centroids) \
+            else np.arange(len(self.centroids))
+
+        # Score each probed list as one contiguous slice, no gather needed
+        offsets = self.list_offsets
+        ranges = [(offsets[probe], offsets[probe + 1]) for probe in probes]
+        scores = np.concatenate([self.vectors[start:end] @ query for start, end in ranges])
+        positions = np.concatenate([self.list_ids[start:end] for start, end in ranges])
+
+        k = min(k, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        best = best[np.argsort(-scores[best])]
+        return positions[best], scores[best]
+
+    def search_exact(self, query: np.ndarray, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Brute-force search, for measuring recall"""
+        scores = self.vectors @ normalize_rows(query)
+        best = np.argsort(-scores)[:k]
+        return self.list_ids[best], scores[best]
+
+    def save(self, path: str, **extra: np.ndarray):
+        """Write the index (and any extra arrays) to one .npz file"""
+        np.savez(path, embeddings=self.embeddings, centroids=self.centroids, list_ids=self.list_ids,
+                 list_offsets=self.list_offsets, **extra)
+
+    @classmethod
+    def load(cls, path: str) -> Tuple['IVFIndex', Dict[str, np.ndarray]]:
+        """The index and the extra arrays saved with it"""
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        index = cls(arrays.pop('embeddings'), arrays.pop('centroids'), arrays.pop('list_ids'),
+                    arrays.pop('list_offsets'))
+        return index, arrays
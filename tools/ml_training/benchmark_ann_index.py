@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+ANN Index Benchmark for VitalAid
+Measures IVF search latency and recall against brute force at tens of thousands of response embeddings
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from ann_index import DEFAULT_NPROBE, IVFIndex
+from benchmark_utils import latency_stats
+
+def scaled_embeddings(base, size, noise, rng):
+    """``size`` float16 rows made of noisy copies of the base embeddings (clustered like real data)"""
+    rows = base[rng.integers(0, len(base), size)].astype(np.float32)
+    scale = noise * np.abs(rows).mean()
+    return (rows + rng.normal(0, scale, rows.shape)).astype(np.float16)
+
+def benchmark_size(base, size, args, rng):
+    embeddings = scaled_embeddings(base, size, args.noise, rng)
+    start = time.perf_counter()
+    index = IVFIndex.build(embeddings)
+    build_seconds = time.perf_counter() - start
+
+    queries = scaled_embeddings(base, args.queries, args.noise, rng)
+    ivf_times = []
+    exact_times = []
+    hits = 0
+    for query in queries:
+        start = time.perf_counter()
+        ids, _ = index.search(query, 1, args.nprobe)
+        ivf_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        exact_ids, _ = index.search_exact(query, 1)
+        exact_times.append(time.perf_counter() - start)
+        hits += int(ids[0] == exact_ids[0])
+
+    return {
+        'entries': size,
+        'lists': len(index.centroids),
+        'nprobe': args.nprobe,
+        'build_seconds': round(build_seconds, 3),
+        'recall_at_1': round(hits / len(queries), 4),
+        'ivf': latency_stats(ivf_times),
+        'brute_force': latency_stats(exact_times)
+    }
+
+def main():
+    """Run the ANN index benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark IVF search over response embeddings")
+    parser.add_argument('--index', help="Response index .npz from response_retrieval.py whose embeddings "
+                                        "seed the synthetic data (random 64-d vectors if omitted)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000], help="Entries to index")
+    parser.add_argument('--queries', type=int, default=1000, help="Timed queries per size")
+    parser.add_argument('--nprobe', type=int, default=DEFAULT_NPROBE, help="IVF lists searched per query")
+    parser.add_argument('--noise', type=float, default=0.3, help="Relative noise added to the seed embeddings")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Also write the results JSON to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.index:
+        base, _ = IVFIndex.load(args.index)
+        base = base.embeddings
+    else:
+        base = rng.normal(size=(500, 64)).astype(np.float16)
+
+    results = {
+        'seed_embeddings': len(base),
+        'dimensions': int(base.shape[1]),
+        'runs': [benchmark_size(base, size, args, rng) for size in args.sizes]
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
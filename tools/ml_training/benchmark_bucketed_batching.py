@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bucketed Batching Benchmark for VitalAid
+Compares epoch times and accuracy of the classifier trained on padded vs length-bucketed batches
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from bucketed_batching import DEFAULT_NUM_BUCKETS, bucket_boundaries, padded_timesteps, sequence_lengths
+from fast_training import EpochTimer, add_fast_training_arguments, configure_training
+from train_classification_model import (BATCH_SIZE, MAX_SEQUENCE_LENGTH, create_classification_model, fit_model,
+                                        load_medical_data, preprocess_texts, split_data)
+
+def benchmark_mode(bucketed, data, num_classes, training_config, args):
+    """Train from scratch for ``args.epochs`` epochs and time each one"""
+    X_train, X_val, y_train, y_val = data
+    epoch_timer = EpochTimer()
+    model = create_classification_model(num_classes, training_config,
+                                        {'max_sequence_length': args.max_sequence_length}, bucketed)
+    history = fit_model(model, X_train, y_train, X_val, y_val, epoch_timer, batch_size=args.batch_size,
+                        epochs=args.epochs, bucketed=bucketed, num_buckets=args.num_buckets)
+    return {
+        **epoch_timer.summary(),
+        'final_val_accuracy': round(float(history.history['val_accuracy'][-1]), 4)
+    }
+
+def main():
+    """Run the bucketed batching benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark padded vs length-bucketed training epochs")
+    parser.add_argument('--epochs', type=int, default=5, help="Epochs per mode (the first includes tracing)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--max-sequence-length', type=int, default=MAX_SEQUENCE_LENGTH,
+                        help="Padded length of the baseline")
+    parser.add_argument('--num-buckets', type=int, default=DEFAULT_NUM_BUCKETS)
+    parser.add_argument('--output', help="Also write the results JSON to this file")
+    add_fast_training_arguments(parser)
+    args = parser.parse_args()
+
+    training_config = configure_training(args.fast, args.mixed_precision)
+
+    texts, labels = load_medical_data()
+    label_to_idx = {label: idx for idx, label in enumerate(sorted(set(labels)))}
+    X, _ = preprocess_texts(texts, max_sequence_length=args.max_sequence_length)
+    y = np.array([label_to_idx[label] for label in labels], dtype=np.int32)
+    data = split_data(X, y)
+
+    # Timesteps the LSTM runs per training sample in each mode
+    lengths = sequence_lengths(data[0])
+    boundaries = bucket_boundaries(lengths, args.num_buckets, args.max_sequence_length)
+
+    runs = {mode: benchmark_mode(mode == 'bucketed', data, len(label_to_idx), training_config, args)
+            for mode in ('padded', 'bucketed')}
+
+    padded_seconds = runs['padded']['mean_epoch_seconds']
+    bucketed_seconds = runs['bucketed']['mean_epoch_seconds']
+    results = {
+        'samples': len(X),
+        'epochs': args.epochs,
+        'batch_size': args.batch_size,
+        'training_configuration': training_config.describe(),
+        'bucket_boundaries': boundaries,
+        'mean_timesteps': {
+            'padded': args.max_sequence_length,
+            'bucketed': round(float(padded_timesteps(lengths, boundaries).mean()), 2),
+            'tokens': round(float(lengths.mean()), 2)
+        },
+        'runs': runs,
+        'epoch_speedup': round(padded_seconds / bucketed_seconds, 2) if bucketed_seconds else None
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
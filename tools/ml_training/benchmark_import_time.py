@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+CLI Import-Time Benchmark for VitalAid
+Measures each training CLI subcommand's cold start with `python -X importtime`, optionally against an older revision
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (label, argv) pairs; --help parses the arguments and exits, so the time
+# is the module-level import cost every invocation of that subcommand pays
+COMMANDS = [
+    ('prepare_data', ['prepare_data.py', '--help']),
+    ('generate_training_data', ['generate_training_data.py', '--help']),
+    ('train_medical_chatbot_model train', ['train_medical_chatbot_model.py', 'train', '--help']),
+    ('train_medical_chatbot_model convert', ['train_medical_chatbot_model.py', 'convert', '--help']),
+    ('train_medical_chatbot_model plot', ['train_medical_chatbot_model.py', 'plot', '--help']),
+    ('train_classification_model', ['train_classification_model.py', '--help']),
+    ('train_model', ['train_model.py', '--help'])
+]
+
+def parse_importtime(stderr: str) -> Dict:
+    """Total import time and the slowest top-level imports from -X importtime output"""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that triggered them
+        if not name.startswith('  '):
+            top_level.append((name.strip(), int(cumulative)))
+    top_level.sort(key=lambda item: -item[1])
+    return {
+        'import_ms': round(sum(us for _, us in top_level) / 1000, 1),
+        'slowest': [{'module': name, 'ms': round(us / 1000, 1)} for name, us in top_level[:5]]
+    }
+
+def measure(tools_dir: str, argv: List[str], runs: int) -> Dict:
+    """Best-of-``runs`` wall time and the import breakdown of the fastest run"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime'] + argv, cwd=tools_dir,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall_ms = (time.perf_counter() - start) * 1000
+        if best is None or wall_ms < best['wall_ms']:
+            best = {'wall_ms': round(wall_ms, 1), 'exit_code': result.returncode,
+                    **parse_importtime(result.stderr)}
+    return best
+
+def checkout_revision(revision: str, destination: str) -> str:
+    """Extract this directory as of a git revision; returns the extracted directory"""
+    toplevel = subprocess.run(['git', 'rev-parse', '--show-toplevel'], cwd=TOOLS_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    prefix = os.path.relpath(TOOLS_DIR, toplevel).replace(os.sep, '/')
+    archive = os.path.join(destination, 'tools.tar')
+    subprocess.run(['git', 'archive', '--format=tar', '-o', archive, f"{revision}:{prefix}"],
+                   cwd=toplevel, check=True)
+    extracted = os.path.join(destination, 'tools')
+    with tarfile.open(archive) as tar:
+        tar.extractall(extracted)
+    # Scripts read their data relative to the tools directory
+    data_dir = os.path.join(TOOLS_DIR, 'data')
+    if os.path.isdir(data_dir) and not os.path.exists(os.path.join(extracted, 'data')):
+        os.symlink(data_dir, os.path.join(extracted, 'data'))
+    return extracted
+
+def run_benchmark(tools_dir: str, runs: int) -> Dict[str, Dict]:
+    return {label: measure(tools_dir, argv, runs) for label, argv in COMMANDS}
+
+def print_table(after: Dict[str, Dict], before: Optional[Dict[str, Dict]]):
+    """Wall times per command; '!' marks runs that exited with an error (e.g. a missing dependency)"""
+    def cell(result, width):
+        return f"{result['wall_ms']:.1f}{'!' if result['exit_code'] else ' '}".rjust(width)
+
+    if before:
+        print(f"\n{'Command':<38} {'Before (ms)':>12} {'After (ms)':>11} {'Speedup':>8}")
+        for label, result in after.items():
+            previous = before[label]
+            speedup = previous['wall_ms'] / result['wall_ms'] if result['wall_ms'] else 0
+            print(f"{label:<38} {cell(previous, 12)} {cell(result, 11)} {speedup:>7.1f}x")
+    else:
+        print(f"\n{'Command':<38} {'Wall (ms)':>10} {'Imports (ms)':>13}")
+        for label, result in after.items():
+            print(f"{label:<38} {cell(result, 10)} {result['import_ms']:>13.1f}")
+
+def main():
+    """Run the import-time benchmark"""
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the training CLIs")
+    parser.add_argument('--before', metavar='REVISION',
+                        help="Also measure the CLIs as of this git revision (e.g. the commit before lazy imports)")
+    parser.add_argument('--runs', type=int, default=3, help="Runs per command; the fastest is reported")
+    parser.add_argument('--output', help="Also write the results JSON to this file")
+    args = parser.parse_args()
+
+    results = {'python': sys.version.split()[0], 'after': run_benchmark(TOOLS_DIR, args.runs)}
+    if args.before:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            results['before_revision'] = args.before
+            results['before'] = run_benchmark(checkout_revision(args.before, temp_dir), args.runs)
+
+    print_table(results['after'], results.get('before'))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
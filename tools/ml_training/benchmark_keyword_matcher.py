@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher Benchmark for VitalAid
+Compares the Aho-Corasick keyword automaton with checking every keyword with `in`
+"""
+
+import argparse
+import json
+import time
+
+from benchmark_utils import latency_stats, load_queries
+from keyword_automaton import KeywordMatcher, collect_category_keywords
+from text_normalization import normalize_text
+
+def naive_score(category_keywords, text):
+    """Number of distinct keywords of each category found in the text, one `in` test per keyword"""
+    text = normalize_text(text)
+    scores = {}
+    for name, keywords in category_keywords.items():
+        count = sum(1 for keyword in keywords if keyword in text)
+        if count:
+            scores[name] = count
+    return scores
+
+def time_queries(score, queries, runs):
+    times = []
+    for call in range(runs):
+        query = queries[call % len(queries)]
+        start = time.perf_counter()
+        score(query)
+        times.append(time.perf_counter() - start)
+    return latency_stats(times)
+
+def main():
+    """Run the keyword matcher benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark keyword scoring: Aho-Corasick vs naive loop")
+    parser.add_argument('--queries', default='data/medical_training_data.json',
+                        help="JSON file with query texts (dataset, conversations or list of strings)")
+    parser.add_argument('--runs', type=int, default=20000, help="Timed queries per method")
+    parser.add_argument('--output', help="Also write the results JSON to this file")
+    args = parser.parse_args()
+
+    category_keywords = collect_category_keywords()
+    queries = load_queries(args.queries)
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher.from_keywords(category_keywords)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    mismatches = sum(1 for query in queries if matcher.score(query) != naive_score(category_keywords, query))
+
+    results = {
+        'categories': len(category_keywords),
+        'keywords': len(matcher.keywords),
+        'automaton_build_ms': round(build_ms, 2),
+        'queries': len(queries),
+        'score_mismatches': mismatches,
+        'aho_corasick': time_queries(matcher.score, queries, args.runs),
+        'naive_loop': time_queries(lambda query: naive_score(category_keywords, query), queries, args.runs)
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
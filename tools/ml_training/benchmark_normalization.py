@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Text Normalization Microbenchmark for VitalAid
+Compares the shared normalization against the per-pipeline code it replaced
+"""
+
+import argparse
+import json
+import re
+import time
+
+from text_normalization import normalize_text, normalize_texts
+
+def legacy_prepare_data(text):
+    """build_vocabulary cleaning: re.sub with an uncompiled pattern per call"""
+    return ' '.join(re.sub(r'[^\w\s]', '', text.lower()).split())
+
+def legacy_generator(text):
+    """generate_training_data._normalize_text"""
+    text = ' '.join(text.split())
+    text = text.lower()
+    return text.strip('.,!?')
+
+def load_corpus():
+    """Collect raw texts (with punctuation) from the prepared data"""
+    with open('data/conversations.json', 'r', encoding='utf-8') as f:
+        conversations = json.load(f)
+    with open('data/medical_training_data.json', 'r', encoding='utf-8') as f:
+        training_data = json.load(f)
+
+    corpus = [item['text'] for item in training_data]
+    for conv in conversations:
+        corpus.append(conv['user_input'])
+        corpus.append(conv['bot_response'])
+    return corpus
+
+def time_call(func, repeats):
+    """Return the best wall time of several runs"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    """Run the normalization microbenchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark text normalization")
+    parser.add_argument('--num-texts', type=int, default=200000, help="Number of texts to normalize")
+    parser.add_argument('--repeats', type=int, default=3, help="Runs per implementation (best is reported)")
+    parser.add_argument('--distinct', action='store_true',
+                        help="Make every text unique (disables the repeated-text shortcut)")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    texts = [corpus[i % len(corpus)] for i in range(args.num_texts)]
+    if args.distinct:
+        texts = [f"{text} {i}" for i, text in enumerate(texts)]
+
+    # The translate fast path must agree with the regex rule it replaces
+    mismatches = [text for text in corpus if normalize_text(text) != legacy_prepare_data(text)]
+    if mismatches:
+        raise AssertionError(f"normalize_text differs from the regex rule for: {mismatches[:3]}")
+
+    timings = {
+        'legacy_regex_per_text': time_call(lambda: [legacy_prepare_data(t) for t in texts], args.repeats),
+        'legacy_generator_per_text': time_call(lambda: [legacy_generator(t) for t in texts], args.repeats),
+        'normalize_text_per_text': time_call(lambda: [normalize_text(t) for t in texts], args.repeats),
+        'normalize_texts_batch': time_call(lambda: normalize_texts(texts), args.repeats),
+    }
+
+    baseline = timings['legacy_regex_per_text']
+    results = {
+        'num_texts': args.num_texts,
+        'distinct_texts': len(set(texts)),
+        'results': {
+            name: {
+                'seconds': round(seconds, 4),
+                'texts_per_second': round(args.num_texts / seconds),
+                'speedup_vs_regex': round(baseline / seconds, 2)
+            }
+            for name, seconds in timings.items()
+        }
+    }
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
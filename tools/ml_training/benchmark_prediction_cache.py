@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Prediction Cache Benchmark for VitalAid
+Replays a Zipf-distributed query log through the TFLite classifier with and without the prediction cache
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmark_utils import latency_stats, load_queries
+from prediction_cache import DEFAULT_CACHE_ENTRIES, PredictionCache
+from tflite_inference import TFLiteClassifier
+
+def zipf_query_log(queries, length, exponent, seed=42):
+    """``length`` queries where the k-th most popular distinct query has weight 1/k**exponent"""
+    distinct = list(dict.fromkeys(queries))
+    rng = np.random.default_rng(seed)
+    popularity = rng.permutation(len(distinct))
+    weights = 1.0 / np.arange(1, len(distinct) + 1) ** exponent
+    ranks = rng.choice(len(distinct), size=length, p=weights / weights.sum())
+    return [distinct[popularity[rank]] for rank in ranks]
+
+def replay(classifier, query_log):
+    """Per-query latency of single-text predictions"""
+    times = []
+    for query in query_log:
+        start = time.perf_counter()
+        classifier.predict(query)
+        times.append(time.perf_counter() - start)
+    return latency_stats(times)
+
+def main():
+    """Run the prediction cache benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark the prediction cache on a Zipf query log")
+    parser.add_argument('model', help=".tflite model")
+    parser.add_argument('--tokenizer', required=True, help="Tokenizer JSON shipped with the model")
+    parser.add_argument('--labels', help="labels.json shipped with the model")
+    parser.add_argument('--queries', default='data/medical_training_data.json',
+                        help="JSON file with query texts (dataset, conversations or list of strings)")
+    parser.add_argument('--log-length', type=int, default=20000, help="Queries in the replayed log")
+    parser.add_argument('--zipf', type=float, default=1.1, help="Zipf exponent of query popularity")
+    parser.add_argument('--cache-sizes', type=int, nargs='+', default=[256, DEFAULT_CACHE_ENTRIES],
+                        help="Cache sizes to test")
+    parser.add_argument('--cache-ttl', type=float, help="Seconds before a cached prediction expires")
+    parser.add_argument('--threads', type=int, default=1, help="Interpreter threads")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Also write the results JSON to this file")
+    args = parser.parse_args()
+
+    query_log = zipf_query_log(load_queries(args.queries), args.log_length, args.zipf, args.seed)
+
+    classifier = TFLiteClassifier(args.model, args.tokenizer, args.labels, num_threads=args.threads)
+    runs = [{'cache_size': 0, **replay(classifier, query_log)}]
+
+    for cache_size in args.cache_sizes:
+        classifier.cache = PredictionCache(cache_size, args.cache_ttl)
+        run = {'cache_size': cache_size, **replay(classifier, query_log)}
+        run['cache'] = classifier.cache.stats()
+        runs.append(run)
+
+    results = {
+        'model': args.model,
+        'log_length': len(query_log),
+        'distinct_queries': len(set(query_log)),
+        'zipf_exponent': args.zipf,
+        'runs': runs
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
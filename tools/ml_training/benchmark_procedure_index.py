@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Procedure Lookup Benchmark for VitalAid
+Compares the BM25 inverted index with the app's linear substring scan over every procedure
+"""
+
+import argparse
+import json
+import time
+
+from benchmark_utils import latency_stats, load_queries
+from procedure_index import DEFAULT_PROCEDURES_PATH, ProcedureIndex, load_procedures
+
+def linear_scan(procedures, query, top_k=3):
+    """Rank procedures by how many query words (longer than 3 characters) their keywords or name contain
+
+    Mirrors the keyword fallback in the app's hybrid chatbot service.
+    """
+    words = [word for word in query.lower().split() if len(word) > 3]
+    scored = []
+    for procedure in procedures:
+        fields = [keyword.lower() for keyword in procedure.get('keywords', [])]
+        fields.append((procedure.get('name') or '').lower())
+        score = sum(1 for word in words if any(word in field for field in fields))
+        if score:
+            scored.append((score, procedure))
+    scored.sort(key=lambda item: -item[0])
+    return [procedure for _, procedure in scored[:top_k]]
+
+def time_queries(search, queries, runs):
+    times = []
+    for call in range(runs):
+        query = queries[call % len(queries)]
+        start = time.perf_counter()
+        search(query)
+        times.append(time.perf_counter() - start)
+    return latency_stats(times)
+
+def main():
+    """Run the procedure lookup benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark procedure lookup: inverted index vs linear scan")
+    parser.add_argument('--procedures', default=DEFAULT_PROCEDURES_PATH, help="first_aid_procedures.json export")
+    parser.add_argument('--queries', default='data/medical_training_data.json',
+                        help="JSON file with query texts (dataset, conversations or list of strings)")
+    parser.add_argument('--runs', type=int, default=5000, help="Timed queries per method")
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--output', help="Also write the results JSON to this file")
+    args = parser.parse_args()
+
+    procedures = load_procedures(args.procedures)
+    queries = load_queries(args.queries)
+
+    start = time.perf_counter()
+    index = ProcedureIndex.from_procedures(procedures)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    results = {
+        'procedures': len(procedures),
+        'terms': len(index.terms),
+        'index_build_ms': round(build_ms, 2),
+        'inverted_index': time_queries(lambda query: index.search(query, args.top_k), queries, args.runs),
+        'linear_scan': time_queries(lambda query: linear_scan(procedures, query, args.top_k), queries, args.runs)
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
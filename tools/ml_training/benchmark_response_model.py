@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Response Model Benchmark for VitalAid
+Compares TFLite size and single-query latency of the sequence and response models
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from train_model import (MAX_SEQUENCE_LENGTH, VOCAB_SIZE, convert_response_model_to_tflite, convert_to_tflite,
+                         create_model, create_response_model, create_training_pairs, load_data,
+                         tokenize_texts)
+
+def build_tflite_models(output_dir, num_responses):
+    """Convert freshly built sequence and response models
+
+    Size and latency do not depend on the trained weights, so untrained
+    models are enough to compare the architectures.
+    """
+    sequence_path = os.path.join(output_dir, 'sequence_model.tflite')
+    response_path = os.path.join(output_dir, 'response_model.tflite')
+    convert_to_tflite(create_model(), sequence_path)
+    convert_response_model_to_tflite(create_response_model(num_responses), response_path)
+    return sequence_path, response_path
+
+def measure_latency(model_path, queries, repeats):
+    """Return init time and per-query latency stats of a TFLite model (one query per invoke)"""
+    start = time.perf_counter()
+    interpreter = tf.lite.Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    init_seconds = time.perf_counter() - start
+
+    input_detail = interpreter.get_input_details()[0]
+    output_index = interpreter.get_output_details()[0]['index']
+
+    # The sequence model takes one float channel per timestep
+    inputs = queries.astype(input_detail['dtype']).reshape((len(queries),) + tuple(input_detail['shape'][1:]))
+
+    # Warm up
+    interpreter.set_tensor(input_detail['index'], inputs[:1])
+    interpreter.invoke()
+
+    latencies = []
+    for _ in range(repeats):
+        for row in range(len(inputs)):
+            start = time.perf_counter()
+            interpreter.set_tensor(input_detail['index'], inputs[row:row + 1])
+            interpreter.invoke()
+            interpreter.get_tensor(output_index)
+            latencies.append(time.perf_counter() - start)
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'size_kb': round(os.path.getsize(model_path) / 1024, 1),
+        'init_ms': round(init_seconds * 1000, 2),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'mean_ms': round(float(latencies_ms.mean()), 3)
+    }
+
+def main():
+    """Run the response model benchmark"""
+    parser = argparse.ArgumentParser(description="Compare the sequence and response TFLite models")
+    parser.add_argument('--sequence-model', help="Trained sequence model (default: convert an untrained one)")
+    parser.add_argument('--response-model', help="Trained response model (default: convert an untrained one)")
+    parser.add_argument('--repeats', type=int, default=20, help="Passes over the benchmark queries")
+    args = parser.parse_args()
+
+    conversations, vocabulary = load_data()
+    texts = [conv['user_input'] for conv in conversations]
+    queries = tokenize_texts(texts, vocabulary, MAX_SEQUENCE_LENGTH)
+    queries[queries >= VOCAB_SIZE] = vocabulary.get('<UNK>', 1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sequence_path, response_path = args.sequence_model, args.response_model
+        if not (sequence_path and response_path):
+            _, output_texts = create_training_pairs(conversations, real_fraction=1.0)
+            num_responses = len(set(output_texts))
+            built_sequence, built_response = build_tflite_models(tmp_dir, num_responses)
+            sequence_path = sequence_path or built_sequence
+            response_path = response_path or built_response
+
+        results = {
+            'num_queries': len(texts),
+            'repeats': args.repeats,
+            'sequence_model': measure_latency(sequence_path, queries, args.repeats),
+            'response_model': measure_latency(response_path, queries, args.repeats)
+        }
+
+    sequence, response = results['sequence_model'], results['response_model']
+    results['size_reduction'] = round(sequence['size_kb'] / response['size_kb'], 1)
+    results['p50_speedup'] = round(sequence['p50_ms'] / response['p50_ms'], 1)
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
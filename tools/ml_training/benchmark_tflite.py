@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+TFLite Inference Benchmark for VitalAid
+Measures cold/warm single-query and batched latency, throughput and peak RSS of shipped models
+"""
+
+import argparse
+import json
+import resource
+import sys
+import time
+
+from benchmark_utils import latency_stats, load_queries
+from tflite_inference import TFLiteClassifier
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is in KB on Linux)"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def benchmark_cold(args, num_threads, query):
+    """Time from interpreter creation to the first prediction"""
+    times = []
+    for _ in range(args.cold_runs):
+        start = time.perf_counter()
+        classifier = TFLiteClassifier(args.model, args.tokenizer, args.labels, num_threads=num_threads)
+        classifier.predict(query)
+        times.append(time.perf_counter() - start)
+    return latency_stats(times)
+
+def benchmark_warm(classifier, queries, batch_size, runs, warmup):
+    """Per-call latency after warmup; each call classifies ``batch_size`` texts (tokenization included)"""
+    batches = [queries[i:i + batch_size] for i in range(0, len(queries) - batch_size + 1, batch_size)]
+    if not batches:
+        batches = [(queries * batch_size)[:batch_size]]
+
+    for batch in batches[:warmup]:
+        classifier.predict_proba(batch)
+
+    times = []
+    for call in range(runs):
+        batch = batches[call % len(batches)]
+        start = time.perf_counter()
+        classifier.predict_proba(batch)
+        times.append(time.perf_counter() - start)
+    return latency_stats(times, batch_size)
+
+def check_regressions(results, baseline_path, max_regression):
+    """Return descriptions of p95 latencies that regressed beyond ``max_regression``"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    baseline_runs = {(run['threads'], run['mode'], run['batch_size']): run for run in baseline['runs']}
+    regressions = []
+    for run in results['runs']:
+        previous = baseline_runs.get((run['threads'], run['mode'], run['batch_size']))
+        if previous and run['p95_ms'] > previous['p95_ms'] * (1 + max_regression):
+            regressions.append(f"{run['mode']} threads={run['threads']} batch={run['batch_size']}: "
+                               f"p95 {previous['p95_ms']} -> {run['p95_ms']} ms")
+    return regressions
+
+def main():
+    """Run the TFLite inference benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark a TFLite text classifier")
+    parser.add_argument('model', help=".tflite model")
+    parser.add_argument('--tokenizer', required=True, help="Tokenizer JSON shipped with the model")
+    parser.add_argument('--labels', help="labels.json shipped with the model")
+    parser.add_argument('--queries', default='data/medical_training_data.json',
+                        help="JSON file with query texts (dataset, conversations or list of strings)")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1], help="Interpreter thread counts to test")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32], help="Batch sizes to test")
+    parser.add_argument('--runs', type=int, default=500, help="Timed calls per configuration")
+    parser.add_argument('--warmup', type=int, default=20, help="Untimed calls before the warm runs")
+    parser.add_argument('--cold-runs', type=int, default=5, help="Fresh interpreters for the cold start timing")
+    parser.add_argument('--output', help="Also write the results JSON to this file")
+    parser.add_argument('--baseline', help="Previous results JSON to compare p95 latencies against")
+    parser.add_argument('--max-regression', type=float, default=0.1,
+                        help="Allowed relative p95 increase over --baseline before exiting with an error")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    rss_before = peak_rss_mb()
+
+    runs = []
+    for num_threads in args.threads:
+        cold = benchmark_cold(args, num_threads, queries[0])
+        runs.append({'threads': num_threads, 'mode': 'cold', 'batch_size': 1, **cold})
+
+        classifier = TFLiteClassifier(args.model, args.tokenizer, args.labels, num_threads=num_threads)
+        for batch_size in args.batch_sizes:
+            warm = benchmark_warm(classifier, queries, batch_size, args.runs, args.warmup)
+            runs.append({'threads': num_threads, 'mode': 'warm', 'batch_size': batch_size, **warm})
+
+    results = {
+        'model': args.model,
+        'num_queries': len(queries),
+        'includes_tokenization': True,
+        'peak_rss_mb': peak_rss_mb(),
+        'peak_rss_before_load_mb': rss_before,
+        'runs': runs
+    }
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+    if args.baseline:
+        regressions = check_regressions(results, args.baseline, args.max_regression)
+        if regressions:
+            print("Latency regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
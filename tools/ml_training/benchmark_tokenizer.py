@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tokenizer Benchmark Script for VitalAid
+Compares batch tokenization against the per-sample tokenize_text path
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+
+from conversation_tokenizer import MAX_SEQUENCE_LENGTH, load_data, tokenize_text, tokenize_texts
+
+def time_call(func, repeats):
+    """Return the best wall time of several runs"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    """Run the tokenizer benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark batch vs per-sample tokenization")
+    parser.add_argument('--num-texts', type=int, default=200000, help="Number of texts to tokenize")
+    parser.add_argument('--repeats', type=int, default=3, help="Runs per implementation (best is reported)")
+    parser.add_argument('--distinct', action='store_true',
+                        help="Make every text unique (disables the repeated-text shortcut)")
+    args = parser.parse_args()
+
+    conversations, vocabulary = load_data()
+    corpus = [conv['user_input'] for conv in conversations] + [conv['bot_response'] for conv in conversations]
+    texts = [corpus[i % len(corpus)] for i in range(args.num_texts)]
+    if args.distinct:
+        texts = [f"{text} {i}" for i, text in enumerate(texts)]
+
+    # Both paths must agree before timing them
+    expected = np.array([tokenize_text(text, vocabulary) for text in texts[:len(corpus)]])
+    actual = tokenize_texts(texts[:len(corpus)], vocabulary)
+    if not np.array_equal(expected, actual):
+        raise AssertionError("tokenize_texts does not match the per-sample tokenizer")
+
+    timings = {
+        'tokenize_text_per_sample': time_call(
+            lambda: np.array([tokenize_text(text, vocabulary) for text in texts]), args.repeats),
+        'tokenize_texts_batch': time_call(
+            lambda: tokenize_texts(texts, vocabulary), args.repeats),
+        'tokenize_texts_iterator': time_call(
+            lambda: tokenize_texts(iter(texts), vocabulary, num_texts=len(texts)), args.repeats),
+    }
+
+    baseline = timings['tokenize_text_per_sample']
+    results = {
+        'num_texts': args.num_texts,
+        'distinct_texts': len(set(texts)),
+        'max_sequence_length': MAX_SEQUENCE_LENGTH,
+        'results': {
+            name: {
+                'seconds': round(seconds, 4),
+                'texts_per_second': round(args.num_texts / seconds),
+                'speedup_vs_per_sample': round(baseline / seconds, 2)
+            }
+            for name, seconds in timings.items()
+        }
+    }
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
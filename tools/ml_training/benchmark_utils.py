@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Shared Benchmark Helpers for VitalAid
+Latency statistics and query loading used by the benchmark and load-test scripts
+"""
+
+import json
+
+import numpy as np
+
+def latency_stats(seconds, items_per_call=1):
+    """Percentiles in ms plus throughput for a list of per-call times"""
+    latencies_ms = np.array(seconds) * 1000
+    return {
+        'calls': len(latencies_ms),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+        'mean_ms': round(float(latencies_ms.mean()), 3),
+        'throughput_per_second': round(items_per_call * len(latencies_ms) / float(np.sum(seconds)), 1)
+    }
+
+def load_queries(path):
+    """Query texts from a JSON dataset, a list of strings or conversations"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data['training_data']
+
+    texts = []
+    for item in data:
+        if isinstance(item, str):
+            texts.append(item)
+        else:
+            texts.append(item.get('text') or item.get('user_input'))
+    return texts
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Length-Bucketed Batching for VitalAid
+tf.data batches grouped by token count, so LSTM batches of short queries run only a few timesteps
+"""
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+import numpy as np
+
+# TensorFlow is imported where it is used, so CLIs can add the shared
+# arguments without paying its import time
+if TYPE_CHECKING:
+    import tensorflow as tf
+
+DEFAULT_NUM_BUCKETS = 4
+
+def sequence_lengths(X: np.ndarray, pad_id: int = 0) -> np.ndarray:
+    """Length of each post-padded row up to its last non-padding token (at least 1)
+
+    ``X`` is (n, max_length) or, for models fed one channel per timestep,
+    (n, max_length, 1).
+    """
+    X = np.asarray(X)
+    if X.ndim == 3:
+        X = X[..., 0]
+    content = X != pad_id
+    lengths = X.shape[1] - np.argmax(content[:, ::-1], axis=1)
+    lengths[~content.any(axis=1)] = 1
+    return lengths.astype(np.int32)
+
+def bucket_boundaries(lengths: np.ndarray, num_buckets: int, max_length: int) -> List[int]:
+    """Exclusive upper lengths splitting ``lengths`` into about equally full buckets
+
+    The longest row closes the last of those buckets. A final
+    ``max_length + 1`` boundary catches longer rows (e.g. in validation
+    data), so every row fits a bucket when batches are padded to the
+    bucket boundary.
+    """
+    cut_points = np.quantile(lengths, np.linspace(0, 1, num_buckets + 1)[1:])
+    return sorted({min(int(point), max_length) + 1 for point in cut_points} | {max_length + 1})
+
+def bucketed_dataset(X: np.ndarray, y: np.ndarray, batch_size: int, boundaries: List[int],
+                     shuffle: bool = True) -> 'tf.data.Dataset':
+    """Batches of (tokens, labels), each padded only to its bucket's longest length
+
+    Rows are trimmed to their own length, shuffled, grouped by length and
+    padded with zeros again. Padding to the bucket boundary rather than to
+    each batch's longest row keeps one batch shape per bucket, so the
+    training step is traced (and XLA-compiled) once per bucket.
+    """
+    import tensorflow as tf
+
+    X = np.asarray(X)
+    y = np.asarray(y)
+    rows = tf.RaggedTensor.from_tensor(X, lengths=sequence_lengths(X))
+
+    dataset = tf.data.Dataset.from_tensor_slices((rows, y))
+    if shuffle:
+        dataset = dataset.shuffle(len(X), reshuffle_each_iteration=True)
+    dataset = dataset.bucket_by_sequence_length(
+        element_length_func=lambda tokens, label: tf.shape(tokens)[0],
+        bucket_boundaries=boundaries,
+        bucket_batch_sizes=[batch_size] * (len(boundaries) + 1),
+        padded_shapes=([None] + list(X.shape[2:]), list(y.shape[1:])),
+        pad_to_bucket_boundary=True
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def bucketed_datasets(X_train: np.ndarray, y_train: np.ndarray, X_val: np.ndarray, y_val: np.ndarray,
+                      batch_size: int, num_buckets: int = DEFAULT_NUM_BUCKETS,
+                      boundaries: Optional[List[int]] = None) -> Tuple['tf.data.Dataset', 'tf.data.Dataset']:
+    """Bucketed training and validation datasets sharing the training split's boundaries"""
+    if boundaries is None:
+        boundaries = bucket_boundaries(sequence_lengths(X_train), num_buckets, X_train.shape[1])
+    print(f"Bucketed batching: bucket boundaries {boundaries}")
+    return (bucketed_dataset(X_train, y_train, batch_size, boundaries),
+            bucketed_dataset(X_val, y_val, batch_size, boundaries, shuffle=False))
+
+def padded_timesteps(lengths: np.ndarray, boundaries: List[int]) -> np.ndarray:
+    """Timesteps each row runs when padded to its bucket boundary"""
+    return np.asarray(boundaries)[np.searchsorted(boundaries, lengths, side='right')] - 1
+
+def fixed_length_model(model: 'tf.keras.Model', max_length: int) -> 'tf.keras.Model':
+    """Copy of a variable-length model with the time axis fixed to ``max_length``
+
+    Bucketed models are built with a variable time axis. The Python
+    tooling (tflite_inference.TextEncoder, the inference server,
+    response_retrieval) pads queries to the input length it reads from the
+    exported model, so the export needs it fixed. The embedding or Masking
+    layer still masks the padding, so the copy computes the same outputs.
+    """
+    import tensorflow as tf
+
+    model_input = model.inputs[0]
+    inputs = tf.keras.Input(shape=(max_length,) + tuple(model_input.shape[2:]), dtype=model_input.dtype)
+    clone = tf.keras.models.clone_model(model, input_tensors=inputs)
+    clone.set_weights(model.get_weights())
+    return clone
+
+def add_bucketing_arguments(parser):
+    """Add the --bucketed/--num-buckets options shared by the trainers"""
+    parser.add_argument('--bucketed', action='store_true',
+                        help="Batch samples of similar length together and mask the padding, "
+                             "so batches of short queries run fewer LSTM steps")
+    parser.add_argument('--num-buckets', type=int, default=DEFAULT_NUM_BUCKETS,
+                        help="Length buckets for --bucketed")
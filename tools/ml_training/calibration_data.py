@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Int8 Calibration Data for VitalAid
+Stratified, tokenized-once calibration samples for TFLite representative datasets
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from dataset_cache import DatasetCache, cache_key, hash_texts
+
+DEFAULT_CALIBRATION_SIZE = 100
+
+def stratified_indices(labels: Sequence[int], size: int, seed: int = 42) -> np.ndarray:
+    """Pick up to ``size`` sample indices, taking classes in turn
+
+    Each class contributes the same number of samples where possible, so
+    small classes are represented in the activation ranges. Samples within
+    a class are chosen at random with ``seed``.
+    """
+    labels = np.asarray(labels)
+    rng = np.random.default_rng(seed)
+
+    per_class = [rng.permutation(np.flatnonzero(labels == label)) for label in np.unique(labels)]
+    selected = []
+    for rank in range(max((len(indices) for indices in per_class), default=0)):
+        for indices in per_class:
+            if rank < len(indices):
+                selected.append(indices[rank])
+            if len(selected) == size:
+                return np.sort(np.array(selected, dtype=np.int64))
+
+    return np.sort(np.array(selected, dtype=np.int64))
+
+def model_input_dtype(model) -> np.dtype:
+    """NumPy dtype of a Keras model's first input (float32 or int32 token IDs)"""
+    dtype = model.inputs[0].dtype
+    return np.dtype(getattr(dtype, 'as_numpy_dtype', dtype))
+
+class CalibrationSet:
+    def __init__(self, samples: np.ndarray, dtype: Any = np.float32):
+        """Calibration inputs as an (n, max_length) array of the model's input ``dtype``
+
+        The converter rejects representative samples whose dtype differs
+        from the model input, so pass model_input_dtype(model).
+        """
+        self.samples = np.ascontiguousarray(samples, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    @classmethod
+    def from_arrays(cls, X: np.ndarray, labels: Sequence[int], size: int = DEFAULT_CALIBRATION_SIZE,
+                    seed: int = 42, dtype: Any = np.float32) -> 'CalibrationSet':
+        """Sample already-tokenized rows"""
+        return cls(np.asarray(X)[stratified_indices(labels, size, seed)], dtype)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], labels: Sequence[int], transform: Callable[[List[str]], np.ndarray],
+                   size: int = DEFAULT_CALIBRATION_SIZE, seed: int = 42, cache: Optional[DatasetCache] = None,
+                   tokenizer_state: Optional[Dict] = None, dtype: Any = np.float32) -> 'CalibrationSet':
+        """Sample texts and tokenize only the selected ones
+
+        With a cache, the tokenized array is stored on disk keyed on the
+        texts, labels, sampling settings and ``tokenizer_state`` (e.g. the
+        word index), so later conversions skip sampling and tokenization.
+        """
+        key = None
+        if cache is not None:
+            key = cache_key(
+                'calibration_data',
+                samples=hash_texts(f"{label}\t{text}" for text, label in zip(texts, labels)),
+                size=size,
+                seed=seed,
+                tokenizer_state=tokenizer_state
+            )
+            cached = cache.get_arrays(key)
+            if cached is not None:
+                return cls(cached['samples'], dtype)
+
+        indices = stratified_indices(labels, size, seed)
+        calibration = cls(transform([texts[i] for i in indices]), dtype)
+
+        if cache is not None:
+            cache.put_arrays(key, samples=calibration.samples)
+        return calibration
+
+    @classmethod
+    def from_dataset(cls, dataset, size: int = DEFAULT_CALIBRATION_SIZE, seed: int = 42,
+                     max_scan: int = 20, dtype: Any = np.float32) -> 'CalibrationSet':
+        """Sample from the first ``size * max_scan`` rows of a batched (X, y) tf.data dataset"""
+        X_batches = []
+        y_batches = []
+        scanned = 0
+        for X_batch, y_batch in dataset:
+            X_batches.append(X_batch.numpy())
+            y_batches.append(y_batch.numpy())
+            scanned += len(y_batches[-1])
+            if scanned >= size * max_scan:
+                break
+        return cls.from_arrays(np.concatenate(X_batches), np.concatenate(y_batches), size, seed, dtype)
+
+    def representative_dataset(self):
+        """Generator for TFLiteConverter.representative_dataset (one sample per step)"""
+        samples = self.samples
+        for row in range(len(samples)):
+            yield [samples[row:row + 1]]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Conversation Tokenizer for VitalAid
+Loads conversations/vocabulary and converts texts to START/END-framed, padded token ID matrices without TensorFlow
+"""
+
+import json
+
+import numpy as np
+
+from text_normalization import tokenize
+
+MAX_SEQUENCE_LENGTH = 50
+TOKENIZE_CHUNK_SIZE = 8192
+
+def load_data():
+    """Load the prepared training data"""
+    print("Loading prepared data...")
+
+    with open('data/conversations.json', 'r', encoding='utf-8') as f:
+        conversations = json.load(f)
+
+    with open('data/vocabulary.json', 'r', encoding='utf-8') as f:
+        vocabulary = json.load(f)
+
+    print(f"Loaded {len(conversations)} conversations")
+    print(f"Vocabulary size: {len(vocabulary)}")
+
+    return conversations, vocabulary
+
+def tokenize_text(text, vocabulary, max_length=MAX_SEQUENCE_LENGTH):
+    """Convert text to sequence of token IDs"""
+    tokens = tokenize(text)
+    token_ids = []
+
+    # Add START token
+    token_ids.append(vocabulary.get('<START>', 2))
+
+    for token in tokens:
+        token_id = vocabulary.get(token, vocabulary.get('<UNK>', 1))
+        token_ids.append(token_id)
+
+    # Add END token
+    token_ids.append(vocabulary.get('<END>', 3))
+
+    # Pad or truncate to max_length
+    if len(token_ids) > max_length:
+        token_ids = token_ids[:max_length]
+    else:
+        token_ids.extend([vocabulary.get('<PAD>', 0)] * (max_length - len(token_ids)))
+
+    return np.array(token_ids)
+
+def tokenize_texts(texts, vocabulary, max_length=MAX_SEQUENCE_LENGTH, num_texts=None):
+    """Convert a batch of texts into a padded int32 matrix of token IDs
+
+    Rows are written into one preallocated (n, max_length) array instead of
+    building a separate array per text. ``texts`` may be any iterable; pass
+    ``num_texts`` to tokenize an iterator without materializing it first.
+    """
+    if num_texts is None:
+        if not hasattr(texts, '__len__'):
+            texts = list(texts)
+        num_texts = len(texts)
+
+    pad_id = vocabulary.get('<PAD>', 0)
+    unk_id = vocabulary.get('<UNK>', 1)
+    start_id = vocabulary.get('<START>', 2)
+    end_id = vocabulary.get('<END>', 3)
+    lookup = vocabulary.get
+
+    token_matrix = np.full((num_texts, max_length), pad_id, dtype=np.int32)
+
+    # Token IDs are gathered flat per chunk and scattered into the matrix with
+    # a single fancy-indexing assignment, which avoids a numpy call per row
+    flat_ids = []
+    lengths = []
+    seen_texts = {}
+    chunk_start = 0
+    row = -1
+    for row, text in enumerate(texts):
+        if row >= num_texts:
+            raise ValueError(f"Got more than num_texts={num_texts} texts")
+
+        # START + tokens + END, truncated to max_length. Generated corpora
+        # repeat the same texts many times, so each distinct text is only
+        # looked up once per call.
+        token_ids = seen_texts.get(text)
+        if token_ids is None:
+            token_ids = [start_id]
+            token_ids.extend([lookup(token, unk_id) for token in tokenize(text)])
+            token_ids.append(end_id)
+            del token_ids[max_length:]
+            seen_texts[text] = token_ids
+
+        flat_ids.extend(token_ids)
+        lengths.append(len(token_ids))
+
+        if len(lengths) == TOKENIZE_CHUNK_SIZE:
+            _scatter_token_ids(token_matrix, chunk_start, flat_ids, lengths)
+            chunk_start += len(lengths)
+            flat_ids = []
+            lengths = []
+
+    if row + 1 != num_texts:
+        raise ValueError(f"Expected {num_texts} texts, got {row + 1}")
+
+    if lengths:
+        _scatter_token_ids(token_matrix, chunk_start, flat_ids, lengths)
+
+    return token_matrix
+
+def _scatter_token_ids(token_matrix, first_row, flat_ids, lengths):
+    """Write variable-length rows of token IDs into the left of token_matrix"""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    rows = np.repeat(np.arange(first_row, first_row + len(lengths)), lengths)
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    cols = np.arange(len(rows)) - offsets
+    token_matrix[rows, cols] = flat_ids
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Dataset Cache for VitalAid
+Stores generated datasets and tokenized arrays keyed on the inputs that produced them
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
+
+# NumPy is only needed for array entries; JSON-only users (the data
+# generators) skip its import time
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get('VITALAID_CACHE_DIR', '.dataset_cache')
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Bump to invalidate every entry when the cached formats change
+CACHE_VERSION = 1
+
+def hash_file(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_texts(texts: Iterable[str]) -> str:
+    """SHA-256 of a sequence of texts (order-sensitive)"""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def cache_key(namespace: str, **parts: Any) -> str:
+    """Build a content hash from a namespace and JSON-serializable inputs
+
+    Pass everything the cached value depends on: generator config, seed,
+    source tables and (via hash_file) the generator's own source file.
+    """
+    payload = json.dumps({'namespace': namespace, 'version': CACHE_VERSION, 'parts': parts},
+                         sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class DatasetCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def _touch(self, entry_dir: str):
+        """Mark an entry as recently used for LRU eviction"""
+        os.utime(entry_dir)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir):
+            self._touch(entry_dir)
+            self.hits += 1
+            return entry_dir
+        self.misses += 1
+        return None
+
+    def _commit(self, key: str, staging_dir: str):
+        """Move a fully written staging directory into place, then evict"""
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir):
+            shutil.rmtree(staging_dir)
+        else:
+            os.replace(staging_dir, entry_dir)
+        self._touch(entry_dir)
+        self.evict(keep=key)
+
+    def _staging_dir(self) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        return tempfile.mkdtemp(prefix='.staging-', dir=self.cache_dir)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        """Return a cached JSON value, or None on a miss"""
+        entry_dir = self._lookup(key)
+        if entry_dir is None:
+            return None
+        with open(os.path.join(entry_dir, 'value.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def put_json(self, key: str, value: Any):
+        """Store a JSON-serializable value"""
+        staging_dir = self._staging_dir()
+        with open(os.path.join(staging_dir, 'value.json'), 'w', encoding='utf-8') as f:
+            json.dump(value, f, ensure_ascii=False)
+        self._commit(key, staging_dir)
+
+    def get_arrays(self, key: str, mmap_mode: Optional[str] = 'r') -> Optional[Dict[str, Any]]:
+        """Return cached arrays (memory-mapped by default) plus metadata, or None"""
+        entry_dir = self._lookup(key)
+        if entry_dir is None:
+            return None
+
+        with open(os.path.join(entry_dir, 'metadata.json'), 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        import numpy as np
+
+        result = {'metadata': metadata['metadata']}
+        for name in metadata['arrays']:
+            result[name] = np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+        return result
+
+    def put_arrays(self, key: str, metadata: Optional[Dict] = None, **arrays: 'np.ndarray'):
+        """Store named arrays as .npy files plus JSON metadata"""
+        import numpy as np
+
+        staging_dir = self._staging_dir()
+        for name, array in arrays.items():
+            np.save(os.path.join(staging_dir, f"{name}.npy"), array)
+        with open(os.path.join(staging_dir, 'metadata.json'), 'w', encoding='utf-8') as f:
+            json.dump({'arrays': list(arrays), 'metadata': metadata or {}}, f, ensure_ascii=False)
+        self._commit(key, staging_dir)
+
+    def entries(self):
+        """Return (last_used, size_bytes, key) for every entry, oldest first"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = self._entry_dir(key)
+            if key.startswith('.') or not os.path.isdir(entry_dir):
+                continue
+            size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+            entries.append((os.path.getmtime(entry_dir), size, key))
+        return sorted(entries)
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Delete least recently used entries until the cache fits max_bytes"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+
+        for _, size, key in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            evicted += 1
+
+        return evicted
+
+    def clear(self):
+        """Delete every cache entry"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """Add the --cache-dir/--cache-max-mb/--no-cache options shared by the CLIs"""
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Dataset cache directory")
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                        help="Evict least recently used cache entries above this size")
+    parser.add_argument('--no-cache', action='store_true', help="Always regenerate; do not read or write the cache")
+
+def cache_from_args(args: argparse.Namespace) -> Optional[DatasetCache]:
+    """Create the cache selected by add_cache_arguments options (None if disabled)"""
+    if args.no_cache:
+        return None
+    return DatasetCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 ** 2)
+
+def main():
+    """Show or clear the dataset cache"""
+    parser = argparse.ArgumentParser(description="Inspect the VitalAid dataset cache")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help="Dataset cache directory")
+    parser.add_argument('--clear', action='store_true', help="Delete every cache entry")
+    args = parser.parse_args()
+
+    cache = DatasetCache(args.cache_dir)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {args.cache_dir}")
+        return
+
+    entries = cache.entries()
+    print(f"{len(entries)} entries, {sum(size for _, size, _ in entries) / 1024 ** 2:.1f} MB in {args.cache_dir}")
+    for _, size, key in reversed(entries):
+        print(f"  {key[:16]}  {size / 1024:.1f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Dataset Shard Utilities for VitalAid
+Writes and reads sharded training datasets without loading them whole
+"""
+
+import argparse
+import json
+import os
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# NumPy is only needed for the .npy format, not for TSV shards
+if TYPE_CHECKING:
+    import numpy as np
+
+SHARD_MANIFEST = "manifest.json"
+DEFAULT_SHARD_SIZE = 100000
+# Characters that would split a TSV row; whitespace to the tokenizers
+TSV_SEPARATORS = str.maketrans('\t\n\r', '   ')
+TOKENS_FILE = "tokens.npy"
+LABELS_FILE = "labels.npy"
+
+def write_tsv_shards(samples: Iterable[Dict], output_dir: str,
+                     shard_size: int = DEFAULT_SHARD_SIZE,
+                     metadata: Optional[Dict] = None) -> List[str]:
+    """Write samples as ``label<TAB>text`` shards plus a manifest.json
+
+    Samples are consumed lazily, so a generator can be written out without
+    ever holding the full dataset in memory. ``metadata`` (e.g. categories)
+    is stored in the manifest for the trainers. Tabs and line breaks in
+    the text become spaces, which tokenizes the same, so streaming_dataset
+    can decode the rows in-graph with tf.io.decode_csv.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    shard_paths = []
+    num_samples = 0
+    shard_file = None
+
+    try:
+        for sample in samples:
+            if num_samples % shard_size == 0:
+                if shard_file is not None:
+                    shard_file.close()
+                shard_path = os.path.join(output_dir, f"shard-{len(shard_paths):05d}.tsv")
+                shard_file = open(shard_path, 'w', encoding='utf-8')
+                shard_paths.append(shard_path)
+
+            text = sample['text'].translate(TSV_SEPARATORS)
+            shard_file.write(f"{int(sample['label'])}\t{text}\n")
+            num_samples += 1
+    finally:
+        if shard_file is not None:
+            shard_file.close()
+
+    manifest = {
+        'format': 'tsv',
+        'num_samples': num_samples,
+        'shard_size': shard_size,
+        'shards': [os.path.basename(path) for path in shard_paths]
+    }
+    manifest.update(metadata or {})
+
+    with open(os.path.join(output_dir, SHARD_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    print(f"Wrote {num_samples} samples to {len(shard_paths)} TSV shards in {output_dir}")
+    return shard_paths
+
+def load_shard_manifest(shard_dir: str) -> Dict:
+    """Load the manifest written alongside a set of shards"""
+    with open(os.path.join(shard_dir, SHARD_MANIFEST), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def list_tsv_shards(shard_dir: str) -> List[str]:
+    """Return the TSV shard paths of a shard directory in order"""
+    manifest = load_shard_manifest(shard_dir)
+    if manifest.get('format') != 'tsv':
+        raise ValueError(f"{shard_dir} does not contain TSV shards")
+    return [os.path.join(shard_dir, name) for name in manifest['shards']]
+
+def iter_tsv_samples(shard_paths: Iterable[str]) -> Iterator[Dict]:
+    """Yield samples one at a time from TSV shards"""
+    for shard_path in shard_paths:
+        with open(shard_path, 'r', encoding='utf-8', newline='\n') as f:
+            for line in f:
+                if line.strip():
+                    label, text = line.rstrip('\n').split('\t', 1)
+                    yield {'text': text, 'label': int(label)}
+
+def write_npy_dataset(tokens: 'np.ndarray', labels: 'np.ndarray', output_dir: str,
+                      metadata: Optional[Dict] = None) -> str:
+    """Write a pre-tokenized dataset as tokens.npy/labels.npy plus a manifest.json
+
+    Tokens are stored as an int32 (n, max_length) matrix and labels as an
+    int16 vector. ``metadata`` (vocabulary, class info, ...) goes into the
+    manifest so the trainers never need to re-read the JSON sources.
+    """
+    import numpy as np
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokens = np.ascontiguousarray(tokens, dtype=np.int32)
+    labels = np.ascontiguousarray(labels, dtype=np.int16)
+    if tokens.ndim != 2 or len(tokens) != len(labels):
+        raise ValueError(f"Expected (n, max_length) tokens and n labels, got {tokens.shape} and {labels.shape}")
+
+    np.save(os.path.join(output_dir, TOKENS_FILE), tokens)
+    np.save(os.path.join(output_dir, LABELS_FILE), labels)
+
+    manifest = {
+        'format': 'npy',
+        'num_samples': int(tokens.shape[0]),
+        'max_length': int(tokens.shape[1]),
+        'tokens': TOKENS_FILE,
+        'labels': LABELS_FILE
+    }
+    manifest.update(metadata or {})
+
+    with open(os.path.join(output_dir, SHARD_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    print(f"Wrote {tokens.shape[0]} pre-tokenized samples to {output_dir}")
+    return output_dir
+
+def load_npy_dataset(shard_dir: str) -> Tuple['np.ndarray', 'np.ndarray', Dict]:
+    """Memory-map a dataset written by write_npy_dataset
+
+    Returns read-only (tokens, labels, manifest). Nothing is parsed or
+    copied up front, so load time does not depend on the dataset size.
+    """
+    import numpy as np
+
+    manifest = load_shard_manifest(shard_dir)
+    if manifest.get('format') != 'npy':
+        raise ValueError(f"{shard_dir} does not contain a pre-tokenized .npy dataset")
+
+    tokens = np.load(os.path.join(shard_dir, manifest['tokens']), mmap_mode='r')
+    labels = np.load(os.path.join(shard_dir, manifest['labels']), mmap_mode='r')
+    return tokens, labels, manifest
+
+def main():
+    """Convert an existing JSON dataset into TSV shards"""
+    parser = argparse.ArgumentParser(description="Convert a JSON training dataset into TSV shards")
+    parser.add_argument('data_file', help="medical_training_data.json or medical_chatbot_training_data.json")
+    parser.add_argument('output_dir', help="Directory to write the shards and manifest into")
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help="Samples per shard")
+    args = parser.parse_args()
+
+    with open(args.data_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    # medical_chatbot_training_data.json wraps the samples with its categories
+    metadata = {}
+    if isinstance(data, dict):
+        metadata = {
+            'categories': data['categories'],
+            'reverse_categories': data['reverse_categories']
+        }
+        data = data['training_data']
+
+    write_tsv_shards(data, args.output_dir, shard_size=args.shard_size, metadata=metadata)
+
+if __name__ == "__main__":
+    main()
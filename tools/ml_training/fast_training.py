@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Fast Training Mode for VitalAid
+XLA compilation, bfloat16 mixed precision and per-epoch timing for the Keras trainers
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List
+
+# TensorFlow is imported where it is used, so CLIs can add the shared
+# arguments without paying its import time
+if TYPE_CHECKING:
+    import tensorflow as tf
+
+MIXED_PRECISION_CHOICES = ('auto', 'bf16', 'off')
+EPOCH_TIMINGS_FILE = 'epoch_timings.json'
+
+def cpu_supports_bfloat16() -> bool:
+    """Whether the CPU has native bfloat16 instructions (AVX512-BF16 or AMX)
+
+    Without them bfloat16 is emulated and slower than float32.
+    """
+    try:
+        with open('/proc/cpuinfo', 'r') as f:
+            flags = set()
+            for line in f:
+                if line.startswith('flags'):
+                    flags.update(line.split(':', 1)[1].split())
+                    break
+    except OSError:
+        return False
+    return bool(flags & {'avx512_bf16', 'amx_bf16'})
+
+class TrainingConfig:
+    def __init__(self, fast: bool = False, mixed_precision: str = 'off'):
+        """Compile/precision settings for one training run
+
+        Use configure_training to build one; it also sets the Keras global
+        dtype policy, which must happen before the model is created.
+        """
+        self.fast = fast
+        self.jit_compile = fast
+        self.mixed_precision = mixed_precision
+        self.policy = 'mixed_bfloat16' if mixed_precision == 'bf16' else 'float32'
+
+    def lstm_options(self, recurrent_dropout: float = 0.0) -> Dict:
+        """LSTM arguments for the model builders
+
+        The fused LSTM kernel (used by oneDNN and XLA) is only selected when
+        recurrent_dropout is 0, so fast mode drops it; input dropout and the
+        Dropout layers still regularize. LSTMs built without recurrent
+        dropout already use the fused kernel, so fast mode changes nothing
+        here for them.
+        """
+        return {'recurrent_dropout': 0.0 if self.fast else recurrent_dropout}
+
+    def describe(self) -> Dict:
+        """Settings recorded next to the epoch timings"""
+        return {
+            'fast': self.fast,
+            'jit_compile': self.jit_compile,
+            'dtype_policy': self.policy,
+            'onednn': os.environ.get('TF_ENABLE_ONEDNN_OPTS', 'default')
+        }
+
+def configure_training(fast: bool = False, mixed_precision: str = 'auto') -> TrainingConfig:
+    """Set up the requested training mode
+
+    ``mixed_precision`` only applies with ``fast``: 'auto' enables bfloat16
+    when the CPU supports it natively, 'bf16' forces it and 'off' keeps
+    float32.
+    """
+    if not fast:
+        return TrainingConfig()
+
+    if os.environ.get('TF_ENABLE_ONEDNN_OPTS') == '0':
+        print("Warning: TF_ENABLE_ONEDNN_OPTS=0 disables the oneDNN CPU kernels")
+
+    if mixed_precision == 'auto':
+        mixed_precision = 'bf16' if cpu_supports_bfloat16() else 'off'
+
+    import tensorflow as tf
+
+    config = TrainingConfig(fast=True, mixed_precision=mixed_precision)
+    tf.keras.mixed_precision.set_global_policy(config.policy)
+
+    print(f"Fast training mode: jit_compile=True, dtype policy {config.policy}")
+    return config
+
+def float32_model(model: 'tf.keras.Model', config: TrainingConfig) -> 'tf.keras.Model':
+    """Return a float32 copy of a mixed-precision model for export
+
+    TFLite has no bfloat16 kernels. Mixed-precision variables are already
+    float32, so the copy only changes the layers' compute dtype.
+    """
+    if config.policy == 'float32':
+        return model
+
+    import tensorflow as tf
+
+    def clone_layer(layer):
+        return layer.__class__.from_config({**layer.get_config(), 'dtype': 'float32'})
+
+    clone = tf.keras.models.clone_model(model, clone_function=clone_layer)
+    clone.set_weights(model.get_weights())
+    return clone
+
+def add_fast_training_arguments(parser, recurrent_dropout: bool = False):
+    """Add the --fast/--mixed-precision options shared by the trainers
+
+    Pass ``recurrent_dropout=True`` only for trainers whose LSTMs set
+    recurrent dropout. Only for those does --fast switch to the fused LSTM
+    kernel, and the help text says so.
+    """
+    if recurrent_dropout:
+        fast_help = ("Compile with XLA, drop recurrent dropout so LSTMs use the fused kernel, and use bfloat16 "
+                     "where supported")
+    else:
+        fast_help = "Compile with XLA and use bfloat16 where supported (the LSTMs already use the fused kernel)"
+    parser.add_argument('--fast', action='store_true', help=fast_help)
+    parser.add_argument('--mixed-precision', choices=MIXED_PRECISION_CHOICES, default='auto',
+                        help="bfloat16 mixed precision in --fast mode (auto: only on CPUs with native bf16)")
+
+def _define_epoch_timer():
+    import tensorflow as tf
+
+    class EpochTimer(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.epoch_times: List[float] = []
+            self._start = None
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.epoch_times.append(time.perf_counter() - self._start)
+
+        def summary(self) -> Dict:
+            """Per-epoch wall times; the first epoch includes tracing/XLA compilation"""
+            times = self.epoch_times
+            steady = times[1:] or times
+            return {
+                'epoch_seconds': [round(t, 3) for t in times],
+                'first_epoch_seconds': round(times[0], 3) if times else None,
+                'mean_epoch_seconds': round(sum(steady) / len(steady), 3) if steady else None
+            }
+
+    return EpochTimer
+
+def __getattr__(name):
+    # EpochTimer subclasses a Keras callback, so the class is created (and
+    # TensorFlow imported) on first access
+    if name == 'EpochTimer':
+        globals()['EpochTimer'] = _define_epoch_timer()
+        return globals()['EpochTimer']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def record_epoch_times(trainer_name: str, config: TrainingConfig, timer: 'EpochTimer',
+                       path: str = EPOCH_TIMINGS_FILE) -> Dict:
+    """Append this run's epoch timings to ``path`` and print a summary"""
+    entry = {
+        'trainer': trainer_name,
+        'configuration': config.describe(),
+        'timestamp': datetime.now().isoformat(),
+        **timer.summary()
+    }
+
+    runs = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            runs = json.load(f)
+    runs.append(entry)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(runs, f, indent=2)
+
+    print(f"Epoch time: {entry['mean_epoch_seconds']}s mean "
+          f"(first epoch {entry['first_epoch_seconds']}s), recorded in {path}")
+    return entry
@@ -4,11 +4,25 @@ Medical Chatbot Training Data Generator
 Generates comprehensive training data for medical query classification
 """
 
+import argparse
+import hashlib
 import json
 import random
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict
 import os
 
+import text_normalization
+from dataset_cache import DatasetCache, add_cache_arguments, cache_from_args, cache_key, hash_file
+from dataset_shards import DEFAULT_SHARD_SIZE, write_tsv_shards
+from sample_dedup import DEDUP_METHODS, deduplicate_samples, format_dedup_stats
+from text_normalization import normalize_text, normalize_texts
+from vocabulary_builder import StreamingVocabularyBuilder, split_tokens
+
+# Samples generated per task; fixed so the split into seeded chunks (and
+# therefore the output) does not depend on the number of workers
+GENERATION_CHUNK_SIZE = 5000
+
 class MedicalChatbotDataGenerator:
     def __init__(self):
         self.categories = {
@@ -35,6 +49,9 @@ class MedicalChatbotDataGenerator:
         
         # Medical patterns for each category
         self.medical_patterns = self._initialize_medical_patterns()
+        
+        # Set by generate_training_data when deduplication is enabled
+        self.dedup_stats = None
     
     def _initialize_medical_patterns(self) -> Dict[int, Dict]:
         """Initialize medical patterns for each category"""
@@ -636,54 +653,47 @@ class MedicalChatbotDataGenerator:
         
         return patterns
 
-    def generate_training_data(self, samples_per_category: int = 200) -> List[Dict]:
-        """Generate comprehensive training data"""
+    def generate_training_data(self, samples_per_category: int = 200, seed: int = None,
+                               workers: int = 1, dedup: str = 'none') -> List[Dict]:
+        """Generate comprehensive training data
+        
+        Each category is generated in fixed-size chunks, and every chunk gets
+        its own random.Random seeded from ``seed``, the category and the chunk
+        index. With ``workers > 1`` the chunks are spread over a process pool;
+        the output for a given seed is identical for any number of workers.
+        
+        Templates are filled with random.choice, so the same text comes up
+        many times; ``dedup`` ('hash' or 'bloom') keeps only its first
+        occurrence.
+        """
         training_data = []
         
         print(f"Generating {samples_per_category} samples per category...")
         
-        for category_id, category_info in self.medical_patterns.items():
+        if seed is None:
+            seed = random.randrange(2 ** 63)
+        
+        tasks = []
+        for category_id in self.medical_patterns:
+            for chunk_index, start in enumerate(range(0, samples_per_category, GENERATION_CHUNK_SIZE)):
+                count = min(GENERATION_CHUNK_SIZE, samples_per_category - start)
+                tasks.append((category_id, count, _derive_seed(seed, category_id, chunk_index)))
+        
+        # Workers only send back texts; label/category are filled in here,
+        # which keeps the inter-process traffic small
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunks = list(executor.map(_generate_chunk, tasks))
+        else:
+            chunks = [self.generate_category_texts(*task) for task in tasks]
+        
+        for (category_id, _, _), texts in zip(tasks, chunks):
             category_name = self.reverse_categories[category_id]
-            
-            for i in range(samples_per_category):
-                # Randomly select generation method
-                method = random.choice(['pattern', 'keyword', 'variation'])
-                
-                if method == 'pattern':
-                    # Use pattern-based generation
-                    pattern = random.choice(category_info['patterns'])
-                    if '{symptom}' in pattern:
-                        symptom = random.choice(category_info['symptoms'])
-                        text = pattern.format(symptom=symptom)
-                    else:
-                        # Simple pattern without substitution
-                        keyword = random.choice(category_info['keywords'])
-                        text = f"{pattern} {keyword}"
-                        
-                elif method == 'keyword':
-                    # Keyword-based generation
-                    keyword = random.choice(category_info['keywords'])
-                    text = f"How to treat {keyword}?"
-                    
-                else:  # variation
-                    # Medical variation generation
-                    variations = [
-                        f"What should I do if someone has {category_name.replace('_', ' ')}?",
-                        f"Emergency response for {category_name.replace('_', ' ')}",
-                        f"First aid for {category_name.replace('_', ' ')}",
-                        f"Medical help for {category_name.replace('_', ' ')}",
-                        f"Emergency care when someone has {category_name.replace('_', ' ')}"
-                    ]
-                    text = random.choice(variations)
-                
-                # Clean and normalize text
-                text = self._normalize_text(text)
-                
-                training_data.append({
-                    'text': text,
-                    'label': category_id,
-                    'category': category_name
-                })
+            training_data.extend({
+                'text': text,
+                'label': category_id,
+                'category': category_name
+            } for text in texts)
         
         # Add some general medical queries
         general_queries = [
@@ -702,23 +712,102 @@ class MedicalChatbotDataGenerator:
         # Assign these to a general emergency category (using cardiac arrest as default)
         for query in general_queries:
             training_data.append({
-                'text': self._normalize_text(query),
+                'text': normalize_text(query),
                 'label': 0,  # Default to cardiac arrest
                 'category': 'general_emergency'
             })
         
+        unique, deduplicator = deduplicate_samples(training_data, dedup)
+        training_data = list(unique)
+        self.dedup_stats = deduplicator.stats() if deduplicator else None
+        if self.dedup_stats:
+            print(format_dedup_stats(self.dedup_stats))
+        
         print(f"Generated {len(training_data)} training samples")
         return training_data
 
-    def _normalize_text(self, text: str) -> str:
-        """Clean and normalize text"""
-        # Remove extra spaces
-        text = ' '.join(text.split())
-        # Convert to lowercase for consistency
-        text = text.lower()
-        # Remove trailing punctuation
-        text = text.strip('.,!?')
-        return text
+    def dataset_cache_key(self, samples_per_category: int, seed: int, dedup: str = 'none') -> str:
+        """Content hash of everything generate_training_data depends on
+        
+        The worker count is not part of the key because it does not change
+        the output.
+        """
+        return cache_key(
+            'generate_training_data.training_data',
+            samples_per_category=samples_per_category,
+            seed=seed,
+            dedup=dedup,
+            chunk_size=GENERATION_CHUNK_SIZE,
+            categories=self.categories,
+            medical_patterns=self.medical_patterns,
+            generator_source=hash_file(__file__),
+            normalization_source=hash_file(text_normalization.__file__)
+        )
+
+    def load_or_generate_training_data(self, samples_per_category: int = 200, seed: int = None,
+                                       workers: int = 1, dedup: str = 'none',
+                                       cache: DatasetCache = None) -> List[Dict]:
+        """Return cached training data for unchanged inputs, generating it otherwise
+        
+        Only seeded runs are cached, since an unseeded run is meant to differ
+        every time.
+        """
+        if cache is None or seed is None:
+            return self.generate_training_data(samples_per_category, seed=seed, workers=workers, dedup=dedup)
+        
+        key = self.dataset_cache_key(samples_per_category, seed, dedup)
+        cached = cache.get_json(key)
+        if cached is not None:
+            self.dedup_stats = cached['dedup_stats']
+            print(f"Loaded {len(cached['training_data'])} training samples from cache ({key[:12]})")
+            return cached['training_data']
+        
+        training_data = self.generate_training_data(samples_per_category, seed=seed, workers=workers, dedup=dedup)
+        cache.put_json(key, {'training_data': training_data, 'dedup_stats': self.dedup_stats})
+        return training_data
+
+    def generate_category_texts(self, category_id: int, count: int, seed: int) -> List[str]:
+        """Generate ``count`` texts for one category from its own seeded RNG"""
+        rng = random.Random(seed)
+        category_info = self.medical_patterns[category_id]
+        category_name = self.reverse_categories[category_id]
+        texts = []
+        
+        for i in range(count):
+            # Randomly select generation method
+            method = rng.choice(['pattern', 'keyword', 'variation'])
+            
+            if method == 'pattern':
+                # Use pattern-based generation
+                pattern = rng.choice(category_info['patterns'])
+                if '{symptom}' in pattern:
+                    symptom = rng.choice(category_info['symptoms'])
+                    text = pattern.format(symptom=symptom)
+                else:
+                    # Simple pattern without substitution
+                    keyword = rng.choice(category_info['keywords'])
+                    text = f"{pattern} {keyword}"
+                    
+            elif method == 'keyword':
+                # Keyword-based generation
+                keyword = rng.choice(category_info['keywords'])
+                text = f"How to treat {keyword}?"
+                
+            else:  # variation
+                # Medical variation generation
+                variations = [
+                    f"What should I do if someone has {category_name.replace('_', ' ')}?",
+                    f"Emergency response for {category_name.replace('_', ' ')}",
+                    f"First aid for {category_name.replace('_', ' ')}",
+                    f"Medical help for {category_name.replace('_', ' ')}",
+                    f"Emergency care when someone has {category_name.replace('_', ' ')}"
+                ]
+                text = rng.choice(variations)
+            
+            texts.append(text)
+        
+        # Clean and normalize text
+        return normalize_texts(texts)
 
     def save_training_data(self, training_data: List[Dict], output_path: str):
         """Save training data to JSON file"""
@@ -729,6 +818,8 @@ class MedicalChatbotDataGenerator:
         
         print(f"Training data saved to: {output_path}")
         print(f"Total samples: {len(training_data)}")
+        if self.dedup_stats:
+            print(format_dedup_stats(self.dedup_stats))
         
         # Print distribution
         label_counts = {}
@@ -743,19 +834,11 @@ class MedicalChatbotDataGenerator:
             category_name = self.reverse_categories.get(label_id, f"Unknown_{label_id}")
             print(f"  {category_name}: {count} samples")
 
-    def create_vocabulary(self, training_data: List[Dict]) -> Dict[str, int]:
-        """Create vocabulary from training data"""
-        vocab = {'<PAD>': 0, '<UNK>': 1, '<START>': 2, '<END>': 3}
-        vocab_size = 4
-        
-        for item in training_data:
-            words = item['text'].split()
-            for word in words:
-                if word not in vocab:
-                    vocab[word] = vocab_size
-                    vocab_size += 1
-        
-        return vocab
+    def create_vocabulary(self, training_data: List[Dict], workers: int = 1) -> Dict[str, int]:
+        """Create vocabulary from training data (words in first-seen order)"""
+        builder = StreamingVocabularyBuilder(tokenize=split_tokens)
+        builder.count_texts((item['text'] for item in training_data), workers=workers)
+        return builder.build(by_frequency=False)
 
     def save_vocabulary(self, vocab: Dict[str, int], output_path: str):
         """Save vocabulary to JSON file"""
@@ -767,23 +850,60 @@ class MedicalChatbotDataGenerator:
         print(f"Vocabulary saved to: {output_path}")
         print(f"Vocabulary size: {len(vocab)}")
 
+def _derive_seed(seed: int, category_id: int, chunk_index: int) -> int:
+    """Derive a stable per-chunk seed from the master seed"""
+    digest = hashlib.sha256(f"{seed}:{category_id}:{chunk_index}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+_worker_generator = None
+
+def _generate_chunk(task) -> List[str]:
+    """Process pool entry point; reuses one generator per worker process"""
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = MedicalChatbotDataGenerator()
+    return _worker_generator.generate_category_texts(*task)
+
 def main():
     """Main function to generate training data"""
+    parser = argparse.ArgumentParser(description="Generate medical chatbot training data")
+    parser.add_argument('--samples-per-category', type=int, default=200,
+                        help="Samples to generate per category")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Master seed; output is identical for a given seed regardless of --workers")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes used to generate categories in parallel")
+    parser.add_argument('--tsv-shards', metavar='DIR',
+                        help="Also write the samples as TSV shards for streaming training")
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help="Samples per TSV shard")
+    parser.add_argument('--dedup', choices=DEDUP_METHODS, default='none',
+                        help="Drop repeated samples with an exact hash set or a Bloom filter (for huge runs)")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    
     generator = MedicalChatbotDataGenerator()
     
     # Configuration
-    samples_per_category = 200  # Adjust based on your needs
+    samples_per_category = args.samples_per_category
     output_dir = "data"
     
-    # Generate training data
-    training_data = generator.generate_training_data(samples_per_category)
+    # Generate training data (seeded runs are reused from the cache when the inputs are unchanged)
+    training_data = generator.load_or_generate_training_data(samples_per_category, seed=args.seed,
+                                                             workers=args.workers, dedup=args.dedup,
+                                                             cache=cache_from_args(args))
+    
+    if args.tsv_shards:
+        write_tsv_shards(training_data, args.tsv_shards, shard_size=args.shard_size, metadata={
+            'categories': generator.categories,
+            'reverse_categories': generator.reverse_categories
+        })
     
     # Save training data
     training_output = os.path.join(output_dir, "medical_training_data.json")
     generator.save_training_data(training_data, training_output)
     
     # Create and save vocabulary
-    vocab = generator.create_vocabulary(training_data)
+    vocab = generator.create_vocabulary(training_data, workers=args.workers)
     vocab_output = os.path.join(output_dir, "vocabulary.json")
     generator.save_vocabulary(vocab, vocab_output)
     
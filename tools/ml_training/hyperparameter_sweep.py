@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Hyperparameter Sweep for VitalAid
+Trains medical classifier variants over a grid or random search space in a process pool and ranks them
+"""
+
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List
+
+from dataset_cache import add_cache_arguments, cache_from_args
+from fast_training import add_fast_training_arguments
+
+DEFAULT_OUTPUT_DIR = 'sweeps/latest'
+SHARED_DATA_DIR = 'data'
+LEADERBOARD_FILE = 'leaderboard.json'
+
+# Single-query TFLite calls timed per trial (after the same number of warmup calls)
+LATENCY_RUNS = 200
+
+# (option, key, type) of every swept setting; defaults come from
+# train_classification_model.HYPERPARAMETERS, except the sequence length
+# prepare_data.py chose
+SEARCH_OPTIONS = [
+    ('--vocab-size', 'vocab_size', int),
+    ('--max-sequence-length', 'max_sequence_length', int),
+    ('--embedding-dim', 'embedding_dim', int),
+    ('--hidden-units', 'hidden_units', int),
+    ('--batch-size', 'batch_size', int),
+    ('--dropout-rate', 'dropout_rate', float)
+]
+
+def grid_trials(space: Dict[str, List]) -> List[Dict]:
+    """Every combination of the values in ``space``"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+def random_trials(space: Dict[str, List], num_trials: int, seed: int) -> List[Dict]:
+    """``num_trials`` distinct combinations drawn uniformly (all of them if the grid is smaller)"""
+    trials = grid_trials(space)
+    if num_trials >= len(trials):
+        return trials
+    return random.Random(seed).sample(trials, num_trials)
+
+def prepare_shared_data(output_dir: str, space: Dict[str, List], cache=None) -> Dict:
+    """Tokenize once for the whole sweep and save the split as .npy files
+
+    Texts are tokenized with the largest vocabulary and sequence length in
+    the space. A trial with a smaller vocabulary maps IDs at or above its
+    size to the OOV index, and a shorter length keeps the leading columns,
+    which is exactly what a Tokenizer fitted with those settings produces.
+    Workers memory-map the files read-only, so the data is neither
+    re-tokenized nor pickled per trial.
+    """
+    import numpy as np
+
+    from train_classification_model import load_medical_data, preprocess_texts, split_data
+
+    texts, labels = load_medical_data()
+    unique_labels = sorted(set(labels))
+    label_to_idx = {label: idx for idx, label in enumerate(unique_labels)}
+
+    X, tokenizer = preprocess_texts(texts, cache=cache, vocab_size=max(space['vocab_size']),
+                                    max_sequence_length=max(space['max_sequence_length']))
+    y = np.array([label_to_idx[label] for label in labels], dtype=np.int32)
+    X_train, X_val, y_train, y_val = split_data(X, y)
+
+    data_dir = os.path.join(output_dir, SHARED_DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+    arrays = {'X_train': X_train, 'y_train': y_train, 'X_val': X_val, 'y_val': y_val}
+    for name, array in arrays.items():
+        np.save(os.path.join(data_dir, f'{name}.npy'), np.ascontiguousarray(array, dtype=np.int32))
+
+    return {
+        'data_dir': data_dir,
+        'vocab_size': max(space['vocab_size']),
+        'num_classes': len(unique_labels),
+        'oov_index': tokenizer.word_index[tokenizer.oov_token],
+        'train_samples': len(X_train),
+        'validation_samples': len(X_val)
+    }
+
+def limit_threads(threads: int):
+    """Pool initializer: cap every thread pool a trial can start
+
+    The environment variables cover OpenMP/oneDNN and must be set before
+    TensorFlow is imported, which is why this module only imports it
+    inside trials.
+    """
+    for variable in ('OMP_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[variable] = str(threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+def trial_inputs(data: Dict, hyperparameters: Dict):
+    """The trial's view of the shared arrays"""
+    import numpy as np
+
+    def load(name):
+        return np.load(os.path.join(data['data_dir'], f'{name}.npy'), mmap_mode='r')
+
+    def view(X):
+        X = X[:, :hyperparameters['max_sequence_length']]
+        # Only a smaller vocabulary needs a copy; otherwise the slice stays mapped
+        if hyperparameters['vocab_size'] < data['vocab_size']:
+            X = np.where(X >= hyperparameters['vocab_size'], data['oov_index'], X)
+        return X
+
+    return view(load('X_train')), load('y_train'), view(load('X_val')), load('y_val')
+
+def tflite_latency(tflite_model: bytes, X, threads: int) -> Dict:
+    """Single-query latency of the converted model on validation rows"""
+    import numpy as np
+    import tensorflow as tf
+
+    from benchmark_utils import latency_stats
+
+    interpreter = tf.lite.Interpreter(model_content=tflite_model, num_threads=threads)
+    input_detail = interpreter.get_input_details()[0]
+    if list(input_detail['shape'][:1]) != [1]:
+        interpreter.resize_tensor_input(input_detail['index'], [1, X.shape[1]])
+    interpreter.allocate_tensors()
+
+    rows = [np.asarray(X[i % len(X)][None], dtype=input_detail['dtype']) for i in range(LATENCY_RUNS)]
+    times = []
+    for timed in (False, True):
+        for row in rows:
+            start = time.perf_counter()
+            interpreter.set_tensor(input_detail['index'], row)
+            interpreter.invoke()
+            if timed:
+                times.append(time.perf_counter() - start)
+    return latency_stats(times)
+
+def run_trial(trial_id: int, hyperparameters: Dict, data: Dict, args: Dict) -> Dict:
+    """Train, evaluate, convert and time one configuration in a pool worker
+
+    Training output goes to the trial's train.log. Errors are returned in
+    the result instead of raised, so one bad configuration does not end
+    the sweep.
+    """
+    trial_dir = os.path.join(args['output_dir'], f'trial_{trial_id:03d}')
+    os.makedirs(trial_dir, exist_ok=True)
+    result = {'trial': trial_id, 'hyperparameters': hyperparameters}
+
+    with open(os.path.join(trial_dir, 'train.log'), 'w', encoding='utf-8') as log, \
+            contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            from fast_training import EpochTimer, configure_training, float32_model
+            from tflite_conversion import convert_keras_model
+            from train_classification_model import create_classification_model, fit_model
+
+            X_train, y_train, X_val, y_val = trial_inputs(data, hyperparameters)
+            training_config = configure_training(args['fast'], args['mixed_precision'])
+            epoch_timer = EpochTimer()
+
+            start = time.perf_counter()
+            model = create_classification_model(data['num_classes'], training_config, hyperparameters)
+            history = fit_model(model, X_train, y_train, X_val, y_val, epoch_timer,
+                                batch_size=hyperparameters['batch_size'], epochs=args['epochs'])
+            train_seconds = time.perf_counter() - start
+
+            # EarlyStopping restored the best weights, so this is the best epoch's accuracy
+            val_loss, val_accuracy = model.evaluate(X_val, y_val, verbose=0)
+            tflite_model = convert_keras_model(float32_model(model, training_config),
+                                               builtin_only=args['builtin_ops'])
+            tflite_path = os.path.join(trial_dir, 'model.tflite')
+            with open(tflite_path, 'wb') as f:
+                f.write(tflite_model)
+
+            result.update({
+                'val_accuracy': round(float(val_accuracy), 4),
+                'val_loss': round(float(val_loss), 4),
+                'epochs_trained': len(history.history['loss']),
+                'train_seconds': round(train_seconds, 1),
+                'tflite_size_bytes': len(tflite_model),
+                'latency': tflite_latency(tflite_model, X_val, args['threads_per_trial']),
+                'epoch_timing': epoch_timer.summary(),
+                'tflite_path': tflite_path
+            })
+        except Exception as e:
+            traceback.print_exc()
+            result['error'] = f"{type(e).__name__}: {e}"
+
+    return result
+
+def rank_trials(results: List[Dict]) -> List[Dict]:
+    """Successful trials by accuracy, then size and latency, flagging the Pareto front
+
+    A trial is on the front when no other trial is at least as accurate,
+    as small and as fast, and strictly better in one of them.
+    """
+    def objectives(result):
+        return (-result['val_accuracy'], result['tflite_size_bytes'], result['latency']['p50_ms'])
+
+    ranked = sorted((result for result in results if 'error' not in result), key=objectives)
+    for result in ranked:
+        mine = objectives(result)
+        result['pareto_optimal'] = not any(
+            other is not result and all(o <= m for o, m in zip(objectives(other), mine))
+            and objectives(other) != mine
+            for other in ranked
+        )
+    for rank, result in enumerate(ranked, 1):
+        result['rank'] = rank
+    return ranked
+
+def print_leaderboard(ranked: List[Dict], failed: List[Dict]):
+    keys = [key for _, key, _ in SEARCH_OPTIONS]
+    print(f"\n{'Rank':>4} {'Trial':>5} {'Val acc':>8} {'Size (KB)':>10} {'p50 (ms)':>9}  Hyperparameters")
+    for result in ranked:
+        settings = ' '.join(f"{key}={result['hyperparameters'][key]}" for key in keys)
+        marker = '*' if result['pareto_optimal'] else ' '
+        print(f"{result['rank']:>4} {result['trial']:>5} {result['val_accuracy']:>8.4f} "
+              f"{result['tflite_size_bytes'] / 1024:>10.1f} {result['latency']['p50_ms']:>9.3f}{marker} {settings}")
+    print("* Pareto-optimal in accuracy, TFLite size and latency")
+    for result in failed:
+        print(f"Trial {result['trial']} failed: {result['error']}")
+
+def main():
+    """Run the hyperparameter sweep"""
+    from sequence_length import load_max_sequence_length
+    from train_classification_model import EPOCHS, HYPERPARAMETERS
+
+    defaults = dict(HYPERPARAMETERS)
+    defaults['max_sequence_length'] = load_max_sequence_length() or defaults['max_sequence_length']
+
+    parser = argparse.ArgumentParser(
+        description="Sweep the medical classifier's hyperparameters; pass several values per option to search them")
+    for option, key, value_type in SEARCH_OPTIONS:
+        parser.add_argument(option, dest=key, type=value_type, nargs='+', default=[defaults[key]],
+                            help=f"Values to try (default: {defaults[key]})")
+    parser.add_argument('--search', choices=('grid', 'random'), default='grid',
+                        help="Try every combination, or --trials random ones")
+    parser.add_argument('--trials', type=int, default=10, help="Combinations sampled by --search random")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for --search random")
+    parser.add_argument('--epochs', type=int, default=EPOCHS, help="Maximum epochs per trial (early stopping applies)")
+    parser.add_argument('--threads-per-trial', type=int, default=2,
+                        help="Intra-op threads for each trial's training and TFLite timing")
+    parser.add_argument('--workers', type=int,
+                        help="Trials run at once (default: CPU count / --threads-per-trial)")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help="Shared data, per-trial models/logs and the leaderboard")
+    parser.add_argument('--builtin-ops', action='store_true', help="Convert trials with TFLite builtin ops only")
+    add_fast_training_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+
+    space = {key: sorted(set(getattr(args, key))) for _, key, _ in SEARCH_OPTIONS}
+    trials = grid_trials(space) if args.search == 'grid' else random_trials(space, args.trials, args.seed)
+    workers = args.workers or max(1, (os.cpu_count() or 1) // args.threads_per_trial)
+    workers = min(workers, len(trials))
+    print(f"{len(trials)} trials ({args.search} search), {workers} workers x {args.threads_per_trial} threads")
+
+    data = prepare_shared_data(args.output_dir, space, cache_from_args(args))
+    trial_args = {
+        'output_dir': args.output_dir,
+        'epochs': args.epochs,
+        'threads_per_trial': args.threads_per_trial,
+        'fast': args.fast,
+        'mixed_precision': args.mixed_precision,
+        'builtin_ops': args.builtin_ops
+    }
+
+    # Spawned workers start without the parent's TensorFlow state, so the
+    # thread limits apply before their first import
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=limit_threads, initargs=(args.threads_per_trial,)) as executor:
+        futures = [executor.submit(run_trial, trial_id, hyperparameters, data, trial_args)
+                   for trial_id, hyperparameters in enumerate(trials)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = result.get('error') or f"val_accuracy={result['val_accuracy']:.4f}"
+            print(f"[{len(results)}/{len(trials)}] trial {result['trial']}: {status}")
+
+    ranked = rank_trials(results)
+    failed = sorted((result for result in results if 'error' in result), key=lambda result: result['trial'])
+    print_leaderboard(ranked, failed)
+
+    leaderboard = {
+        'search': args.search,
+        'space': space,
+        'workers': workers,
+        'threads_per_trial': args.threads_per_trial,
+        'shared_data': data,
+        'sweep_seconds': round(time.perf_counter() - start, 1),
+        'trials': ranked,
+        'failed': failed
+    }
+    leaderboard_path = os.path.join(args.output_dir, LEADERBOARD_FILE)
+    with open(leaderboard_path, 'w', encoding='utf-8') as f:
+        json.dump(leaderboard, f, indent=2)
+    print(f"\nLeaderboard saved to {leaderboard_path}")
+
+if __name__ == "__main__":
+    main()
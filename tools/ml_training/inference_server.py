@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Micro-Batching Inference Server for VitalAid
+Serves the trained TFLite classifier over HTTP, batching concurrent requests across an interpreter pool
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from prediction_cache import DEFAULT_CACHE_ENTRIES, PredictionCache
+from tflite_inference import TFLiteClassifier
+
+DEFAULT_MODEL = '../assets/models/medical_classifier_trained.tflite'
+DEFAULT_TOKENIZER = '../assets/models/tokenizer.json'
+DEFAULT_LABELS = '../assets/models/labels.json'
+
+MAX_BODY_BYTES = 1024 * 1024
+
+class InterpreterPool:
+    def __init__(self, model_path: str, tokenizer_path: str, labels_path: Optional[str], workers: int,
+                 cache: Optional[PredictionCache] = None):
+        """One TFLite interpreter per worker thread
+
+        Interpreters are not thread-safe, so each thread owns its own;
+        invoke() releases the GIL, so batches on different threads run on
+        different cores. All interpreters share ``cache``.
+        """
+        self.model_path = model_path
+        self.tokenizer_path = tokenizer_path
+        self.labels_path = labels_path
+        self.workers = workers
+        self.cache = cache
+        self._local = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=workers, initializer=self._init_worker,
+                                           thread_name_prefix='tflite')
+
+    def _init_worker(self):
+        self._local.classifier = TFLiteClassifier(self.model_path, self.tokenizer_path, self.labels_path,
+                                                  num_threads=1, cache=self.cache)
+
+    def _predict(self, texts: List[str]) -> List[Dict]:
+        return self._local.classifier.predict_batch(texts)
+
+    async def predict_batch(self, texts: List[str]) -> List[Dict]:
+        """Classify a batch on the next free interpreter"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self._predict, texts)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+class MicroBatcher:
+    def __init__(self, predict_batch: Callable[[List[str]], Awaitable[List[Dict]]],
+                 max_batch_size: int = 32, max_delay_ms: float = 5.0, max_in_flight: int = 1):
+        """Group concurrent single-text requests into batches
+
+        A batch is dispatched when it reaches ``max_batch_size`` or when
+        ``max_delay_ms`` has passed since its first request, whichever comes
+        first. At most ``max_in_flight`` batches run at once (one per
+        interpreter); further requests keep queueing and form larger batches.
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.requests = 0
+        self.batches = 0
+        self._task = None
+        # In-flight _dispatch tasks; the loop only keeps weak references
+        self._tasks: Set[asyncio.Task] = set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop collecting batches and wait for the in-flight ones to finish"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def submit(self, text: str) -> Dict:
+        """Queue one text and wait for its prediction"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((text, future))
+        return await future
+
+    async def _collect(self) -> List:
+        """Wait for a first request, then fill the batch until it is full or the deadline passes"""
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_batch_size:
+            # Take whatever is already queued without waiting
+            while len(batch) < self.max_batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            remaining = deadline - loop.time()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            await self.slots.acquire()
+            batch = await self._collect()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch: List):
+        try:
+            results = await self.predict_batch([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.requests += len(batch)
+            self.batches += 1
+            self.slots.release()
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0.0,
+            'queued': self.queue.qsize()
+        }
+
+class InferenceServer:
+    def __init__(self, batcher: MicroBatcher, cache: Optional[PredictionCache] = None):
+        self.batcher = batcher
+        self.cache = cache
+        self.started = time.time()
+
+    async def handle_request(self, method: str, path: str, body: bytes):
+        """Return (status, payload) for one HTTP request"""
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok'}
+        if method == 'GET' and path == '/stats':
+            stats = {**self.batcher.stats(), 'uptime_seconds': round(time.time() - self.started, 1)}
+            if self.cache is not None:
+                stats['cache'] = self.cache.stats()
+            return 200, stats
+        if method != 'POST' or path != '/predict':
+            return 404, {'error': f"No route for {method} {path}"}
+
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return 400, {'error': "Body must be JSON"}
+
+        usage = {'error': "Expected {\"text\": ...} or {\"texts\": [...]}"}
+        if not isinstance(request, dict):
+            return 400, usage
+
+        try:
+            if isinstance(request.get('text'), str):
+                return 200, await self.batcher.submit(request['text'])
+            if isinstance(request.get('texts'), list):
+                # Each text joins the shared batches, so large requests do not block small ones
+                predictions = await asyncio.gather(*(self.batcher.submit(str(text)) for text in request['texts']))
+                return 200, {'predictions': predictions}
+        except Exception as e:
+            # _dispatch sets a failed batch's exception on each of its requests
+            return 500, {'error': f"Prediction failed: {e}"}
+        return 400, usage
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Minimal HTTP/1.1 with keep-alive"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {'error': "Request body too large"}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, payload = await self.handle_request(method, path, body)
+                    keep_alive = headers.get('connection', '').lower() != 'close'
+
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(args):
+    cache = PredictionCache(args.cache_size, args.cache_ttl) if args.cache_size else None
+    pool = InterpreterPool(args.model, args.tokenizer, args.labels, args.workers, cache)
+    batcher = MicroBatcher(pool.predict_batch, args.max_batch_size, args.max_delay_ms, max_in_flight=args.workers)
+    batcher.start()
+
+    server = await asyncio.start_server(InferenceServer(batcher, cache).handle_connection, args.host, args.port)
+    print(f"Serving {args.model} on http://{args.host}:{args.port} "
+          f"({args.workers} interpreters, batch <= {args.max_batch_size}, delay <= {args.max_delay_ms} ms)")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await batcher.stop()
+        pool.shutdown()
+
+def main():
+    """Run the inference server"""
+    parser = argparse.ArgumentParser(description="Serve the VitalAid classifier with micro-batching")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help=".tflite model from train_classification_model.py")
+    parser.add_argument('--tokenizer', default=DEFAULT_TOKENIZER, help="Tokenizer JSON saved with the model")
+    parser.add_argument('--labels', default=DEFAULT_LABELS, help="labels.json saved with the model")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8500)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Interpreters (threads) in the pool")
+    parser.add_argument('--max-batch-size', type=int, default=32, help="Largest batch sent to one interpreter")
+    parser.add_argument('--max-delay-ms', type=float, default=5.0,
+                        help="Longest a request waits for its batch to fill")
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help="Cached predictions (0 disables the cache)")
+    parser.add_argument('--cache-ttl', type=float, help="Seconds before a cached prediction expires")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("Server stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Keyword Automaton for VitalAid
+Compiles the generators' category keywords into one Aho-Corasick automaton stored as flat arrays
+"""
+
+import argparse
+import json
+from collections import deque
+from typing import Dict, List
+
+from text_normalization import normalize_text
+
+DEFAULT_AUTOMATON_PATH = '../assets/models/keyword_automaton.json'
+AUTOMATON_VERSION = 1
+
+def collect_category_keywords() -> Dict[str, List[str]]:
+    """Normalized keywords per category from both generator keyword tables
+
+    MedicalDataPreparator.medical_data and
+    MedicalChatbotDataGenerator._initialize_medical_patterns use the same
+    category names; their keyword lists are merged.
+    """
+    from generate_training_data import MedicalChatbotDataGenerator
+    from prepare_data import MedicalDataPreparator
+
+    generator = MedicalChatbotDataGenerator()
+    category_keywords = {name: [] for name, _ in sorted(generator.categories.items(), key=lambda item: item[1])}
+
+    for name, data in MedicalDataPreparator(data_dir='data').medical_data.items():
+        category_keywords.setdefault(name, []).extend(data['keywords'])
+    for label, pattern in generator.medical_patterns.items():
+        category_keywords[generator.reverse_categories[label]].extend(pattern['keywords'])
+
+    for name, keywords in category_keywords.items():
+        normalized = (normalize_text(keyword) for keyword in keywords)
+        category_keywords[name] = list(dict.fromkeys(keyword for keyword in normalized if keyword))
+    return category_keywords
+
+def build_automaton(category_keywords: Dict[str, List[str]]) -> Dict:
+    """Aho-Corasick automaton as a dense transition table
+
+    Characters are mapped to classes (class 0 is every character that
+    appears in no keyword). Failure links are folded into the transitions,
+    so matching is one table lookup per character. ``output_offsets`` /
+    ``output_keywords`` list the keywords ending in each state (including
+    those reached through failure links); ``keyword_offsets`` /
+    ``keyword_categories`` list the categories of each keyword.
+    """
+    categories = list(category_keywords)
+    keyword_categories: Dict[str, List[int]] = {}
+    for category_id, name in enumerate(categories):
+        for keyword in category_keywords[name]:
+            keyword_categories.setdefault(keyword, []).append(category_id)
+    keywords = sorted(keyword_categories)
+
+    alphabet = ''.join(sorted({char for keyword in keywords for char in keyword}))
+    char_class = {char: position + 1 for position, char in enumerate(alphabet)}
+    num_classes = len(alphabet) + 1
+
+    # Trie
+    goto: List[Dict[int, int]] = [{}]
+    outputs: List[List[int]] = [[]]
+    for keyword_id, keyword in enumerate(keywords):
+        state = 0
+        for char in keyword:
+            cls = char_class[char]
+            if cls not in goto[state]:
+                goto.append({})
+                outputs.append([])
+                goto[state][cls] = len(goto) - 1
+            state = goto[state][cls]
+        outputs[state].append(keyword_id)
+
+    # Breadth-first failure links, folded into a full transition table
+    transitions = [0] * (len(goto) * num_classes)
+    failure = [0] * len(goto)
+    queue = deque()
+    for cls, child in goto[0].items():
+        transitions[cls] = child
+        queue.append(child)
+
+    while queue:
+        state = queue.popleft()
+        outputs[state] = outputs[state] + outputs[failure[state]]
+        row = state * num_classes
+        fallback = failure[state] * num_classes
+        for cls in range(num_classes):
+            child = goto[state].get(cls)
+            if child is None:
+                transitions[row + cls] = transitions[fallback + cls]
+            else:
+                failure[child] = transitions[fallback + cls]
+                transitions[row + cls] = child
+                queue.append(child)
+
+    output_offsets = [0]
+    output_keywords = []
+    for state_outputs in outputs:
+        output_keywords.extend(state_outputs)
+        output_offsets.append(len(output_keywords))
+
+    keyword_offsets = [0]
+    flat_categories = []
+    for keyword in keywords:
+        flat_categories.extend(keyword_categories[keyword])
+        keyword_offsets.append(len(flat_categories))
+
+    return {
+        'version': AUTOMATON_VERSION,
+        'categories': categories,
+        'keywords': keywords,
+        'alphabet': alphabet,
+        'num_states': len(goto),
+        'num_classes': num_classes,
+        'transitions': transitions,
+        'output_offsets': output_offsets,
+        'output_keywords': output_keywords,
+        'keyword_offsets': keyword_offsets,
+        'keyword_categories': flat_categories
+    }
+
+def save_automaton(automaton: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(automaton, f, separators=(',', ':'))
+
+class _ClassTable(dict):
+    def __missing__(self, key):
+        return '\0'
+
+class KeywordMatcher:
+    def __init__(self, automaton: Dict):
+        if automaton.get('version') != AUTOMATON_VERSION:
+            raise ValueError(f"Unsupported keyword automaton version {automaton.get('version')!r}")
+        self.categories = automaton['categories']
+        self.keywords = automaton['keywords']
+        self.num_classes = automaton['num_classes']
+        self.transitions = automaton['transitions']
+        self.output_offsets = automaton['output_offsets']
+        self.output_keywords = automaton['output_keywords']
+
+        offsets = automaton['keyword_offsets']
+        flat_categories = automaton['keyword_categories']
+        self.keyword_categories = [flat_categories[offsets[i]:offsets[i + 1]] for i in range(len(self.keywords))]
+
+        # str.translate turns a query into one class code per character;
+        # characters outside the alphabet become class 0
+        self._class_table = _ClassTable((ord(char), chr(position + 1))
+                                        for position, char in enumerate(automaton['alphabet']))
+
+    @classmethod
+    def load(cls, path: str) -> 'KeywordMatcher':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_keywords(cls, category_keywords: Dict[str, List[str]]) -> 'KeywordMatcher':
+        return cls(build_automaton(category_keywords))
+
+    def matched_keywords(self, text: str) -> List[int]:
+        """Ids of the distinct keywords occurring in the normalized text, in one pass"""
+        codes = normalize_text(text).translate(self._class_table)
+
+        transitions = self.transitions
+        output_offsets = self.output_offsets
+        num_classes = self.num_classes
+        found = {}
+        state = 0
+        for code in codes:
+            state = transitions[state * num_classes + ord(code)]
+            start = output_offsets[state]
+            end = output_offsets[state + 1]
+            if start != end:
+                for keyword_id in self.output_keywords[start:end]:
+                    found[keyword_id] = True
+        return list(found)
+
+    def score(self, text: str) -> Dict[str, int]:
+        """Number of distinct keywords of each category found in the text"""
+        scores = {}
+        for keyword_id in self.matched_keywords(text):
+            for category_id in self.keyword_categories[keyword_id]:
+                name = self.categories[category_id]
+                scores[name] = scores.get(name, 0) + 1
+        return scores
+
+    def classify(self, text: str):
+        """Best category by keyword count, or None when no keyword matches"""
+        scores = self.score(text)
+        return max(scores, key=scores.get) if scores else None
+
+def main():
+    """Compile the keyword automaton, or match a query against an existing one"""
+    parser = argparse.ArgumentParser(description="Build and query the category keyword automaton")
+    parser.add_argument('--output', default=DEFAULT_AUTOMATON_PATH, help="Where the automaton JSON is written")
+    parser.add_argument('--query', help="Score a query with the automaton at --output instead of building it")
+    args = parser.parse_args()
+
+    if args.query:
+        matcher = KeywordMatcher.load(args.output)
+        print(json.dumps({
+            'keywords': [matcher.keywords[keyword_id] for keyword_id in matcher.matched_keywords(args.query)],
+            'scores': matcher.score(args.query)
+        }, indent=2))
+        return
+
+    automaton = build_automaton(collect_category_keywords())
+    save_automaton(automaton, args.output)
+    print(f"Compiled {len(automaton['keywords'])} keywords from {len(automaton['categories'])} categories into "
+          f"{automaton['num_states']} states x {automaton['num_classes']} character classes -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Inference Server Load Test for VitalAid
+Drives inference_server.py with concurrent keep-alive clients sending phrases from the training data
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmark_utils import latency_stats, load_queries
+
+async def http_request(reader, writer, host, method, path, payload=None):
+    """Send one request on an open keep-alive connection and return (status, JSON body)"""
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+async def fetch_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, stats = await http_request(reader, writer, host, 'GET', '/stats')
+        return stats
+    finally:
+        writer.close()
+
+async def client(host, port, queries, counter, total, latencies, errors):
+    """One connection sending requests back to back until ``total`` have been sent"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while counter[0] < total:
+            text = queries[counter[0] % len(queries)]
+            counter[0] += 1
+            start = time.perf_counter()
+            status, _ = await http_request(reader, writer, host, 'POST', '/predict', {'text': text})
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(status)
+    finally:
+        writer.close()
+
+async def run_load_test(args, queries, concurrency):
+    stats_before = await fetch_stats(args.host, args.port)
+
+    counter = [0]
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args.host, args.port, queries, counter, args.requests, latencies, errors)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stats_after = await fetch_stats(args.host, args.port)
+    requests = stats_after['requests'] - stats_before['requests']
+    batches = stats_after['batches'] - stats_before['batches']
+
+    results = {
+        'concurrency': concurrency,
+        'requests': len(latencies) + len(errors),
+        'errors': len(errors),
+        'wall_seconds': round(elapsed, 3),
+        'throughput_per_second': round(len(latencies) / elapsed, 1),
+        'server_batches': batches,
+        'server_mean_batch_size': round(requests / batches, 2) if batches else 0.0
+    }
+    if latencies:
+        stats = latency_stats(latencies)
+        results.update({key: stats[key] for key in ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms')})
+    return results
+
+def main():
+    """Run the load test against a running inference server"""
+    parser = argparse.ArgumentParser(description="Load test the VitalAid inference server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8500)
+    parser.add_argument('--queries', default='data/medical_training_data.json',
+                        help="JSON file with query texts (dataset, conversations or list of strings)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 64],
+                        help="Concurrent client connections; one run per value")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per run")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for shuffling the queries")
+    parser.add_argument('--output', help="Also write the results JSON to this file")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    random.Random(args.seed).shuffle(queries)
+
+    runs = []
+    for concurrency in args.concurrency:
+        runs.append(asyncio.run(run_load_test(args, queries, concurrency)))
+
+    output = json.dumps({'queries': args.queries, 'runs': runs}, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+
+if __name__ == "__main__":
+    main()
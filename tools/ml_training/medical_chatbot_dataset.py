@@ -4,10 +4,14 @@ Medical Chatbot Training Dataset Generator
 Creates a comprehensive dataset for training a medical chatbot classifier
 """
 
+import argparse
 import json
 import random
 from typing import List, Dict, Tuple
 
+from sample_dedup import DEDUP_METHODS, deduplicate_samples, format_dedup_stats
+from text_normalization import normalize_texts
+
 class MedicalChatbotDatasetGenerator:
     def __init__(self):
         self.categories = {
@@ -30,8 +34,17 @@ class MedicalChatbotDatasetGenerator:
         # Comprehensive training data for medical chatbot
         self.training_data = []
         
-    def generate_training_data(self) -> List[Dict]:
-        """Generate comprehensive training dataset"""
+        # Set by generate_training_data when deduplication is enabled
+        self.dedup_stats = None
+        
+    def generate_training_data(self, dedup: str = 'none') -> List[Dict]:
+        """Generate comprehensive training dataset
+        
+        Rebuilds ``self.training_data`` from scratch, so calling this again
+        does not append a second copy. Several query lists share phrases;
+        ``dedup`` ('hash' or 'bloom') keeps only the first (text, label).
+        """
+        self.training_data = []
         
         # Emergency CPR queries
         cpr_queries = [
@@ -590,33 +603,42 @@ class MedicalChatbotDatasetGenerator:
         
         # Generate training data
         for query_list, category in all_queries:
-            for query in query_list:
+            for query in normalize_texts(query_list):
                 self.training_data.append({
-                    'text': query.lower().strip(),
+                    'text': query,
                     'category': category,
                     'label': self.categories[category]
                 })
         
+        unique, deduplicator = deduplicate_samples(self.training_data, dedup)
+        self.training_data = list(unique)
+        self.dedup_stats = deduplicator.stats() if deduplicator else None
+        
         return self.training_data
     
-    def save_dataset(self, filename: str = 'medical_chatbot_training_data.json'):
+    def save_dataset(self, filename: str = 'medical_chatbot_training_data.json', dedup: str = 'none'):
         """Save training dataset to JSON file"""
+        training_data = self.generate_training_data(dedup)
         data = {
             'categories': self.categories,
             'reverse_categories': self.reverse_categories,
-            'training_data': self.generate_training_data(),
+            'training_data': training_data,
             'metadata': {
-                'total_samples': len(self.training_data),
+                'total_samples': len(training_data),
                 'categories_count': len(self.categories),
                 'description': 'Medical Chatbot Training Dataset for Emergency Medical Classification'
             }
         }
+        if self.dedup_stats:
+            data['metadata']['duplicates_dropped'] = self.dedup_stats['duplicates_dropped']
         
         with open(filename, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
         
         print(f"Dataset saved to {filename}")
         print(f"Total samples: {data['metadata']['total_samples']}")
+        if self.dedup_stats:
+            print(format_dedup_stats(self.dedup_stats))
         print(f"Categories: {len(self.categories)}")
         
         # Print distribution
@@ -644,10 +666,15 @@ class MedicalChatbotDatasetGenerator:
 
 def main():
     """Generate and save medical chatbot training dataset"""
+    parser = argparse.ArgumentParser(description="Generate the medical chatbot training dataset")
+    parser.add_argument('--dedup', choices=DEDUP_METHODS, default='none',
+                        help="Drop repeated samples with an exact hash set or a Bloom filter")
+    args = parser.parse_args()
+    
     generator = MedicalChatbotDatasetGenerator()
     
     # Generate and save main dataset
-    dataset_file = generator.save_dataset()
+    dataset_file = generator.save_dataset(dedup=args.dedup)
     
     # Generate train/validation split
     train_data, val_data = generator.generate_validation_split()
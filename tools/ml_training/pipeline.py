@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Training Pipeline Orchestrator for VitalAid
+Runs generate -> train -> quantize/benchmark as a DAG, skipping stages whose inputs are unchanged
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from dataset_cache import hash_file
+
+# Every stage runs from this directory, because the scripts use paths
+# relative to tools/ml_training
+PIPELINE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = '.pipeline_state.json'
+LOG_DIR = 'logs/pipeline'
+
+MODELS_DIR = '../assets/models'
+TRAINING_DATA = 'data/medical_training_data.json'
+VOCABULARY = 'data/vocabulary.json'
+KERAS_MODEL = 'medical_classifier_model.h5'
+TFLITE_MODEL = f'{MODELS_DIR}/medical_classifier_trained.tflite'
+TOKENIZER = f'{MODELS_DIR}/tokenizer.json'
+LABELS = f'{MODELS_DIR}/labels.json'
+TRAINING_INFO = f'{MODELS_DIR}/training_info.json'
+
+class Stage:
+    def __init__(self, name: str, script: str, args: List[str], inputs: List[str], outputs: List[str],
+                 deps: List[str]):
+        """One script run in the pipeline
+
+        ``inputs`` and ``outputs`` are files or directories relative to
+        PIPELINE_DIR. A stage is up to date when its fingerprint (command,
+        input contents and the source of every local module the script
+        imports) matches the last successful run and its outputs are
+        unchanged since then.
+        """
+        self.name = name
+        self.script = script
+        self.args = args
+        self.inputs = inputs
+        self.outputs = outputs
+        self.deps = deps
+
+    @property
+    def command(self) -> List[str]:
+        return [sys.executable, self.script] + self.args
+
+def local_sources(script: str) -> List[str]:
+    """The script plus every module in PIPELINE_DIR it imports, directly or indirectly"""
+    seen = set()
+    pending = [script]
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        with open(os.path.join(PIPELINE_DIR, path), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module_path = name.split('.')[0] + '.py'
+                if os.path.exists(os.path.join(PIPELINE_DIR, module_path)):
+                    pending.append(module_path)
+    return sorted(seen)
+
+def hash_path(path: str) -> Optional[str]:
+    """Content hash of a file or a directory tree, or None if it does not exist"""
+    full_path = os.path.join(PIPELINE_DIR, path)
+    if os.path.isfile(full_path):
+        return hash_file(full_path)
+    if not os.path.isdir(full_path):
+        return None
+
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(full_path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, full_path).encode('utf-8') + b'\0')
+            digest.update(hash_file(file_path).encode('ascii'))
+    return digest.hexdigest()
+
+def stage_fingerprint(stage: Stage) -> Optional[str]:
+    """Fingerprint of everything the stage reads, or None while an input is missing"""
+    parts = {'command': [stage.script] + stage.args, 'inputs': {}, 'sources': {}}
+    for path in stage.inputs:
+        parts['inputs'][path] = hash_path(path)
+        if parts['inputs'][path] is None:
+            return None
+    for path in local_sources(stage.script):
+        parts['sources'][path] = hash_path(path)
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+def build_stages(args) -> Dict[str, Stage]:
+    """The generate -> train -> quantize/benchmark DAG
+
+    Vocabulary building happens inside generation and tokenization inside
+    training (reused through the dataset cache), so they are not separate
+    script runs. The quantization variants and the benchmark only depend on
+    the trained model and run concurrently.
+    """
+    generate_args = ['--samples-per-category', str(args.samples_per_category), '--seed', str(args.seed)]
+    train_args = ['--fast'] if args.fast else []
+
+    stages = [
+        Stage('generate', 'generate_training_data.py', generate_args,
+              inputs=[], outputs=[TRAINING_DATA, VOCABULARY], deps=[]),
+        # training_info.json holds the sequence length chosen by prepare_data.py;
+        # train rewrites it, but the fingerprint is taken after the run
+        Stage('train', 'train_classification_model.py', train_args,
+              inputs=[TRAINING_DATA, TRAINING_INFO], outputs=[KERAS_MODEL, TFLITE_MODEL, TOKENIZER, LABELS, TRAINING_INFO],
+              deps=['generate']),
+        Stage('benchmark', 'benchmark_tflite.py',
+              [TFLITE_MODEL, '--tokenizer', TOKENIZER, '--labels', LABELS, '--queries', TRAINING_DATA,
+               '--output', 'benchmarks/tflite_benchmark.json'],
+              inputs=[TFLITE_MODEL, TOKENIZER, LABELS, TRAINING_DATA],
+              outputs=['benchmarks/tflite_benchmark.json'], deps=['train'])
+    ]
+    for mode in args.quantization_modes:
+        # One output directory per variant so concurrent stages never share a report file
+        output_dir = f'quantized/{mode}'
+        stages.append(Stage(f'quantize-{mode}', 'quantize_model.py',
+                            [KERAS_MODEL, '--tokenizer', TOKENIZER, '--data', TRAINING_DATA, '--labels', LABELS,
+                             '--split', 'stratified', '--modes', mode, '--output-dir', output_dir],
+                            inputs=[KERAS_MODEL, TOKENIZER, LABELS, TRAINING_DATA],
+                            outputs=[output_dir], deps=['train']))
+
+    return {stage.name: stage for stage in stages}
+
+def select_stages(stages: Dict[str, Stage], targets: List[str]) -> Dict[str, Stage]:
+    """The target stages and everything they depend on"""
+    selected = {}
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in stages:
+            raise ValueError(f"Unknown stage {name!r}; expected one of {sorted(stages)}")
+        if name not in selected:
+            selected[name] = stages[name]
+            pending.extend(stages[name].deps)
+    return {name: stage for name, stage in stages.items() if name in selected}
+
+class Pipeline:
+    def __init__(self, stages: Dict[str, Stage], jobs: int = 1, force: bool = False, dry_run: bool = False):
+        self.stages = stages
+        self.jobs = jobs
+        self.force = force
+        self.dry_run = dry_run
+        self.state_path = os.path.join(PIPELINE_DIR, STATE_FILE)
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(temp_path, self.state_path)
+
+    def is_up_to_date(self, stage: Stage) -> bool:
+        previous = self.state.get(stage.name)
+        if self.force or previous is None or previous['fingerprint'] != stage_fingerprint(stage):
+            return False
+        return all(hash_path(path) == digest for path, digest in previous['outputs'].items())
+
+    def run_stage(self, stage: Stage) -> float:
+        """Run one stage with its output going to a log file; returns the duration"""
+        os.makedirs(os.path.join(PIPELINE_DIR, LOG_DIR), exist_ok=True)
+        log_path = os.path.join(PIPELINE_DIR, LOG_DIR, f'{stage.name}.log')
+        start = time.perf_counter()
+        with open(log_path, 'w', encoding='utf-8') as log:
+            result = subprocess.run(stage.command, cwd=PIPELINE_DIR, stdout=log, stderr=subprocess.STDOUT)
+        if result.returncode != 0:
+            raise RuntimeError(f"Stage {stage.name} failed with exit code {result.returncode}; see {log_path}")
+        return time.perf_counter() - start
+
+    def record(self, stage: Stage, duration: float):
+        self.state[stage.name] = {
+            'fingerprint': stage_fingerprint(stage),
+            'outputs': {path: hash_path(path) for path in stage.outputs},
+            'duration_seconds': round(duration, 1),
+            'completed_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        self._save_state()
+
+    def run(self) -> Dict[str, str]:
+        """Run stages as their dependencies finish, up to ``jobs`` at a time
+
+        Up-to-dateness is checked when a stage becomes ready, after its
+        dependencies have (re)written their outputs.
+        """
+        status: Dict[str, str] = {}
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            while len(status) < len(self.stages):
+                for name, stage in self.stages.items():
+                    if name in status or name in running.values():
+                        continue
+                    if any(status.get(dep) == 'failed' for dep in stage.deps):
+                        status[name] = 'failed'
+                        print(f"[skip]    {name} (dependency failed)")
+                        continue
+                    if not all(status.get(dep) in ('ran', 'up-to-date') for dep in stage.deps):
+                        continue
+                    if self.is_up_to_date(stage):
+                        status[name] = 'up-to-date'
+                        print(f"[cached]  {name}")
+                    elif self.dry_run:
+                        status[name] = 'ran'
+                        print(f"[would run] {name}: {' '.join(stage.command[1:])}")
+                    elif len(running) < self.jobs:
+                        print(f"[start]   {name}")
+                        running[executor.submit(self.run_stage, stage)] = name
+
+                if not running:
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        duration = future.result()
+                    except RuntimeError as e:
+                        status[name] = 'failed'
+                        print(f"[failed]  {e}")
+                    else:
+                        status[name] = 'ran'
+                        self.record(self.stages[name], duration)
+                        print(f"[done]    {name} ({duration:.1f}s)")
+
+        return status
+
+def main():
+    """Run the training pipeline"""
+    parser = argparse.ArgumentParser(description="Run the VitalAid training pipeline as a cached DAG")
+    parser.add_argument('stages', nargs='*', help="Stages to bring up to date, with their dependencies (default: all)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="Stages run concurrently")
+    parser.add_argument('--force', action='store_true', help="Re-run the selected stages even if up to date")
+    parser.add_argument('--dry-run', action='store_true', help="Only print what would run")
+    parser.add_argument('--list', action='store_true', help="List the stages and their dependencies")
+    parser.add_argument('--samples-per-category', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42, help="Generation seed (fixed, so reruns are reproducible)")
+    parser.add_argument('--fast', action='store_true', help="Train with the --fast settings")
+    parser.add_argument('--quantization-modes', nargs='*', default=['dynamic', 'float16', 'int8'],
+                        help="Quantization variants built as parallel stages")
+    args = parser.parse_args()
+
+    stages = build_stages(args)
+    if args.list:
+        for stage in stages.values():
+            print(f"{stage.name:<18} <- {', '.join(stage.deps) or '-'}")
+        return
+
+    pipeline = Pipeline(select_stages(stages, args.stages or list(stages)), args.jobs, args.force, args.dry_run)
+    status = pipeline.run()
+    if 'failed' in status.values():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
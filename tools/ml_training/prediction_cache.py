@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Prediction Cache for VitalAid
+Bounded LRU/TTL cache of classifier outputs keyed on the normalized token sequence
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+DEFAULT_CACHE_ENTRIES = 4096
+
+class PredictionCache:
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES, ttl_seconds: Optional[float] = None):
+        """Least-recently-used cache of probability rows
+
+        Keys are padded token-ID rows, so queries that differ only in case,
+        punctuation or out-of-vocabulary words share an entry. Entries older
+        than ``ttl_seconds`` are treated as misses. The cache is thread-safe,
+        so interpreter pools can share one. Use one cache per model.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: bytes, value: np.ndarray):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def predict(self, token_ids: np.ndarray, predict: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+        """Probabilities for padded token IDs, calling ``predict`` only for uncached rows
+
+        Each distinct row is looked up once per call, so repeats within one
+        batch count as a single hit or miss and are predicted at most once.
+        """
+        keys = [row.tobytes() for row in token_ids]
+
+        # First position of each distinct row
+        positions: Dict[bytes, int] = {}
+        for position, key in enumerate(keys):
+            positions.setdefault(key, position)
+
+        rows = {key: self.get(key) for key in positions}
+        missing = [key for key, row in rows.items() if row is None]
+
+        if missing:
+            outputs = predict(token_ids[[positions[key] for key in missing]])
+            for key, output in zip(missing, outputs):
+                rows[key] = np.array(output)
+                self.put(key, rows[key])
+
+        return np.stack([rows[key] for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -4,14 +4,27 @@ Medical Chatbot Data Preparation Script
 Generates training data and vocabulary for ML model
 """
 
+import argparse
 import json
 import os
-import re
-import numpy as np
-from typing import List, Dict, Tuple
-from collections import Counter, defaultdict
+import statistics
+from typing import TYPE_CHECKING, List, Dict, Tuple
+from collections import defaultdict
 import logging
 
+import text_normalization
+from dataset_cache import DatasetCache, add_cache_arguments, cache_from_args, cache_key, hash_file, hash_texts
+from dataset_shards import write_npy_dataset
+from sample_dedup import DEDUP_METHODS, deduplicate_samples, format_dedup_stats
+from sequence_length import (DEFAULT_COVERAGE, TRAINING_INFO_PATH, analyze_sequence_lengths, format_analysis,
+                             save_sequence_length_analysis)
+from text_normalization import normalize_texts, tokenize
+from vocabulary_builder import StreamingVocabularyBuilder
+
+# NumPy is only imported for --npy-dataset
+if TYPE_CHECKING:
+    import numpy as np
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -19,6 +32,8 @@ logger = logging.getLogger(__name__)
 class MedicalDataPreparator:
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
+        self.vocabulary_builder = None
+        self.dedup_stats = None
         self.medical_data = {
             "cardiac_arrest": {
                 "keywords": ["cardiac arrest", "heart stopped", "no pulse", "unresponsive", "cpr", "chest compressions"],
@@ -342,8 +357,13 @@ class MedicalDataPreparator:
             }
         }
         
-    def generate_training_data(self) -> List[Dict]:
-        """Generate comprehensive training data"""
+    def generate_training_data(self, dedup: str = 'none') -> List[Dict]:
+        """Generate comprehensive training data
+        
+        Keyword variations and synthetic texts overlap with the original
+        texts; ``dedup`` ('hash' or 'bloom') keeps only the first occurrence
+        of each (text, label) after normalization.
+        """
         logger.info("Generating training data...")
         
         training_data = []
@@ -376,6 +396,16 @@ class MedicalDataPreparator:
         # Add synthetic data for balance
         training_data = self._add_synthetic_data(training_data)
         
+        # Store texts in the shared normalized form
+        for item, text in zip(training_data, normalize_texts(item["text"] for item in training_data)):
+            item["text"] = text
+        
+        unique, deduplicator = deduplicate_samples(training_data, dedup)
+        training_data = list(unique)
+        self.dedup_stats = deduplicator.stats() if deduplicator else None
+        if self.dedup_stats:
+            logger.info(format_dedup_stats(self.dedup_stats))
+        
         logger.info(f"Generated {len(training_data)} training samples")
         return training_data
     
@@ -488,34 +518,18 @@ class MedicalDataPreparator:
         }
         return category_labels.get(category, 0)
     
-    def build_vocabulary(self, training_data: List[Dict]) -> Dict[str, int]:
+    def build_vocabulary(self, training_data: List[Dict], workers: int = 1) -> Dict[str, int]:
         """Build vocabulary from training data"""
         logger.info("Building vocabulary...")
         
-        # Extract all text
-        all_text = []
-        for item in training_data:
-            # Clean and tokenize text
-            text = re.sub(r'[^\w\s]', '', item["text"].lower())
-            tokens = text.split()
-            all_text.extend(tokens)
-        
-        # Count word frequencies
-        word_counts = Counter(all_text)
-        
-        # Create vocabulary with special tokens
-        vocab = {
-            "<PAD>": 0,
-            "<UNK>": 1,
-            "<START>": 2,
-            "<END>": 3
-        }
+        # Count word frequencies chunk by chunk (words seen at least twice,
+        # most frequent first, capped at 10000 entries including special tokens)
+        builder = StreamingVocabularyBuilder(tokenize=tokenize, min_count=2, max_size=10000)
+        builder.count_texts((item["text"] for item in training_data), workers=workers)
+        vocab = builder.build()
         
-        # Add words by frequency (excluding rare words)
-        vocab_size = 10000
-        for word, count in word_counts.most_common(vocab_size - 4):
-            if count >= 2:  # Only include words that appear at least twice
-                vocab[word] = len(vocab)
+        # Kept so save_data can store the counts for incremental updates
+        self.vocabulary_builder = builder
         
         logger.info(f"Built vocabulary with {len(vocab)} words")
         return vocab
@@ -530,13 +544,28 @@ class MedicalDataPreparator:
         with open(training_path, 'w', encoding='utf-8') as f:
             json.dump(training_data, f, indent=2, ensure_ascii=False)
         
-        # Save vocabulary
+        # Save vocabulary (with word counts when available, for incremental updates)
         vocab_path = os.path.join(self.data_dir, "vocabulary.json")
-        with open(vocab_path, 'w', encoding='utf-8') as f:
-            json.dump(vocabulary, f, indent=2, ensure_ascii=False)
+        if self.vocabulary_builder is not None:
+            self.vocabulary_builder.save(vocabulary, vocab_path)
+        else:
+            with open(vocab_path, 'w', encoding='utf-8') as f:
+                json.dump(vocabulary, f, indent=2, ensure_ascii=False)
         
         # Save class information
-        class_info = {
+        class_info = self.get_class_info()
+        
+        class_path = os.path.join(self.data_dir, "class_info.json")
+        with open(class_path, 'w', encoding='utf-8') as f:
+            json.dump(class_info, f, indent=2, ensure_ascii=False)
+        
+        logger.info(f"Training data saved to: {training_path}")
+        logger.info(f"Vocabulary saved to: {vocab_path}")
+        logger.info(f"Class info saved to: {class_path}")
+    
+    def get_class_info(self) -> Dict:
+        """Get class names and labels"""
+        return {
             "num_classes": 16,
             "class_names": [
                 "cardiac_arrest", "choking", "bleeding", "burns", "fracture",
@@ -553,16 +582,97 @@ class MedicalDataPreparator:
                 "electric_shock": 15
             }
         }
+    
+    def tokenize_training_data(self, training_data: List[Dict], vocabulary: Dict[str, int],
+                               max_length: int = 50, vocab_size: int = None) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Convert training data into an int32 token matrix and int16 label vector
         
-        class_path = os.path.join(self.data_dir, "class_info.json")
-        with open(class_path, 'w', encoding='utf-8') as f:
-            json.dump(class_info, f, indent=2, ensure_ascii=False)
+        Texts are tokenized the same way as in build_vocabulary and post-padded
+        with <PAD>. Words outside the vocabulary, or with an ID of at least
+        ``vocab_size``, become <UNK>.
+        """
+        import numpy as np
         
-        logger.info(f"Training data saved to: {training_path}")
-        logger.info(f"Vocabulary saved to: {vocab_path}")
-        logger.info(f"Class info saved to: {class_path}")
+        pad_id = vocabulary["<PAD>"]
+        unk_id = vocabulary["<UNK>"]
+        
+        tokens = np.full((len(training_data), max_length), pad_id, dtype=np.int32)
+        labels = np.empty(len(training_data), dtype=np.int16)
+        
+        for row, item in enumerate(training_data):
+            token_ids = [vocabulary.get(word, unk_id) for word in tokenize(item["text"])[:max_length]]
+            if vocab_size is not None:
+                token_ids = [token_id if token_id < vocab_size else unk_id for token_id in token_ids]
+            tokens[row, :len(token_ids)] = token_ids
+            labels[row] = item["label"]
+        
+        return tokens, labels
+    
+    def dataset_cache_key(self, dedup: str = 'none') -> str:
+        """Content hash of everything generate_training_data depends on"""
+        return cache_key(
+            'prepare_data.training_data',
+            medical_data=self.medical_data,
+            dedup=dedup,
+            generator_source=hash_file(__file__),
+            normalization_source=hash_file(text_normalization.__file__)
+        )
+    
+    def load_or_generate_training_data(self, cache: DatasetCache = None, dedup: str = 'none') -> List[Dict]:
+        """Return cached training data for unchanged inputs, generating it otherwise"""
+        if cache is None:
+            return self.generate_training_data(dedup)
+        
+        key = self.dataset_cache_key(dedup)
+        cached = cache.get_json(key)
+        if cached is not None:
+            self.dedup_stats = cached['dedup_stats']
+            logger.info(f"Loaded {len(cached['training_data'])} training samples from cache ({key[:12]})")
+            return cached['training_data']
+        
+        training_data = self.generate_training_data(dedup)
+        cache.put_json(key, {'training_data': training_data, 'dedup_stats': self.dedup_stats})
+        return training_data
     
-    def print_data_statistics(self, training_data: List[Dict]):
+    def save_npy_dataset(self, training_data: List[Dict], vocabulary: Dict[str, int], output_dir: str,
+                         max_length: int = 50, vocab_size: int = None, cache: DatasetCache = None):
+        """Save pre-tokenized, memory-mappable training data for the trainers
+        
+        With a cache, the token and label arrays are reused when the dataset,
+        vocabulary and tokenization settings are unchanged.
+        """
+        key = None
+        cached = None
+        if cache is not None:
+            key = cache_key(
+                'prepare_data.tokens',
+                samples=hash_texts(f"{item['label']}\t{item['text']}" for item in training_data),
+                vocabulary=vocabulary,
+                max_length=max_length,
+                vocab_size=vocab_size
+            )
+            cached = cache.get_arrays(key)
+        
+        if cached is not None:
+            tokens, labels = cached['tokens'], cached['labels']
+            logger.info(f"Loaded pre-tokenized arrays from cache ({key[:12]})")
+        else:
+            tokens, labels = self.tokenize_training_data(training_data, vocabulary, max_length, vocab_size)
+            if cache is not None:
+                cache.put_arrays(key, tokens=tokens, labels=labels)
+        
+        if vocab_size is not None:
+            vocabulary = {word: idx for word, idx in vocabulary.items() if idx < vocab_size}
+        
+        write_npy_dataset(tokens, labels, output_dir, metadata={
+            'vocab_size': len(vocabulary),
+            'vocabulary': vocabulary,
+            'class_info': self.get_class_info()
+        })
+        
+        logger.info(f"Pre-tokenized data saved to: {output_dir}")
+    
+    def print_data_statistics(self, training_data: List[Dict], sequence_analysis: Dict = None):
         """Print data statistics"""
         print("\nTraining Data Statistics:")
         print("=" * 50)
@@ -573,6 +683,8 @@ class MedicalDataPreparator:
             category_counts[item["category"]] += 1
         
         print(f"Total samples: {len(training_data)}")
+        if self.dedup_stats:
+            print(format_dedup_stats(self.dedup_stats))
         print(f"Number of categories: {len(category_counts)}")
         print("\nSamples per category:")
         
@@ -582,14 +694,35 @@ class MedicalDataPreparator:
         # Text length statistics
         text_lengths = [len(item["text"].split()) for item in training_data]
         print(f"\nText length statistics:")
-        print(f"  Average words: {np.mean(text_lengths):.2f}")
+        print(f"  Average words: {statistics.mean(text_lengths):.2f}")
         print(f"  Min words: {min(text_lengths)}")
         print(f"  Max words: {max(text_lengths)}")
-        print(f"  Median words: {np.median(text_lengths):.2f}")
+        print(f"  Median words: {statistics.median(text_lengths):.2f}")
+        
+        if sequence_analysis:
+            print(f"\nSequence length analysis:")
+            for line in format_analysis(sequence_analysis).splitlines():
+                print(f"  {line}")
 
 def main():
     """Main function"""
-    import numpy as np
+    parser = argparse.ArgumentParser(description="Prepare medical chatbot training data")
+    parser.add_argument('--npy-dataset', metavar='DIR',
+                        help="Also write pre-tokenized tokens.npy/labels.npy for memory-mapped training")
+    parser.add_argument('--max-length', type=int,
+                        help="Sequence length of the pre-tokenized data (default: the length chosen at --length-coverage)")
+    parser.add_argument('--length-coverage', type=float, default=DEFAULT_COVERAGE,
+                        help="Share of texts the chosen max sequence length must fit without truncation")
+    parser.add_argument('--training-info', default=TRAINING_INFO_PATH,
+                        help="training_info.json the chosen max sequence length is recorded in for the trainers")
+    parser.add_argument('--vocab-size', type=int, default=1000,
+                        help="Highest token ID (exclusive) kept in the pre-tokenized data")
+    parser.add_argument('--dedup', choices=DEDUP_METHODS, default='none',
+                        help="Drop repeated samples with an exact hash set or a Bloom filter (for huge runs)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Processes used to count words for the vocabulary")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
     
     # Configuration
     data_dir = "data"
@@ -597,17 +730,29 @@ def main():
     # Create preparator
     preparator = MedicalDataPreparator(data_dir)
     
-    # Generate training data
-    training_data = preparator.generate_training_data()
+    # Generate training data (reused from the cache when the inputs are unchanged)
+    cache = cache_from_args(args)
+    training_data = preparator.load_or_generate_training_data(cache, dedup=args.dedup)
     
     # Build vocabulary
-    vocabulary = preparator.build_vocabulary(training_data)
+    vocabulary = preparator.build_vocabulary(training_data, workers=args.workers)
     
     # Save data
     preparator.save_data(training_data, vocabulary)
     
+    # Pick the padded length from the token lengths (most texts are a handful
+    # of words) and record it where the trainers look for it
+    sequence_analysis = analyze_sequence_lengths((item["text"] for item in training_data), args.length_coverage)
+    save_sequence_length_analysis(sequence_analysis, args.training_info)
+    logger.info(f"Max sequence length {sequence_analysis['max_sequence_length']} saved to: {args.training_info}")
+    
+    if args.npy_dataset:
+        max_length = args.max_length or sequence_analysis['max_sequence_length']
+        preparator.save_npy_dataset(training_data, vocabulary, args.npy_dataset,
+                                    max_length=max_length, vocab_size=args.vocab_size, cache=cache)
+    
     # Print statistics
-    preparator.print_data_statistics(training_data)
+    preparator.print_data_statistics(training_data, sequence_analysis)
     
     print(f"\n[SUCCESS] Data preparation completed!")
     print(f"Training data: {len(training_data)} samples")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+First Aid Procedure Index for VitalAid
+Compiles first_aid_procedures.json into a BM25-weighted inverted index and answers ranked queries
+"""
+
+import argparse
+import json
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from text_normalization import tokenize
+
+DEFAULT_PROCEDURES_PATH = '../../first_aid_procedures.json'
+DEFAULT_INDEX_PATH = '../assets/models/procedure_index.json'
+INDEX_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Term frequency multiplier per field: a word in the name or keywords says
+# more about a procedure than the same word in one of its steps
+FIELD_WEIGHTS = {
+    'name': 3,
+    'keywords': 3,
+    'description': 1,
+    'notes': 1,
+    'steps': 1
+}
+
+def load_procedures(path: str) -> List[Dict]:
+    """Procedures from a Firestore export ({'documents': [...]}) or a plain list"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['documents'] if isinstance(data, dict) else data
+
+def procedure_terms(procedure: Dict) -> Counter:
+    """Field-weighted term frequencies of one procedure"""
+    counts = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = procedure.get(field) or ''
+        if isinstance(value, list):
+            value = ' '.join(value)
+        for term in tokenize(value):
+            counts[term] += weight
+    return counts
+
+def build_index(procedures: List[Dict], k1: float = BM25_K1, b: float = BM25_B) -> Dict:
+    """Inverted index with precomputed BM25 weights
+
+    Every posting stores idf * saturated term frequency, so a query only
+    adds up the postings of its terms. Posting lists are concatenated into
+    two flat arrays; ``terms`` maps each term to its (offset, length).
+    """
+    term_counts = [procedure_terms(procedure) for procedure in procedures]
+    lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float64)
+    average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    postings: Dict[str, List] = {}
+    for doc, counts in enumerate(term_counts):
+        for term, frequency in counts.items():
+            postings.setdefault(term, []).append((doc, frequency))
+
+    num_docs = len(procedures)
+    terms = {}
+    posting_docs = []
+    posting_weights = []
+    for term in sorted(postings):
+        entries = postings[term]
+        idf = math.log(1 + (num_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+        terms[term] = [len(posting_docs), len(entries)]
+        for doc, frequency in entries:
+            norm = k1 * (1 - b + b * lengths[doc] / average_length)
+            posting_docs.append(doc)
+            posting_weights.append(round(idf * frequency * (k1 + 1) / (frequency + norm), 5))
+
+    return {
+        'version': INDEX_VERSION,
+        'k1': k1,
+        'b': b,
+        'field_weights': FIELD_WEIGHTS,
+        'documents': [{'id': procedure.get('id'), 'name': procedure.get('name')} for procedure in procedures],
+        'terms': terms,
+        'posting_docs': posting_docs,
+        'posting_weights': posting_weights
+    }
+
+def save_index(index: Dict, path: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, separators=(',', ':'))
+
+class ProcedureIndex:
+    def __init__(self, index: Dict):
+        if index.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported procedure index version {index.get('version')!r}")
+        self.documents = index['documents']
+        self.terms = index['terms']
+        self.posting_docs = np.array(index['posting_docs'], dtype=np.int32)
+        self.posting_weights = np.array(index['posting_weights'], dtype=np.float32)
+
+    @classmethod
+    def load(cls, path: str) -> 'ProcedureIndex':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @classmethod
+    def from_procedures(cls, procedures: List[Dict]) -> 'ProcedureIndex':
+        return cls(build_index(procedures))
+
+    def search(self, query: str, top_k: int = 3) -> List[Dict]:
+        """Best-scoring procedures for a query, touching only the postings of its terms"""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in dict.fromkeys(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is not None:
+                offset, length = entry
+                # A term occurs at most once per posting list, so fancy-index += is safe
+                scores[self.posting_docs[offset:offset + length]] += self.posting_weights[offset:offset + length]
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > top_k:
+            matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return [{**self.documents[doc], 'score': round(float(scores[doc]), 4)} for doc in matched]
+
+def main():
+    """Build the procedure index, or query an existing one"""
+    parser = argparse.ArgumentParser(description="Build and query the first aid procedure index")
+    parser.add_argument('--procedures', default=DEFAULT_PROCEDURES_PATH, help="first_aid_procedures.json export")
+    parser.add_argument('--output', default=DEFAULT_INDEX_PATH, help="Where the index JSON is written")
+    parser.add_argument('--query', help="Search the index at --output instead of building it")
+    parser.add_argument('--top-k', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.query:
+        for result in ProcedureIndex.load(args.output).search(args.query, args.top_k):
+            print(f"{result['score']:>8.3f}  {result['id']}  {result['name']}")
+        return
+
+    procedures = load_procedures(args.procedures)
+    index = build_index(procedures)
+    save_index(index, args.output)
+    print(f"Indexed {len(procedures)} procedures, {len(index['terms'])} terms, "
+          f"{len(index['posting_docs'])} postings -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Post-Training Quantization Matrix for VitalAid
+Exports float32, dynamic-range, float16 and int8 TFLite variants and compares them on held-out data
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.preprocessing.sequence import pad_sequences
+from tensorflow.keras.preprocessing.text import Tokenizer, tokenizer_from_json
+
+from calibration_data import DEFAULT_CALIBRATION_SIZE, CalibrationSet, model_input_dtype
+from text_normalization import normalize_texts
+
+QUANTIZATION_MODES = ('float32', 'dynamic', 'float16', 'int8')
+QUANTIZATION_REPORT_FILE = 'quantization_report.json'
+
+def quantize(model: tf.keras.Model, mode: str,
+             calibration: Optional[CalibrationSet] = None) -> bytes:
+    """Convert a Keras model to TFLite with the given post-training quantization
+
+    ``int8`` quantizes weights and activations, calibrated on
+    ``calibration``. Model inputs and outputs stay float, because the inputs
+    are token IDs, which do not fit in 8 bits.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+
+    if mode == 'dynamic':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif mode == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == 'int8':
+        if calibration is None:
+            raise ValueError("int8 quantization needs a calibration set")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = calibration.representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    elif mode != 'float32':
+        raise ValueError(f"Unknown quantization mode {mode!r}; expected one of {QUANTIZATION_MODES}")
+
+    return converter.convert()
+
+def evaluate_tflite(tflite_model: bytes, X: np.ndarray, y: np.ndarray, num_threads: int = 1) -> Dict:
+    """Accuracy and single-query latency of a TFLite classifier"""
+    interpreter = tf.lite.Interpreter(model_content=tflite_model, num_threads=num_threads)
+    interpreter.allocate_tensors()
+    input_detail = interpreter.get_input_details()[0]
+    output_index = interpreter.get_output_details()[0]['index']
+
+    inputs = X.astype(input_detail['dtype'])
+    predictions = np.empty(len(inputs), dtype=np.int64)
+    latencies = np.empty(len(inputs))
+
+    for row in range(len(inputs)):
+        start = time.perf_counter()
+        interpreter.set_tensor(input_detail['index'], inputs[row:row + 1])
+        interpreter.invoke()
+        output = interpreter.get_tensor(output_index)
+        latencies[row] = time.perf_counter() - start
+        predictions[row] = np.argmax(output[0])
+
+    latencies_ms = latencies * 1000
+    return {
+        'accuracy': round(float(np.mean(predictions == y)), 4),
+        'mean_latency_ms': round(float(latencies_ms.mean()), 3),
+        'p99_latency_ms': round(float(np.percentile(latencies_ms, 99)), 3)
+    }
+
+def quantization_matrix(model: tf.keras.Model, X_eval: np.ndarray, y_eval: np.ndarray,
+                        calibration: CalibrationSet, output_dir: str, name: str,
+                        modes: Iterable[str] = QUANTIZATION_MODES, num_threads: int = 1) -> List[Dict]:
+    """Export every quantization variant to ``output_dir`` and evaluate it on held-out data
+
+    Writes ``{name}_{mode}.tflite`` for each mode and a JSON report.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rows = []
+
+    for mode in modes:
+        print(f"Converting {mode} variant...")
+        tflite_model = quantize(model, mode, calibration)
+        path = os.path.join(output_dir, f"{name}_{mode}.tflite")
+        with open(path, 'wb') as f:
+            f.write(tflite_model)
+
+        row = {'mode': mode, 'path': path, 'size_kb': round(len(tflite_model) / 1024, 1)}
+        row.update(evaluate_tflite(tflite_model, X_eval, y_eval, num_threads))
+        rows.append(row)
+
+    report_path = os.path.join(output_dir, QUANTIZATION_REPORT_FILE)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump({'model': name, 'eval_samples': len(X_eval), 'variants': rows}, f, indent=2)
+
+    print_quantization_table(rows)
+    print(f"\nReport saved to {report_path}")
+    return rows
+
+def print_quantization_table(rows: List[Dict]):
+    """Print the size/accuracy/latency table"""
+    print(f"\n{'Mode':<10} {'Size (KB)':>10} {'Accuracy':>9} {'Mean (ms)':>10} {'p99 (ms)':>9}")
+    for row in rows:
+        print(f"{row['mode']:<10} {row['size_kb']:>10.1f} {row['accuracy']:>9.4f} "
+              f"{row['mean_latency_ms']:>10.3f} {row['p99_latency_ms']:>9.3f}")
+
+def load_tokenizer(path: str) -> Tokenizer:
+    """Load either Tokenizer.to_json output or the classifier's tokenizer config"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    data = json.loads(content)
+    if 'config' in data:
+        return tokenizer_from_json(content)
+
+    tokenizer = Tokenizer(num_words=data.get('num_words'), oov_token=data.get('oov_token'))
+    tokenizer.word_index = data['word_index']
+    tokenizer.index_word = {int(idx): word for idx, word in data.get('index_word', {}).items()}
+    return tokenizer
+
+def load_samples(data_path: str):
+    """Load texts and labels from a JSON list or a {'training_data': [...]} dataset"""
+    with open(data_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data['training_data']
+    return [item['text'] for item in data], np.array([item['label'] for item in data])
+
+def main():
+    """Quantize a trained Keras model and compare the variants"""
+    parser = argparse.ArgumentParser(description="Build and compare post-training quantization variants")
+    parser.add_argument('model', help="Trained Keras model (.h5, .keras or SavedModel directory)")
+    parser.add_argument('--tokenizer', required=True, help="Tokenizer JSON saved with the model")
+    parser.add_argument('--data', required=True, help="JSON dataset the model was trained on")
+    parser.add_argument('--labels', help="labels.json with label_to_idx (if labels are not class indices)")
+    parser.add_argument('--max-length', type=int,
+                        help="Sequence length the model expects (default: the model's input length)")
+    parser.add_argument('--split', choices=['tail', 'stratified'], default='tail',
+                        help="Held-out split: last --holdout of the data (chatbot trainer) or a stratified "
+                             "random split with seed 42 (classifier trainer)")
+    parser.add_argument('--holdout', type=float, default=0.2, help="Held-out fraction")
+    parser.add_argument('--calibration-size', type=int, default=DEFAULT_CALIBRATION_SIZE,
+                        help="Stratified training samples used for int8 calibration")
+    parser.add_argument('--modes', nargs='+', choices=QUANTIZATION_MODES, default=list(QUANTIZATION_MODES))
+    parser.add_argument('--threads', type=int, default=1, help="Interpreter threads")
+    parser.add_argument('--output-dir', default='quantized', help="Where variants and the report are written")
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model)
+    max_length = args.max_length or model.inputs[0].shape[1]
+    tokenizer = load_tokenizer(args.tokenizer)
+    texts, labels = load_samples(args.data)
+
+    if args.labels:
+        with open(args.labels, 'r', encoding='utf-8') as f:
+            label_to_idx = json.load(f)['label_to_idx']
+        labels = np.array([label_to_idx[str(label)] for label in labels])
+
+    sequences = tokenizer.texts_to_sequences(normalize_texts(texts))
+    X = pad_sequences(sequences, maxlen=max_length, padding='post', truncating='post')
+
+    if args.split == 'stratified':
+        from sklearn.model_selection import train_test_split
+        X_train, X_eval, y_train, y_eval = train_test_split(X, labels, test_size=args.holdout,
+                                                            random_state=42, stratify=labels)
+    else:
+        split_point = int(len(X) * (1 - args.holdout))
+        X_train, X_eval = X[:split_point], X[split_point:]
+        y_train, y_eval = labels[:split_point], labels[split_point:]
+
+    name = os.path.splitext(os.path.basename(args.model.rstrip('/')))[0]
+    calibration = CalibrationSet.from_arrays(X_train, y_train, args.calibration_size,
+                                             dtype=model_input_dtype(model))
+    quantization_matrix(model, X_eval, y_eval, calibration, args.output_dir, name,
+                        modes=args.modes, num_threads=args.threads)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Response Retrieval for VitalAid
+Embeds conversations.json user inputs with the trained classifier and answers queries with the nearest canned response
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import tensorflow as tf
+
+from ann_index import DEFAULT_NPROBE, IVFIndex
+from tflite_inference import TextEncoder
+
+DEFAULT_MODEL = 'medical_classifier_model.h5'
+DEFAULT_TOKENIZER = '../assets/models/tokenizer.json'
+DEFAULT_CONVERSATIONS = 'data/conversations.json'
+DEFAULT_INDEX_PATH = '../assets/models/response_index.npz'
+
+def load_conversations(path: str) -> Tuple[List[str], List[str]]:
+    """User inputs and bot responses"""
+    with open(path, 'r', encoding='utf-8') as f:
+        conversations = json.load(f)
+    return [item['user_input'] for item in conversations], [item['bot_response'] for item in conversations]
+
+def embedding_model(model: tf.keras.Model) -> tf.keras.Model:
+    """Model returning the output of the last non-dropout layer before the classifier head"""
+    for layer in reversed(model.layers[:-1]):
+        if not isinstance(layer, tf.keras.layers.Dropout):
+            return tf.keras.Model(model.inputs, layer.output)
+    raise ValueError("Model has no hidden layer to take embeddings from")
+
+class TextEmbedder:
+    def __init__(self, model_path: str, tokenizer_path: str):
+        self.model = embedding_model(tf.keras.models.load_model(model_path))
+        self.encoder = TextEncoder.from_json(tokenizer_path, int(self.model.input_shape[1]))
+
+    def embed(self, texts: List[str], batch_size: int = 256) -> np.ndarray:
+        """float16 (len(texts), dim) embeddings"""
+        embeddings = self.model.predict(self.encoder.encode(texts), batch_size=batch_size, verbose=0)
+        return embeddings.astype(np.float16)
+
+class ResponseRetriever:
+    def __init__(self, index_path: str, embedder: TextEmbedder):
+        self.index, arrays = IVFIndex.load(index_path)
+        self.user_inputs = arrays['user_inputs']
+        self.responses = arrays['responses']
+        self.embedder = embedder
+
+    def retrieve(self, text: str, k: int = 1, nprobe: int = DEFAULT_NPROBE) -> List[Dict]:
+        """Canned responses of the ``k`` stored user inputs closest to ``text``"""
+        query = self.embedder.embed([text])[0]
+        ids, scores = self.index.search(query, k, nprobe)
+        return [{
+            'user_input': str(self.user_inputs[i]),
+            'response': str(self.responses[i]),
+            'similarity': round(float(score), 4)
+        } for i, score in zip(ids, scores)]
+
+def build_response_index(embedder: TextEmbedder, conversations_path: str, output_path: str,
+                         num_lists: int = None) -> IVFIndex:
+    """Embed every user input and save the IVF index with the inputs and responses"""
+    user_inputs, responses = load_conversations(conversations_path)
+    embeddings = embedder.embed(user_inputs)
+    index = IVFIndex.build(embeddings, num_lists)
+    index.save(output_path, user_inputs=np.array(user_inputs), responses=np.array(responses))
+    print(f"Indexed {len(user_inputs)} conversations ({embeddings.shape[1]}-d float16 embeddings, "
+          f"{len(index.centroids)} lists) -> {output_path}")
+    return index
+
+def main():
+    """Build the response index, or retrieve a response for a query"""
+    parser = argparse.ArgumentParser(description="Embedding-based response retrieval over conversations.json")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help="Trained Keras classifier")
+    parser.add_argument('--tokenizer', default=DEFAULT_TOKENIZER, help="Tokenizer JSON saved with the model")
+    parser.add_argument('--conversations', default=DEFAULT_CONVERSATIONS)
+    parser.add_argument('--output', default=DEFAULT_INDEX_PATH, help="Where the index .npz is written")
+    parser.add_argument('--num-lists', type=int, help="IVF lists (default: about sqrt of the conversation count)")
+    parser.add_argument('--query', help="Retrieve from the index at --output instead of building it")
+    parser.add_argument('--top-k', type=int, default=1)
+    parser.add_argument('--nprobe', type=int, default=DEFAULT_NPROBE, help="IVF lists searched per query")
+    args = parser.parse_args()
+
+    embedder = TextEmbedder(args.model, args.tokenizer)
+
+    if args.query:
+        retriever = ResponseRetriever(args.output, embedder)
+        start = time.perf_counter()
+        results = retriever.retrieve(args.query, args.top_k, args.nprobe)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(json.dumps({'results': results, 'latency_ms': round(elapsed_ms, 3)}, indent=2))
+        return
+
+    build_response_index(embedder, args.conversations, args.output, args.num_lists)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Training Sample Deduplication for VitalAid
+Drops repeated (text, label) samples with a hash set or a Bloom filter
+"""
+
+import hashlib
+import math
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEDUP_METHODS = ('none', 'hash', 'bloom')
+
+# Default false positive rate of the Bloom filter. A false positive drops a
+# unique sample, so this is the expected fraction of unique samples lost.
+DEFAULT_ERROR_RATE = 1e-4
+
+def sample_key(sample: Dict) -> bytes:
+    """128-bit digest identifying a sample by its text and label"""
+    return hashlib.blake2b(f"{sample['label']}\0{sample['text']}".encode('utf-8'), digest_size=16).digest()
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def add(self, key: bytes) -> bool:
+        """Add a 128-bit key; return False if it was (probably) already present
+
+        Bit positions come from double hashing the two halves of the key.
+        """
+        h1 = int.from_bytes(key[:8], 'little')
+        h2 = int.from_bytes(key[8:16], 'little') | 1
+        bits = self.bits
+        present = True
+        for i in range(self.num_hashes):
+            position = (h1 + i * h2) % self.num_bits
+            byte, mask = position >> 3, 1 << (position & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                present = False
+        return not present
+
+class SampleDeduplicator:
+    def __init__(self, method: str = 'hash', capacity: Optional[int] = None,
+                 error_rate: float = DEFAULT_ERROR_RATE):
+        """Keep the first occurrence of every (text, label) sample
+
+        ``hash`` keeps an exact set of 16-byte digests. ``bloom`` uses a fixed
+        amount of memory sized for ``capacity`` samples, for runs where the
+        set would not fit, at the cost of dropping about ``error_rate`` of
+        the unique samples.
+        """
+        if method not in ('hash', 'bloom'):
+            raise ValueError(f"Unknown dedup method {method!r}; expected 'hash' or 'bloom'")
+        if method == 'bloom' and capacity is None:
+            raise ValueError("The bloom method needs the expected number of samples (capacity)")
+
+        self.method = method
+        self.seen = set() if method == 'hash' else None
+        self.bloom = BloomFilter(capacity, error_rate) if method == 'bloom' else None
+        self.total = 0
+        self.dropped = 0
+
+    def add(self, sample: Dict) -> bool:
+        """Record a sample; return True if it is new"""
+        key = sample_key(sample)
+        self.total += 1
+
+        if self.seen is not None:
+            is_new = key not in self.seen
+            if is_new:
+                self.seen.add(key)
+        else:
+            is_new = self.bloom.add(key)
+
+        if not is_new:
+            self.dropped += 1
+        return is_new
+
+    def filter(self, samples: Iterable[Dict]) -> Iterator[Dict]:
+        """Yield only the samples not seen before"""
+        for sample in samples:
+            if self.add(sample):
+                yield sample
+
+    def stats(self) -> Dict:
+        """Counts for the generators' statistics output"""
+        return {
+            'method': self.method,
+            'input_samples': self.total,
+            'kept_samples': self.total - self.dropped,
+            'duplicates_dropped': self.dropped
+        }
+
+def deduplicate_samples(samples: Iterable[Dict], method: str = 'hash', capacity: Optional[int] = None,
+                        error_rate: float = DEFAULT_ERROR_RATE) -> Tuple[Iterator[Dict], Optional[SampleDeduplicator]]:
+    """Lazily drop repeats from ``samples``
+
+    Returns an iterator over the first occurrence of each sample and the
+    deduplicator counting them (None for method 'none'), whose stats() are
+    complete once the iterator is exhausted. Nothing is buffered, so a
+    streamed input stays streamed; callers that need a list can list() it.
+    ``capacity`` sizes the Bloom filter and defaults to len(samples).
+    """
+    if method == 'none':
+        return iter(samples), None
+
+    if capacity is None and method == 'bloom':
+        capacity = len(samples)
+    deduplicator = SampleDeduplicator(method, capacity=capacity, error_rate=error_rate)
+    return deduplicator.filter(samples), deduplicator
+
+def format_dedup_stats(stats: Dict) -> str:
+    """One-line summary of SampleDeduplicator.stats()"""
+    rate = stats['duplicates_dropped'] / stats['input_samples'] if stats['input_samples'] else 0.0
+    return (f"Deduplication ({stats['method']}): dropped {stats['duplicates_dropped']} of "
+            f"{stats['input_samples']} samples ({rate:.1%}), kept {stats['kept_samples']}")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Sequence Length Analysis for VitalAid
+Token-length percentiles of the training texts and the padded length that covers a given share of them
+"""
+
+import argparse
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+
+from text_normalization import tokenize
+
+DEFAULT_COVERAGE = 0.99
+DEFAULT_DATA_PATH = 'data/medical_training_data.json'
+TRAINING_INFO_PATH = '../assets/models/training_info.json'
+REPORTED_PERCENTILES = (50, 90, 95, 99)
+
+# The length the trainers padded to before it was chosen from the data
+BASELINE_MAX_LENGTH = 50
+
+def token_lengths(texts: Iterable[str]) -> List[int]:
+    """Words per text after normalization, as the tokenizers see them"""
+    return [len(tokenize(text)) for text in texts]
+
+def nearest_rank(sorted_lengths: List[int], quantile: float) -> int:
+    """Smallest length at or above ``quantile`` of the (sorted) lengths"""
+    rank = max(1, math.ceil(quantile * len(sorted_lengths)))
+    return sorted_lengths[rank - 1]
+
+def choose_max_length(lengths: List[int], coverage: float = DEFAULT_COVERAGE) -> int:
+    """Shortest padded length that leaves at least ``coverage`` of the texts untruncated"""
+    if not 0 < coverage <= 1:
+        raise ValueError(f"coverage must be in (0, 1], got {coverage}")
+    if not lengths:
+        raise ValueError("No texts to analyze")
+    return max(1, nearest_rank(sorted(lengths), coverage))
+
+def padding_fraction(lengths: List[int], max_length: int) -> float:
+    """Share of the padded (len(lengths), max_length) matrix that is padding"""
+    tokens = sum(min(length, max_length) for length in lengths)
+    return 1 - tokens / (len(lengths) * max_length)
+
+def analyze_sequence_lengths(texts: Iterable[str], coverage: float = DEFAULT_COVERAGE,
+                             baseline_max_length: int = BASELINE_MAX_LENGTH) -> Dict:
+    """Length percentiles, the chosen max length and its effect against ``baseline_max_length``
+
+    The LSTM runs one step per position, padding included, so training
+    and inference time scale with the padded length; ``estimated_speedup``
+    is that step-count ratio.
+    """
+    lengths = token_lengths(texts)
+    max_length = choose_max_length(lengths, coverage)
+    sorted_lengths = sorted(lengths)
+
+    return {
+        'coverage': coverage,
+        'max_sequence_length': max_length,
+        'samples': len(lengths),
+        'percentiles': {f'p{p}': nearest_rank(sorted_lengths, p / 100) for p in REPORTED_PERCENTILES},
+        'mean_length': round(sum(lengths) / len(lengths), 2),
+        'longest': sorted_lengths[-1],
+        'truncated_samples': sum(length > max_length for length in lengths),
+        'baseline_max_length': baseline_max_length,
+        'padding_fraction': {
+            'baseline': round(padding_fraction(lengths, baseline_max_length), 4),
+            'chosen': round(padding_fraction(lengths, max_length), 4)
+        },
+        'estimated_speedup': round(baseline_max_length / max_length, 2)
+    }
+
+def format_analysis(analysis: Dict) -> str:
+    percentiles = ', '.join(f"{name}={value}" for name, value in analysis['percentiles'].items())
+    return '\n'.join([
+        f"Token length percentiles: {percentiles}, max={analysis['longest']}",
+        f"Max sequence length at {analysis['coverage']:.0%} coverage: {analysis['max_sequence_length']} "
+        f"({analysis['truncated_samples']} of {analysis['samples']} samples truncated)",
+        f"Padding: {analysis['padding_fraction']['baseline']:.0%} of each sequence at length "
+        f"{analysis['baseline_max_length']}, {analysis['padding_fraction']['chosen']:.0%} at "
+        f"{analysis['max_sequence_length']}",
+        f"Estimated LSTM speedup: {analysis['estimated_speedup']:.2f}x fewer steps per sample"
+    ])
+
+def save_sequence_length_analysis(analysis: Dict, path: str = TRAINING_INFO_PATH):
+    """Record the analysis in training_info.json, keeping whatever else the file holds"""
+    training_info = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            training_info = json.load(f)
+    training_info['sequence_length_analysis'] = analysis
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(training_info, f, indent=2)
+
+def load_sequence_length_analysis(path: str = TRAINING_INFO_PATH) -> Optional[Dict]:
+    """The analysis saved in training_info.json, or None if there is none"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('sequence_length_analysis')
+
+def load_max_sequence_length(path: str = TRAINING_INFO_PATH) -> Optional[int]:
+    """The chosen max sequence length from training_info.json, or None if none was chosen"""
+    analysis = load_sequence_length_analysis(path)
+    return analysis['max_sequence_length'] if analysis else None
+
+def main():
+    """Analyze the token lengths of a training set and record the chosen max length"""
+    parser = argparse.ArgumentParser(description="Pick MAX_SEQUENCE_LENGTH from the training texts' token lengths")
+    parser.add_argument('--data', default=DEFAULT_DATA_PATH, help="Training data JSON with 'text' fields")
+    parser.add_argument('--coverage', type=float, default=DEFAULT_COVERAGE,
+                        help="Share of texts that must fit without truncation")
+    parser.add_argument('--training-info', default=TRAINING_INFO_PATH,
+                        help="training_info.json the chosen length is written to")
+    parser.add_argument('--dry-run', action='store_true', help="Only print the analysis")
+    args = parser.parse_args()
+
+    with open(args.data, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data['training_data']
+
+    analysis = analyze_sequence_lengths((item['text'] for item in data), args.coverage)
+    print(format_analysis(analysis))
+    if not args.dry_run:
+        save_sequence_length_analysis(analysis, args.training_info)
+        print(f"Saved to {args.training_info}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Streaming tf.data Input Pipeline for VitalAid
+Reads TSV shards lazily and parses and tokenizes batches in-graph, in parallel, for the trainers
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import tensorflow as tf
+from tensorflow.keras.preprocessing.text import Tokenizer
+
+from dataset_shards import iter_tsv_samples
+from text_normalization import normalize_text
+
+# RE2 equivalent of text_normalization's r'[^\w\s]' (RE2's \w is ASCII-only)
+GRAPH_PUNCTUATION_PATTERN = r'[^\p{L}\p{N}_\s]'
+
+def fit_tokenizer_streaming(shard_paths: List[str], num_words: int, oov_token: str = '<OOV>',
+                            index_buckets: Optional[Iterable[int]] = None,
+                            num_buckets: int = 1) -> Tuple[Tokenizer, List[int]]:
+    """Fit a Keras Tokenizer in one lazy pass over the shards
+
+    Texts are normalized with text_normalization before fitting, matching
+    make_tokenize_fn. Only the tokenizer's word counts are kept in memory. The sorted list of
+    labels seen in the data is returned alongside the tokenizer.
+    ``index_buckets``/``num_buckets`` restrict fitting to one split, using
+    the same rule as build_streaming_dataset.
+    """
+    labels = set()
+    keep = set(index_buckets) if index_buckets is not None else None
+
+    def texts():
+        for index, sample in enumerate(iter_tsv_samples(shard_paths)):
+            if keep is not None and index % num_buckets not in keep:
+                continue
+            labels.add(sample['label'])
+            yield normalize_text(sample['text'])
+
+    tokenizer = Tokenizer(num_words=num_words, oov_token=oov_token)
+    tokenizer.fit_on_texts(texts())
+
+    return tokenizer, sorted(labels)
+
+def _make_word_table(tokenizer: Tokenizer) -> tf.lookup.StaticHashTable:
+    """Build a word -> index lookup table matching Tokenizer.texts_to_sequences"""
+    words = []
+    indices = []
+    for word, index in tokenizer.word_index.items():
+        if tokenizer.num_words is None or index < tokenizer.num_words:
+            words.append(word)
+            indices.append(index)
+
+    oov_index = tokenizer.word_index.get(tokenizer.oov_token, 0) if tokenizer.oov_token else 0
+    return tf.lookup.StaticHashTable(
+        tf.lookup.KeyValueTensorInitializer(
+            tf.constant(words, dtype=tf.string),
+            tf.constant(indices, dtype=tf.int64)
+        ),
+        default_value=oov_index
+    )
+
+def _make_label_table(label_to_idx: Dict[int, int]) -> tf.lookup.StaticHashTable:
+    """Build a raw label -> class index lookup table"""
+    return tf.lookup.StaticHashTable(
+        tf.lookup.KeyValueTensorInitializer(
+            tf.constant(list(label_to_idx.keys()), dtype=tf.int64),
+            tf.constant(list(label_to_idx.values()), dtype=tf.int64)
+        ),
+        default_value=-1
+    )
+
+def _parse_lines(lines: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+    """Decode a batch of ``label<TAB>text`` lines into (texts, labels)
+
+    Runs as graph ops rather than Python, so parallel map calls parse
+    batches concurrently instead of queueing on the GIL. Quotes are not
+    special, since write_tsv_shards never quotes the text.
+    """
+    labels, texts = tf.io.decode_csv(
+        lines,
+        record_defaults=[tf.constant([], dtype=tf.int64), tf.constant([''], dtype=tf.string)],
+        field_delim='\t',
+        use_quote_delim=False
+    )
+    return texts, labels
+
+def make_tokenize_fn(tokenizer: Tokenizer, max_length: int):
+    """Return a graph function tokenizing a batch of strings like the Tokenizer
+
+    Mirrors text_normalization.tokenize (lowercase, remove punctuation,
+    split) followed by the Tokenizer's word index lookup and post
+    padding/truncation to ``max_length``.
+    """
+    word_table = _make_word_table(tokenizer)
+
+    def tokenize(texts: tf.Tensor) -> tf.Tensor:
+        texts = tf.strings.lower(texts, encoding='utf-8')
+        texts = tf.strings.regex_replace(texts, GRAPH_PUNCTUATION_PATTERN, '')
+        words = tf.strings.split(texts)
+        token_ids = tf.ragged.map_flat_values(word_table.lookup, words)
+        token_ids = token_ids[:, :max_length]
+        return tf.cast(token_ids.to_tensor(default_value=0, shape=[None, max_length]), tf.int32)
+
+    return tokenize
+
+def build_streaming_dataset(shard_paths: List[str], tokenizer: Tokenizer, max_length: int,
+                            batch_size: int, label_to_idx: Optional[Dict[int, int]] = None,
+                            shuffle_buffer: int = 10000,
+                            index_buckets: Optional[Iterable[int]] = None,
+                            num_buckets: int = 1, seed: int = 42) -> tf.data.Dataset:
+    """Build a batched (X, y) dataset streamed from TSV shards
+
+    Lines are read lazily from the shards, shuffled in a bounded buffer,
+    batched, then parsed and tokenized in-graph with
+    ``num_parallel_calls=AUTOTUNE`` and prefetched. Memory use depends on the buffer sizes, not on the
+    dataset size.
+
+    ``index_buckets``/``num_buckets`` select a deterministic split: a line
+    is kept when its position modulo ``num_buckets`` is in ``index_buckets``.
+    """
+    tokenize = make_tokenize_fn(tokenizer, max_length)
+    label_table = _make_label_table(label_to_idx) if label_to_idx is not None else None
+
+    # Shards are read in order so index-based splits are reproducible
+    lines = tf.data.TextLineDataset(shard_paths)
+
+    if index_buckets is not None:
+        keep = tf.constant(sorted(index_buckets), dtype=tf.int64)
+        lines = lines.enumerate().filter(
+            lambda index, line: tf.reduce_any(tf.equal(index % num_buckets, keep))
+        ).map(lambda index, line: line)
+
+    if shuffle_buffer:
+        lines = lines.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+    def to_features(batch_lines):
+        texts, labels = _parse_lines(batch_lines)
+        if label_table is not None:
+            labels = label_table.lookup(labels)
+        return tokenize(texts), tf.cast(labels, tf.int32)
+
+    return (lines
+            .batch(batch_size)
+            .map(to_features, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
@@ -0,0 +1,63 @@
+"""
+Tests for length-bucketed batching and the fixed-length export of bucketed models
+Run from tools/ml_training with `python -m pytest`; the export tests need TensorFlow
+"""
+
+import numpy as np
+import pytest
+
+from bucketed_batching import bucket_boundaries, padded_timesteps, sequence_lengths
+
+MAX_LENGTH = 8
+VOCAB_SIZE = 50
+NUM_CLASSES = 3
+
+def token_rows(num_rows: int = 30, seed: int = 0) -> np.ndarray:
+    """Post-padded token IDs of random lengths"""
+    rng = np.random.default_rng(seed)
+    X = np.zeros((num_rows, MAX_LENGTH), dtype=np.int32)
+    for row, length in zip(X, rng.integers(1, MAX_LENGTH + 1, num_rows)):
+        row[:length] = rng.integers(1, VOCAB_SIZE, length)
+    return X
+
+def test_sequence_lengths_ignore_post_padding():
+    X = np.array([[3, 4, 0, 0], [5, 0, 6, 0], [0, 0, 0, 0]])
+    assert sequence_lengths(X).tolist() == [2, 3, 1]
+
+def test_every_row_fits_a_bucket():
+    lengths = sequence_lengths(token_rows())
+    boundaries = bucket_boundaries(lengths, num_buckets=3, max_length=MAX_LENGTH)
+    assert boundaries[-1] == MAX_LENGTH + 1
+    assert (padded_timesteps(lengths, boundaries) >= lengths).all()
+
+def test_bucketed_chatbot_model_converts_to_int8(tmp_path):
+    tf = pytest.importorskip('tensorflow')
+    from train_medical_chatbot_model import MedicalChatbotTrainer
+
+    trainer = MedicalChatbotTrainer(max_words=VOCAB_SIZE, max_length=MAX_LENGTH, bucketed=True)
+    trainer.build_model(NUM_CLASSES)
+    X = token_rows()
+    trainer._calibration_data = (X, np.arange(len(X)) % NUM_CLASSES)
+
+    tflite_path = trainer.convert_to_tflite(str(tmp_path / 'bucketed.tflite'), calibration_size=10)
+
+    interpreter = tf.lite.Interpreter(model_path=tflite_path)
+    input_detail = interpreter.get_input_details()[0]
+    assert input_detail['dtype'] == np.uint8
+    assert input_detail['shape'].tolist() == [1, MAX_LENGTH]
+
+def test_bucketed_classifier_exports_float32_input():
+    pytest.importorskip('tensorflow')
+    pytest.importorskip('sklearn')
+    from bucketed_batching import fixed_length_model
+    from train_classification_model import create_classification_model
+
+    hyperparameters = {'vocab_size': VOCAB_SIZE, 'max_sequence_length': MAX_LENGTH}
+    padded = create_classification_model(NUM_CLASSES, hyperparameters=hyperparameters)
+    bucketed = create_classification_model(NUM_CLASSES, hyperparameters=hyperparameters, bucketed=True)
+    exported = fixed_length_model(bucketed, MAX_LENGTH)
+
+    assert exported.inputs[0].dtype == padded.inputs[0].dtype == 'float32'
+    assert tuple(exported.inputs[0].shape) == (None, MAX_LENGTH)
+    X = token_rows(4).astype(np.float32)
+    np.testing.assert_allclose(exported.predict(X, verbose=0), bucketed.predict(X, verbose=0), rtol=1e-5)
@@ -0,0 +1,34 @@
+"""
+Tests for the int8 calibration samples
+Run from tools/ml_training with `python -m pytest`
+"""
+
+import types
+
+import numpy as np
+
+from calibration_data import CalibrationSet, model_input_dtype, stratified_indices
+
+def fake_model(dtype):
+    """Stand-in exposing only the Keras ``inputs[0].dtype`` attribute"""
+    return types.SimpleNamespace(inputs=[types.SimpleNamespace(dtype=dtype)])
+
+def test_stratified_indices_take_classes_in_turn():
+    labels = [0] * 8 + [1] * 2 + [2] * 2
+    selected = stratified_indices(labels, 6)
+    assert sorted(np.asarray(labels)[selected].tolist()) == [0, 0, 1, 1, 2, 2]
+
+def test_samples_match_the_model_input_dtype():
+    X = np.arange(12, dtype=np.int64).reshape(6, 2)
+    labels = [0, 1, 0, 1, 0, 1]
+
+    for model_dtype, expected in (('int32', np.int32), ('float32', np.float32)):
+        dtype = model_input_dtype(fake_model(model_dtype))
+        calibration = CalibrationSet.from_arrays(X, labels, size=4, dtype=dtype)
+        samples = list(calibration.representative_dataset())
+        assert len(samples) == 4
+        assert all(sample.dtype == expected and sample.shape == (1, 2) for [sample] in samples)
+
+def test_samples_default_to_float32():
+    calibration = CalibrationSet.from_texts(["a", "b"], [0, 1], lambda texts: np.ones((len(texts), 3)), size=2)
+    assert calibration.samples.dtype == np.float32
@@ -0,0 +1,129 @@
+"""
+Tests for the tokenizer handling in train_medical_chatbot_model
+Run from tools/ml_training with `python -m pytest`; TensorFlow is replaced by stubs
+"""
+
+import json
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from dataset_shards import write_npy_dataset
+from train_medical_chatbot_model import MedicalChatbotTrainer, load_and_preprocess, resolve_max_length
+
+MAX_LENGTH = 6
+
+class StubTokenizer:
+    """Records fits and lookups; indexes words in first-seen order like Keras"""
+    instances = []
+
+    def __init__(self, num_words=None, oov_token=None):
+        self.num_words = num_words
+        self.oov_token = oov_token
+        self.word_index = {oov_token: 1}
+        self.fitted_texts = []
+        self.lookups = []
+        StubTokenizer.instances.append(self)
+
+    def fit_on_texts(self, texts):
+        texts = list(texts)
+        self.fitted_texts.append(texts)
+        for text in texts:
+            for word in text.split():
+                self.word_index.setdefault(word, len(self.word_index) + 1)
+
+    def texts_to_sequences(self, texts):
+        self.lookups.append(self.word_index)
+        return [[self.word_index.get(word, 1) for word in text.split()] for text in texts]
+
+def stub_pad_sequences(sequences, maxlen, padding, truncating):
+    assert padding == truncating == 'post'
+    padded = np.zeros((len(sequences), maxlen), dtype=np.int32)
+    for row, sequence in zip(padded, sequences):
+        sequence = sequence[:maxlen]
+        row[:len(sequence)] = sequence
+    return padded
+
+@pytest.fixture(autouse=True)
+def stub_keras_preprocessing(monkeypatch):
+    """Serve the lazy Keras preprocessing imports from stubs"""
+    StubTokenizer.instances = []
+    text_module = types.ModuleType('tensorflow.keras.preprocessing.text')
+    text_module.Tokenizer = StubTokenizer
+    sequence_module = types.ModuleType('tensorflow.keras.preprocessing.sequence')
+    sequence_module.pad_sequences = stub_pad_sequences
+
+    for name in ('tensorflow', 'tensorflow.keras', 'tensorflow.keras.preprocessing'):
+        monkeypatch.setitem(sys.modules, name, types.ModuleType(name))
+    monkeypatch.setitem(sys.modules, text_module.__name__, text_module)
+    monkeypatch.setitem(sys.modules, sequence_module.__name__, sequence_module)
+
+@pytest.fixture
+def split_samples(monkeypatch):
+    """25 samples, so split_train_val_test yields 16 train, 4 validation and 5 test"""
+    texts = ([f"Train word{i}!" for i in range(16)] +
+             [f"Val word{i}" for i in range(4)] +
+             [f"TEST word{i}" for i in range(5)])
+    labels = [i % 3 for i in range(len(texts))]
+    monkeypatch.setattr(MedicalChatbotTrainer, 'load_data', lambda self: (texts, labels))
+    return texts, labels
+
+def test_tokenizer_fitted_once_on_training_split(split_samples):
+    trainer = MedicalChatbotTrainer(max_length=MAX_LENGTH)
+    load_and_preprocess(trainer)
+
+    assert len(StubTokenizer.instances) == 1
+    tokenizer = StubTokenizer.instances[0]
+    assert tokenizer.fitted_texts == [[f"train word{i}" for i in range(16)]]
+    assert 'val' not in tokenizer.word_index
+    assert 'test' not in tokenizer.word_index
+
+def test_splits_share_word_index(split_samples):
+    trainer = MedicalChatbotTrainer(max_length=MAX_LENGTH)
+    X_train, _, X_val, _, X_test, _ = load_and_preprocess(trainer)
+
+    tokenizer = StubTokenizer.instances[0]
+    assert trainer.tokenizer is tokenizer
+    assert len(tokenizer.lookups) == 3
+    assert all(word_index is tokenizer.word_index for word_index in tokenizer.lookups)
+
+    word_index = tokenizer.word_index
+    assert X_train[0].tolist() == [word_index['train'], word_index['word0'], 0, 0, 0, 0]
+    # Words first seen in validation/test fall back to <OOV>
+    assert X_val[0].tolist() == [1, word_index['word0'], 0, 0, 0, 0]
+    assert X_test[0].tolist() == [1, word_index['word0'], 0, 0, 0, 0]
+    assert X_train.shape == (16, MAX_LENGTH) and X_val.shape == (4, MAX_LENGTH) and X_test.shape == (5, MAX_LENGTH)
+
+def test_transform_texts_requires_fitted_tokenizer():
+    trainer = MedicalChatbotTrainer(max_length=MAX_LENGTH)
+    with pytest.raises(ValueError, match="not fitted"):
+        trainer.transform_texts(["chest pain"])
+
+def test_transform_texts_reuses_cache_until_refit():
+    trainer = MedicalChatbotTrainer(max_length=MAX_LENGTH)
+    trainer.fit_tokenizer(["chest pain", "head ache"])
+    first = trainer.transform_texts(["Chest pain", "chest pain."])
+    trainer.transform_texts(["chest pain"])
+
+    tokenizer = StubTokenizer.instances[0]
+    assert first[0].tolist() == first[1].tolist()
+    # Both spellings normalize to one text, converted once across both calls
+    assert len(tokenizer.lookups) == 1
+
+    trainer.fit_tokenizer(["pain chest"])
+    assert trainer.transform_texts(["chest pain"])[0].tolist()[:2] == [3, 2]
+    assert len(StubTokenizer.instances[1].lookups) == 1
+
+def test_max_length_chosen_from_chatbot_texts(tmp_path):
+    data_file = tmp_path / 'chatbot.json'
+    texts = ["one"] * 50 + ["one two three"] * 49 + ["one two three four five six seven"]
+    data_file.write_text(json.dumps({'training_data': [{'text': text, 'label': 0} for text in texts]}))
+
+    # 99% of these texts fit in 3 tokens
+    assert resolve_max_length(data_file=str(data_file)) == 3
+
+def test_max_length_fixed_by_npy_dataset(tmp_path):
+    write_npy_dataset(np.zeros((2, 7)), np.zeros(2), str(tmp_path))
+    assert resolve_max_length(npy_dataset=str(tmp_path), data_file=str(tmp_path / 'missing.json')) == 7
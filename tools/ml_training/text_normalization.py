@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Shared Text Normalization for VitalAid
+One normalization used by the data generators, vocabulary builders and trainers
+"""
+
+import re
+import string
+from typing import Dict, Iterable, List
+
+# ASCII punctuation is deleted with bytes.translate, which is several times
+# faster than str.translate or re.sub for deletions. "_" is kept because it
+# is a word character (matching the previous r'[^\w\s]' rule).
+_PUNCTUATION_BYTES = string.punctuation.replace('_', '').encode('ascii')
+
+# Fallback for non-ASCII text, where punctuation outside string.punctuation
+# (curly quotes, dashes, ...) has to be removed as well
+_NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip punctuation and collapse whitespace"""
+    text = text.lower()
+    if text.isascii():
+        text = text.encode('ascii').translate(None, _PUNCTUATION_BYTES).decode('ascii')
+    else:
+        text = _NON_WORD_PATTERN.sub('', text)
+    return ' '.join(text.split())
+
+def tokenize(text: str) -> List[str]:
+    """Normalize text and split it into words"""
+    return normalize_text(text).split()
+
+def normalize_texts(texts: Iterable[str]) -> List[str]:
+    """Normalize a batch of texts
+
+    Generated datasets repeat the same texts many times, so each distinct
+    text is normalized only once per call.
+    """
+    cache: Dict[str, str] = {}
+    normalized = []
+    for text in texts:
+        result = cache.get(text)
+        if result is None:
+            result = cache[text] = normalize_text(text)
+        normalized.append(result)
+    return normalized
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+TFLite Conversion Helpers for VitalAid
+Builtin-ops-only conversion with Flex op checks, and size/init-time reports
+"""
+
+import json
+import time
+from typing import Dict, List
+
+import tensorflow as tf
+
+CONVERSION_REPORT_FILE = 'conversion_report.json'
+
+def _fixed_batch_concrete_function(model: tf.keras.Model):
+    """Trace the model with a batch size of 1
+
+    With a static batch size the converter fuses Keras LSTMs into the
+    builtin UNIDIRECTIONAL_SEQUENCE_LSTM op instead of a TensorList while
+    loop, which would need Flex ops.
+    """
+    model_input = model.inputs[0]
+    input_spec = tf.TensorSpec([1] + list(model_input.shape[1:]), model_input.dtype)
+    run_model = tf.function(lambda inputs: model(inputs, training=False))
+    return run_model.get_concrete_function(input_spec)
+
+def find_flex_ops(tflite_model: bytes) -> List[str]:
+    """Names of the Flex (SELECT_TF_OPS) ops in a converted model"""
+    interpreter = tf.lite.Interpreter(model_content=tflite_model)
+    return sorted({op['op_name'] for op in interpreter._get_ops_details()
+                   if op['op_name'].startswith('Flex')})
+
+def convert_keras_model(model: tf.keras.Model, builtin_only: bool = False) -> bytes:
+    """Convert a Keras model to TFLite
+
+    ``builtin_only`` converts a batch-size-1 trace with tensor lists
+    lowered and only TFLITE_BUILTINS allowed, so the app does not need
+    the Flex delegate. Raises ValueError if any Flex op remains. Otherwise
+    the model is converted as before, with SELECT_TF_OPS as a fallback
+    for ops without a builtin kernel.
+    """
+    if builtin_only:
+        converter = tf.lite.TFLiteConverter.from_concrete_functions(
+            [_fixed_batch_concrete_function(model)], model)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+        converter._experimental_lower_tensor_list_ops = True
+    else:
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        converter.target_spec.supported_ops = [
+            tf.lite.OpsSet.TFLITE_BUILTINS,
+            tf.lite.OpsSet.SELECT_TF_OPS
+        ]
+        converter._experimental_lower_tensor_list_ops = False
+
+    tflite_model = converter.convert()
+
+    if builtin_only:
+        flex_ops = find_flex_ops(tflite_model)
+        if flex_ops:
+            raise ValueError(f"Builtin-only conversion still contains Flex ops: {', '.join(flex_ops)}")
+
+    return tflite_model
+
+def measure_init_time(tflite_model: bytes, repeats: int = 5) -> float:
+    """Best time in milliseconds to create an interpreter and allocate its tensors"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        interpreter = tf.lite.Interpreter(model_content=tflite_model)
+        interpreter.allocate_tensors()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def conversion_report(model: tf.keras.Model, name: str, path: str = CONVERSION_REPORT_FILE) -> Dict:
+    """Convert ``model`` both ways and save a size/init-time comparison to ``path``"""
+    report = {'model': name}
+
+    for mode, builtin_only in (('select_tf_ops', False), ('builtin_only', True)):
+        try:
+            tflite_model = convert_keras_model(model, builtin_only=builtin_only)
+        except Exception as e:
+            report[mode] = {'error': str(e)}
+            continue
+        report[mode] = {
+            'size_bytes': len(tflite_model),
+            'init_ms': round(measure_init_time(tflite_model), 2),
+            'flex_ops': find_flex_ops(tflite_model)
+        }
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Conversion report saved to {path}")
+    for mode in ('select_tf_ops', 'builtin_only'):
+        result = report[mode]
+        if 'error' in result:
+            print(f"  {mode}: failed ({result['error'].splitlines()[0]})")
+        else:
+            print(f"  {mode}: {result['size_bytes'] / 1024:.1f} KB, init {result['init_ms']} ms, "
+                  f"{len(result['flex_ops'])} Flex ops")
+
+    return report
+
+def add_conversion_arguments(parser):
+    """Add the --builtin-ops/--conversion-report options shared by the trainers"""
+    parser.add_argument('--builtin-ops', action='store_true',
+                        help="Export with TFLite builtin ops only (no Flex delegate); fails if a Flex op remains")
+    parser.add_argument('--conversion-report', action='store_true',
+                        help=f"Compare Flex and builtin-only exports (size, init time) in {CONVERSION_REPORT_FILE}")
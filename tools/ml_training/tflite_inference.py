@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+TFLite Text Classifier Inference for VitalAid
+Loads a .tflite model with its tokenizer/labels JSON and classifies texts like the app does
+"""
+
+import json
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from prediction_cache import PredictionCache
+from text_normalization import normalize_texts
+
+try:
+    # The standalone runtime is much lighter than TensorFlow when installed
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    import tensorflow as tf
+    Interpreter = tf.lite.Interpreter
+
+class TextEncoder:
+    def __init__(self, word_index: Dict[str, int], max_length: int, num_words: Optional[int] = None,
+                 oov_token: Optional[str] = None):
+        """Convert texts to padded token IDs the way the Keras Tokenizer did at training time
+
+        Words missing from ``word_index`` or with an index of at least
+        ``num_words`` become the OOV index (or are dropped without an OOV
+        token). Sequences are post-padded and post-truncated.
+        """
+        self.word_index = word_index
+        self.max_length = max_length
+        self.num_words = num_words
+        self.oov_index = word_index.get(oov_token) if oov_token else None
+
+    @classmethod
+    def from_json(cls, tokenizer_path: str, max_length: int) -> 'TextEncoder':
+        """Load the classifier's tokenizer config or Keras Tokenizer.to_json output"""
+        with open(tokenizer_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        if 'config' in data:
+            # Tokenizer.to_json stores its dictionaries as JSON strings
+            config = data['config']
+            word_index = config['word_index']
+            if isinstance(word_index, str):
+                word_index = json.loads(word_index)
+            return cls(word_index, max_length, config.get('num_words'), config.get('oov_token'))
+
+        return cls(data['word_index'], max_length, data.get('num_words'), data.get('oov_token'))
+
+    def encode_one(self, text: str) -> List[int]:
+        """Token IDs of one normalized text, before padding"""
+        ids = []
+        for word in text.split():
+            index = self.word_index.get(word)
+            if index is None or (self.num_words is not None and index >= self.num_words):
+                index = self.oov_index
+            if index is not None:
+                ids.append(index)
+        return ids
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Padded int32 (len(texts), max_length) matrix for raw texts"""
+        matrix = np.zeros((len(texts), self.max_length), dtype=np.int32)
+        for row, text in enumerate(normalize_texts(texts)):
+            ids = self.encode_one(text)[:self.max_length]
+            matrix[row, :len(ids)] = ids
+        return matrix
+
+def load_class_names(labels_path: str) -> List[str]:
+    """Class names by index from any of the labels.json layouts the trainers write"""
+    with open(labels_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, list):
+        return data
+    if 'class_names' in data:
+        return data['class_names']
+    mapping = data.get('reverse_categories') or data.get('idx_to_label')
+    return [str(mapping[key]) for key in sorted(mapping, key=int)]
+
+class TFLiteClassifier:
+    def __init__(self, model_path: str, tokenizer_path: str, labels_path: Optional[str] = None,
+                 num_threads: int = 1, cache: Optional[PredictionCache] = None):
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+
+        self.input_detail = self.interpreter.get_input_details()[0]
+        self.output_detail = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input_detail['shape'][0])
+        self.dynamic_batch = int(self.input_detail['shape_signature'][0]) == -1
+
+        max_length = int(self.input_detail['shape'][1])
+        self.encoder = TextEncoder.from_json(tokenizer_path, max_length)
+        self.class_names = load_class_names(labels_path) if labels_path else None
+        self.cache = cache
+
+    def _quantize_input(self, token_ids: np.ndarray) -> np.ndarray:
+        """Cast (and quantize, for integer-I/O models) token IDs to the input dtype"""
+        dtype = self.input_detail['dtype']
+        scale, zero_point = self.input_detail['quantization']
+        if scale and np.issubdtype(dtype, np.integer) and dtype != np.int32:
+            info = np.iinfo(dtype)
+            return np.clip(np.round(token_ids / scale + zero_point), info.min, info.max).astype(dtype)
+        return token_ids.astype(dtype)
+
+    def _dequantize_output(self, output: np.ndarray) -> np.ndarray:
+        scale, zero_point = self.output_detail['quantization']
+        if scale and np.issubdtype(output.dtype, np.integer):
+            return (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    def _invoke(self, inputs: np.ndarray) -> np.ndarray:
+        if self.dynamic_batch and len(inputs) != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_detail['index'], list(inputs.shape))
+            self.interpreter.allocate_tensors()
+            self.batch_size = len(inputs)
+        self.interpreter.set_tensor(self.input_detail['index'], inputs)
+        self.interpreter.invoke()
+        return self._dequantize_output(self.interpreter.get_tensor(self.output_detail['index']))
+
+    def predict_token_ids(self, token_ids: np.ndarray) -> np.ndarray:
+        """Class probabilities for a batch of padded token IDs"""
+        inputs = self._quantize_input(token_ids)
+        if self.dynamic_batch or len(inputs) == self.batch_size:
+            return self._invoke(inputs)
+        # Fixed-batch models (e.g. builtin-only exports) run in chunks of
+        # their batch size, with the last chunk zero-padded
+        outputs = []
+        for start in range(0, len(inputs), self.batch_size):
+            chunk = inputs[start:start + self.batch_size]
+            padded = np.zeros((self.batch_size,) + chunk.shape[1:], dtype=chunk.dtype)
+            padded[:len(chunk)] = chunk
+            outputs.append(self._invoke(padded)[:len(chunk)])
+        return np.concatenate(outputs)
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """Class probabilities for a batch of raw texts (cached rows skip the interpreter)"""
+        token_ids = self.encoder.encode(texts)
+        if self.cache is None:
+            return self.predict_token_ids(token_ids)
+        return self.cache.predict(token_ids, self.predict_token_ids)
+
+    def predict_batch(self, texts: Sequence[str]) -> List[Dict]:
+        """Top class (index, name, confidence) for each text"""
+        probabilities = self.predict_proba(texts)
+        indices = np.argmax(probabilities, axis=1)
+        return [{
+            'index': int(index),
+            'label': self.class_names[index] if self.class_names else str(index),
+            'confidence': float(row[index])
+        } for index, row in zip(indices, probabilities)]
+
+    def predict(self, text: str) -> Dict:
+        """Top class (index, name, confidence) for one text"""
+        return self.predict_batch([text])[0]
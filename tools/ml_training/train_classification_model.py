@@ -11,13 +11,25 @@ from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Dense, Dropout, LSTM, Embedding, GlobalMaxPooling1D
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from tensorflow.keras.preprocessing.text import Tokenizer
+from tensorflow.keras.preprocessing.text import Tokenizer, tokenizer_from_json
 from tensorflow.keras.preprocessing.sequence import pad_sequences
 from sklearn.model_selection import train_test_split
+import argparse
 import os
 import re
 from datetime import datetime
 
+import text_normalization
+from bucketed_batching import DEFAULT_NUM_BUCKETS, add_bucketing_arguments, bucketed_datasets, fixed_length_model
+from dataset_cache import add_cache_arguments, cache_from_args, cache_key, hash_file, hash_texts
+from dataset_shards import list_tsv_shards, load_npy_dataset, load_shard_manifest
+from fast_training import (EpochTimer, TrainingConfig, add_fast_training_arguments, configure_training,
+                           float32_model, record_epoch_times)
+from sequence_length import TRAINING_INFO_PATH, load_max_sequence_length, load_sequence_length_analysis
+from streaming_dataset import build_streaming_dataset, fit_tokenizer_streaming
+from text_normalization import normalize_texts
+from tflite_conversion import add_conversion_arguments, conversion_report, convert_keras_model
+
 # Configuration
 VOCAB_SIZE = 1000
 MAX_SEQUENCE_LENGTH = 50
@@ -27,6 +39,18 @@ BATCH_SIZE = 32
 EPOCHS = 30
 DROPOUT_RATE = 0.3
 VALIDATION_SPLIT = 0.2
+KERAS_MODEL_PATH = 'medical_classifier_model.h5'
+
+# The settings hyperparameter_sweep.py may vary; anything not overridden
+# keeps the value above
+HYPERPARAMETERS = {
+    'vocab_size': VOCAB_SIZE,
+    'max_sequence_length': MAX_SEQUENCE_LENGTH,
+    'embedding_dim': EMBEDDING_DIM,
+    'hidden_units': HIDDEN_UNITS,
+    'batch_size': BATCH_SIZE,
+    'dropout_rate': DROPOUT_RATE
+}
 
 def load_medical_data():
     """Load the medical training data"""
@@ -47,54 +71,155 @@ def load_medical_data():
     
     return texts, labels
 
-def preprocess_texts(texts):
-    """Preprocess and tokenize texts"""
+def preprocess_texts(texts, cache=None, vocab_size=VOCAB_SIZE, max_sequence_length=MAX_SEQUENCE_LENGTH):
+    """Preprocess and tokenize texts
+    
+    With a cache, the padded sequences and fitted tokenizer are reused when
+    the texts and tokenization settings are unchanged.
+    """
     print("Preprocessing texts...")
     
+    if cache is not None:
+        key = cache_key(
+            'train_classification_model.preprocess',
+            texts=hash_texts(texts),
+            vocab_size=vocab_size,
+            max_sequence_length=max_sequence_length,
+            normalization_source=hash_file(text_normalization.__file__)
+        )
+        cached = cache.get_arrays(key)
+        if cached is not None:
+            print(f"Loaded tokenized texts from cache ({key[:12]})")
+            return cached['sequences'], tokenizer_from_json(cached['metadata']['tokenizer'])
+    
+    # Normalize the same way as the data generators
+    texts = normalize_texts(texts)
+    
     # Create tokenizer
-    tokenizer = Tokenizer(num_words=VOCAB_SIZE, oov_token="<OOV>")
+    tokenizer = Tokenizer(num_words=vocab_size, oov_token="<OOV>")
     tokenizer.fit_on_texts(texts)
     
     # Convert texts to sequences
     sequences = tokenizer.texts_to_sequences(texts)
     
     # Pad sequences
-    padded_sequences = pad_sequences(sequences, maxlen=MAX_SEQUENCE_LENGTH, padding='post', truncating='post')
+    padded_sequences = pad_sequences(sequences, maxlen=max_sequence_length, padding='post', truncating='post')
+    
+    if cache is not None:
+        cache.put_arrays(key, metadata={'tokenizer': tokenizer.to_json()}, sequences=padded_sequences)
     
     return padded_sequences, tokenizer
 
-def create_classification_model(num_classes):
-    """Create a text classification model"""
+def load_npy_data(shard_dir, max_sequence_length=None):
+    """Memory-map pre-tokenized data written by prepare_data.py --npy-dataset
+    
+    Returns the token matrix, the raw labels, the class labels and a
+    Tokenizer rebuilt from the stored vocabulary, so nothing is parsed or
+    re-tokenized. The data keeps the length it was written at; passing a
+    different ``max_sequence_length`` is an error.
+    """
+    print(f"Memory-mapping pre-tokenized data from {shard_dir}...")
+    
+    X, labels, manifest = load_npy_dataset(shard_dir)
+    max_sequence_length = max_sequence_length or manifest['max_length']
+    if manifest['max_length'] != max_sequence_length or manifest['vocab_size'] > VOCAB_SIZE:
+        raise ValueError(
+            f"{shard_dir} was prepared with max_length={manifest['max_length']}, "
+            f"vocab_size={manifest['vocab_size']}; expected max_length={max_sequence_length}, "
+            f"vocab_size<={VOCAB_SIZE}"
+        )
+    
+    vocabulary = manifest['vocabulary']
+    tokenizer = Tokenizer(num_words=VOCAB_SIZE, oov_token="<UNK>")
+    tokenizer.word_index = dict(vocabulary)
+    tokenizer.index_word = {idx: word for word, idx in vocabulary.items()}
+    
+    unique_labels = sorted(manifest['class_info']['class_labels'].values())
+    
+    print(f"Loaded {len(X)} pre-tokenized medical training samples")
+    print(f"Number of unique labels: {len(unique_labels)}")
+    
+    return X, labels, unique_labels, tokenizer
+
+def load_streaming_data(shard_dir, max_sequence_length=MAX_SEQUENCE_LENGTH):
+    """Build streaming train/validation datasets from TSV shards
+    
+    Used instead of load_medical_data + preprocess_texts when the dataset is
+    too large to hold in memory. Every 1/VALIDATION_SPLIT-th line goes to the
+    validation set.
+    """
+    print(f"Streaming medical training data from {shard_dir}...")
+    
+    shard_paths = list_tsv_shards(shard_dir)
+    num_buckets = round(1 / VALIDATION_SPLIT)
+    tokenizer, unique_labels = fit_tokenizer_streaming(
+        shard_paths, VOCAB_SIZE, oov_token="<OOV>",
+        index_buckets=range(1, num_buckets), num_buckets=num_buckets
+    )
+    label_to_idx = {label: idx for idx, label in enumerate(unique_labels)}
+    
+    train_dataset = build_streaming_dataset(
+        shard_paths, tokenizer, max_sequence_length, BATCH_SIZE, label_to_idx,
+        index_buckets=range(1, num_buckets), num_buckets=num_buckets
+    )
+    val_dataset = build_streaming_dataset(
+        shard_paths, tokenizer, max_sequence_length, BATCH_SIZE, label_to_idx,
+        shuffle_buffer=0, index_buckets=[0], num_buckets=num_buckets
+    )
+    
+    print(f"Fitted tokenizer on {tokenizer.document_count} training samples from {len(shard_paths)} shards")
+    print(f"Number of unique labels: {len(unique_labels)}")
+    
+    num_samples = load_shard_manifest(shard_dir)['num_samples']
+    return train_dataset, val_dataset, tokenizer, unique_labels, num_samples
+
+def create_classification_model(num_classes, training_config=None, hyperparameters=None, bucketed=False):
+    """Create a text classification model
+    
+    ``hyperparameters`` overrides entries of HYPERPARAMETERS. A ``bucketed``
+    model takes any sequence length and masks the padding; masked LSTM
+    steps repeat the last real output, so the max pooling is unchanged.
+    """
     print("Creating classification model...")
     
-    model = Sequential([
-        Embedding(input_dim=VOCAB_SIZE, output_dim=EMBEDDING_DIM, input_length=MAX_SEQUENCE_LENGTH),
-        LSTM(HIDDEN_UNITS, return_sequences=True),
-        Dropout(DROPOUT_RATE),
+    training_config = training_config or TrainingConfig()
+    params = {**HYPERPARAMETERS, **(hyperparameters or {})}
+    
+    if bucketed:
+        input_layers = [
+            # float32 like the non-bucketed model's input; the Embedding casts it
+            tf.keras.Input(shape=(None,)),
+            Embedding(input_dim=params['vocab_size'], output_dim=params['embedding_dim'], mask_zero=True)
+        ]
+    else:
+        input_layers = [
+            Embedding(input_dim=params['vocab_size'], output_dim=params['embedding_dim'],
+                      input_length=params['max_sequence_length'])
+        ]
+    
+    model = Sequential(input_layers + [
+        LSTM(params['hidden_units'], return_sequences=True, **training_config.lstm_options()),
+        Dropout(params['dropout_rate']),
         GlobalMaxPooling1D(),
         Dense(64, activation='relu'),
-        Dropout(DROPOUT_RATE),
-        Dense(num_classes, activation='softmax')
+        Dropout(params['dropout_rate']),
+        # Keep the softmax in float32 under mixed precision
+        Dense(num_classes, activation='softmax', dtype='float32')
     ])
     
     model.compile(
         optimizer=Adam(learning_rate=0.001),
         loss='sparse_categorical_crossentropy',
-        metrics=['accuracy']
+        metrics=['accuracy'],
+        jit_compile=training_config.jit_compile
     )
     
     print("Model created successfully")
     model.summary()
     return model
 
-def train_model(model, X, y):
-    """Train the classification model"""
-    print("Starting model training...")
-    
-    # Split data for validation
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=VALIDATION_SPLIT, random_state=42, stratify=y)
-    
-    # Callbacks
+def create_callbacks(epoch_timer=None):
+    """Create the training callbacks shared by the in-memory and streaming paths"""
     early_stopping = EarlyStopping(
         monitor='val_accuracy',
         patience=8,
@@ -110,31 +235,78 @@ def train_model(model, X, y):
         verbose=1
     )
     
+    callbacks = [early_stopping, reduce_lr]
+    if epoch_timer is not None:
+        callbacks.append(epoch_timer)
+    return callbacks
+
+def split_data(X, y):
+    """Stratified train/validation split (fixed seed, so every run validates on the same samples)"""
+    return train_test_split(X, y, test_size=VALIDATION_SPLIT, random_state=42, stratify=y)
+
+def train_model(model, X, y, epoch_timer=None, bucketed=False, num_buckets=DEFAULT_NUM_BUCKETS):
+    """Train the classification model"""
+    print("Starting model training...")
+    
+    # Split data for validation
+    X_train, X_val, y_train, y_val = split_data(X, y)
+    
+    return fit_model(model, X_train, y_train, X_val, y_val, epoch_timer,
+                     bucketed=bucketed, num_buckets=num_buckets)
+
+def fit_model(model, X_train, y_train, X_val, y_val, epoch_timer=None, batch_size=BATCH_SIZE, epochs=EPOCHS,
+              bucketed=False, num_buckets=DEFAULT_NUM_BUCKETS):
+    """Train on an existing train/validation split
+    
+    ``bucketed`` batches samples of similar length together (the model
+    must come from create_classification_model(..., bucketed=True)).
+    """
+    callbacks = create_callbacks(epoch_timer)
+    
+    if bucketed:
+        train_dataset, val_dataset = bucketed_datasets(X_train, y_train, X_val, y_val, batch_size, num_buckets)
+        return model.fit(
+            train_dataset,
+            epochs=epochs,
+            validation_data=val_dataset,
+            callbacks=callbacks,
+            verbose=1
+        )
+    
     # Train model
     history = model.fit(
         X_train, y_train,
-        batch_size=BATCH_SIZE,
-        epochs=EPOCHS,
+        batch_size=batch_size,
+        epochs=epochs,
         validation_data=(X_val, y_val),
-        callbacks=[early_stopping, reduce_lr],
+        callbacks=callbacks,
         verbose=1
     )
     
     return history
 
-def convert_to_tflite(model, output_path):
+def train_model_streaming(model, train_dataset, val_dataset, epoch_timer=None):
+    """Train the classification model on streaming datasets"""
+    print("Starting model training (streaming)...")
+    
+    callbacks = create_callbacks(epoch_timer)
+    
+    history = model.fit(
+        train_dataset,
+        epochs=EPOCHS,
+        validation_data=val_dataset,
+        callbacks=callbacks,
+        verbose=1
+    )
+    
+    return history
+
+def convert_to_tflite(model, output_path, builtin_only=False):
     """Convert Keras model to TensorFlow Lite"""
     print("Converting model to TensorFlow Lite...")
     
-    # Convert to TFLite
-    converter = tf.lite.TFLiteConverter.from_keras_model(model)
-    converter.target_spec.supported_ops = [
-        tf.lite.OpsSet.TFLITE_BUILTINS,
-        tf.lite.OpsSet.SELECT_TF_OPS
-    ]
-    converter._experimental_lower_tensor_list_ops = False
-    
-    tflite_model = converter.convert()
+    # Convert to TFLite (builtin_only: no Flex delegate needed in the app)
+    tflite_model = convert_keras_model(model, builtin_only=builtin_only)
     
     # Save model
     with open(output_path, 'wb') as f:
@@ -155,19 +327,55 @@ def ensure_directories_exist():
 
 def main():
     """Main training pipeline"""
+    parser = argparse.ArgumentParser(description="Train the VitalAid medical text classifier")
+    input_group = parser.add_mutually_exclusive_group()
+    input_group.add_argument('--streaming', metavar='SHARD_DIR',
+                             help="Stream TSV shards from SHARD_DIR instead of loading data/medical_training_data.json")
+    input_group.add_argument('--npy-dataset', metavar='DIR',
+                             help="Memory-map pre-tokenized data written by prepare_data.py --npy-dataset")
+    add_cache_arguments(parser)
+    add_fast_training_arguments(parser)
+    parser.add_argument('--max-sequence-length', type=int,
+                        help="Padded sequence length (default: the --npy-dataset's length, else the length "
+                             f"prepare_data.py recorded in {TRAINING_INFO_PATH}, else {MAX_SEQUENCE_LENGTH})")
+    add_bucketing_arguments(parser)
+    add_conversion_arguments(parser)
+    args = parser.parse_args()
+    if args.bucketed and args.streaming:
+        parser.error("--bucketed needs in-memory data; streaming batches are already padded")
+    
+    if args.npy_dataset:
+        # Pre-tokenized data fixes the length, whenever the analysis last ran
+        max_sequence_length = args.max_sequence_length or load_shard_manifest(args.npy_dataset)['max_length']
+    else:
+        max_sequence_length = args.max_sequence_length or load_max_sequence_length() or MAX_SEQUENCE_LENGTH
+    hyperparameters = {'max_sequence_length': max_sequence_length}
+    
     print("=== VitalAid Medical Text Classification Model Training ===")
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Configuration: VOCAB_SIZE={VOCAB_SIZE}, MAX_SEQUENCE_LENGTH={MAX_SEQUENCE_LENGTH}")
+    print(f"Configuration: VOCAB_SIZE={VOCAB_SIZE}, MAX_SEQUENCE_LENGTH={max_sequence_length}")
     print()
     
     # Ensure required directories exist
     ensure_directories_exist()
     
-    # Load data
-    texts, labels = load_medical_data()
+    # Must run before any model is built (sets the global dtype policy)
+    training_config = configure_training(args.fast, args.mixed_precision)
+    epoch_timer = EpochTimer()
+    
+    if args.streaming:
+        # Stream shards; only the tokenizer vocabulary is held in memory
+        train_dataset, val_dataset, tokenizer, unique_labels, total_samples = load_streaming_data(
+            args.streaming, max_sequence_length)
+    elif args.npy_dataset:
+        # Pre-tokenized arrays; no JSON parsing or tokenization at startup
+        X, labels, unique_labels, tokenizer = load_npy_data(args.npy_dataset, args.max_sequence_length)
+    else:
+        # Load data
+        texts, labels = load_medical_data()
+        unique_labels = sorted(list(set(labels)))
     
     # Get unique labels and create label mapping
-    unique_labels = sorted(list(set(labels)))
     num_classes = len(unique_labels)
     label_to_idx = {label: idx for idx, label in enumerate(unique_labels)}
     idx_to_label = {idx: label for label, idx in label_to_idx.items()}
@@ -175,22 +383,50 @@ def main():
     print(f"Number of classes: {num_classes}")
     print(f"Classes: {unique_labels}")
     
-    # Convert labels to indices
-    label_indices = [label_to_idx[label] for label in labels]
-    
-    # Preprocess texts
-    X, tokenizer = preprocess_texts(texts)
-    y = np.array(label_indices)
-    
-    print(f"Training data shape: X={X.shape}, y={y.shape}")
-    
-    # Create and train model
-    model = create_classification_model(num_classes)
-    history = train_model(model, X, y)
+    if args.streaming:
+        model = create_classification_model(num_classes, training_config, hyperparameters)
+        history = train_model_streaming(model, train_dataset, val_dataset, epoch_timer)
+    elif args.npy_dataset:
+        # Map raw labels to class indices with one vectorized lookup
+        label_lookup = np.zeros(max(unique_labels) + 1, dtype=np.int32)
+        label_lookup[unique_labels] = np.arange(num_classes)
+        y = label_lookup[labels]
+        total_samples = len(X)
+        
+        print(f"Training data shape: X={X.shape}, y={y.shape}")
+        
+        model = create_classification_model(num_classes, training_config, hyperparameters, args.bucketed)
+        history = train_model(model, X, y, epoch_timer, args.bucketed, args.num_buckets)
+    else:
+        # Convert labels to indices
+        label_indices = [label_to_idx[label] for label in labels]
+        
+        # Preprocess texts
+        X, tokenizer = preprocess_texts(texts, cache=cache_from_args(args), max_sequence_length=max_sequence_length)
+        y = np.array(label_indices)
+        total_samples = len(X)
+        
+        print(f"Training data shape: X={X.shape}, y={y.shape}")
+        
+        # Create and train model
+        model = create_classification_model(num_classes, training_config, hyperparameters, args.bucketed)
+        history = train_model(model, X, y, epoch_timer, args.bucketed, args.num_buckets)
+    
+    epoch_timing = record_epoch_times('train_classification_model', training_config, epoch_timer)
     
     # Convert to TFLite
     output_path = '../assets/models/medical_classifier_trained.tflite'
-    model_size = convert_to_tflite(model, output_path)
+    export_model = float32_model(model, training_config)
+    if args.bucketed:
+        # tflite_inference pads to the model's input length, so export it fixed
+        export_model = fixed_length_model(export_model, max_sequence_length)
+    model_size = convert_to_tflite(export_model, output_path, builtin_only=args.builtin_ops)
+    if args.conversion_report:
+        conversion_report(export_model, 'medical_classifier')
+    
+    # Keep the Keras model for quantize_model.py
+    export_model.save(KERAS_MODEL_PATH)
+    print(f"Keras model saved to {KERAS_MODEL_PATH}")
     
     # Save tokenizer and label mappings for inference
     tokenizer_config = {
@@ -211,29 +447,38 @@ def main():
     training_info = {
         'model_info': {
             'vocab_size': VOCAB_SIZE,
-            'max_sequence_length': MAX_SEQUENCE_LENGTH,
+            'max_sequence_length': max_sequence_length,
             'embedding_dim': EMBEDDING_DIM,
             'hidden_units': HIDDEN_UNITS,
             'dropout_rate': DROPOUT_RATE,
             'num_classes': num_classes
         },
         'training_info': {
-            'total_samples': len(X),
+            'total_samples': total_samples,
             'batch_size': BATCH_SIZE,
             'epochs_trained': len(history.history['loss']),
             'final_train_accuracy': float(max(history.history['accuracy'])),
             'final_val_accuracy': float(max(history.history['val_accuracy'])),
             'final_train_loss': float(history.history['loss'][-1]),
             'final_val_loss': float(history.history['val_loss'][-1]),
-            'model_size_bytes': model_size
+            'model_size_bytes': model_size,
+            'tflite_builtin_ops_only': args.builtin_ops,
+            'bucketed_batching': args.bucketed,
+            'training_configuration': training_config.describe(),
+            'epoch_timing': epoch_timing
         },
         'class_info': label_mappings,
         'tokenizer_info': tokenizer_config,
         'training_timestamp': datetime.now().isoformat()
     }
     
+    # Keep prepare_data.py's analysis so later runs pick the same length
+    sequence_analysis = load_sequence_length_analysis()
+    if sequence_analysis:
+        training_info['sequence_length_analysis'] = sequence_analysis
+    
     # Save configurations
-    with open('../assets/models/training_info.json', 'w') as f:
+    with open(TRAINING_INFO_PATH, 'w') as f:
         json.dump(training_info, f, indent=2)
     
     with open('../assets/models/tokenizer.json', 'w') as f:
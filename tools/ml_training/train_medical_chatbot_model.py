@@ -6,30 +6,74 @@ Trains a neural network for medical query classification
 
 import json
 import numpy as np
-import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout, Embedding, LSTM, GlobalMaxPooling1D
-from tensorflow.keras.preprocessing.text import Tokenizer
-from tensorflow.keras.preprocessing.sequence import pad_sequences
-from tensorflow.keras.optimizers import Adam
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from sklearn.metrics import classification_report, confusion_matrix
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import List, Dict, Tuple
+from typing import TYPE_CHECKING, List, Dict, Tuple
+import argparse
 import os
+import sys
+
+from bucketed_batching import DEFAULT_NUM_BUCKETS, add_bucketing_arguments, bucketed_datasets, fixed_length_model
+from calibration_data import DEFAULT_CALIBRATION_SIZE, CalibrationSet, model_input_dtype
+from dataset_cache import DatasetCache, add_cache_arguments, cache_from_args
+from dataset_shards import iter_tsv_samples, list_tsv_shards, load_npy_dataset, load_shard_manifest
+from fast_training import (TrainingConfig, add_fast_training_arguments, configure_training, float32_model,
+                           record_epoch_times)
+from sequence_length import analyze_sequence_lengths, format_analysis
+from text_normalization import normalize_texts
+
+# TensorFlow, scikit-learn, matplotlib and seaborn take seconds to import, so
+# each is imported in the methods that use it: `plot` never loads TensorFlow
+# and `--help` loads none of them
+if TYPE_CHECKING:
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.preprocessing.text import Tokenizer
+
+# Streaming splits: of every 25 samples, 16 train, 4 validation and 5 test,
+# matching the 64/16/20 split used for the in-memory path
+STREAMING_BUCKETS = 25
+STREAMING_TRAIN_BUCKETS = range(0, 16)
+STREAMING_VAL_BUCKETS = range(16, 20)
+STREAMING_TEST_BUCKETS = range(20, 25)
+
+# Padded length of a trainer built without one; `train` chooses it from the data
+DEFAULT_MAX_LENGTH = 50
+
+DEFAULT_DATA_FILE = 'medical_chatbot_training_data.json'
+
+# Distinct texts converted per texts_to_sequences call in transform_texts
+TRANSFORM_BATCH_SIZE = 4096
+
+# History and confusion matrix of the last training run, read by `plot`
+TRAINING_RESULTS_FILE = 'training_results.json'
+
+COMMANDS = ('train', 'convert', 'plot')
 
 class MedicalChatbotTrainer:
-    def __init__(self, max_words: int = 5000, max_length: int = 50):
+    def __init__(self, max_words: int = 5000, max_length: int = DEFAULT_MAX_LENGTH,
+                 training_config: TrainingConfig = None, bucketed: bool = False,
+                 num_buckets: int = DEFAULT_NUM_BUCKETS):
         self.max_words = max_words
         self.max_length = max_length
+        self.training_config = training_config or TrainingConfig()
+        # Length-bucketed batches over a variable-length, masked model;
+        # saved and converted models still take max_length tokens
+        self.bucketed = bucketed
+        self.num_buckets = num_buckets
+        self.epoch_timer = None
+        # Training split kept for int8 calibration: raw (texts, labels) from
+        # preprocess_data, otherwise the arrays/dataset passed to train_model
+        self._calibration_texts = None
+        self._calibration_data = None
         self.tokenizer = None
+        # Padded sequence per normalized text, valid for _sequence_cache_tokenizer only
+        self._sequence_cache = {}
+        self._sequence_cache_tokenizer = None
         self.model = None
         self.history = None
         self.categories = None
         self.reverse_categories = None
         
-    def load_data(self, data_file: str = 'medical_chatbot_training_data.json') -> Tuple[List[str], List[int]]:
+    def load_data(self, data_file: str = DEFAULT_DATA_FILE) -> Tuple[List[str], List[int]]:
         """Load training data from JSON file"""
         with open(data_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -46,17 +90,122 @@ class MedicalChatbotTrainer:
         
         return texts, labels
     
-    def preprocess_data(self, texts: List[str], labels: List[int]) -> Tuple[np.ndarray, np.ndarray]:
-        """Preprocess text data for training"""
-        # Initialize tokenizer
+    def load_npy_data(self, shard_dir: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Memory-map pre-tokenized data written by prepare_data.py --npy-dataset
+        
+        The returned arrays are read-only views of the files on disk, and the
+        tokenizer is rebuilt from the stored vocabulary instead of refitted.
+        """
+        from tensorflow.keras.preprocessing.text import Tokenizer
+        
+        X, y, manifest = load_npy_dataset(shard_dir)
+        if manifest['max_length'] != self.max_length or manifest['vocab_size'] > self.max_words:
+            raise ValueError(
+                f"{shard_dir} was prepared with max_length={manifest['max_length']}, "
+                f"vocab_size={manifest['vocab_size']}; expected max_length={self.max_length}, "
+                f"vocab_size<={self.max_words}"
+            )
+        
+        self.categories = manifest['class_info']['class_labels']
+        self.reverse_categories = {str(label): name for name, label in self.categories.items()}
+        
+        vocabulary = manifest['vocabulary']
+        self.tokenizer = Tokenizer(num_words=self.max_words, oov_token='<UNK>')
+        self.tokenizer.word_index = dict(vocabulary)
+        self.tokenizer.index_word = {idx: word for word, idx in vocabulary.items()}
+        
+        print(f"Loaded {len(X)} pre-tokenized training samples")
+        print(f"Categories: {list(self.categories.keys())}")
+        
+        return X, y
+    
+    def load_streaming_data(self, shard_dir: str,
+                            batch_size: int = 32) -> 'Tuple[tf.data.Dataset, tf.data.Dataset, tf.data.Dataset]':
+        """Build streaming train/validation/test datasets from TSV shards
+        
+        The tokenizer is fitted in one lazy pass over the training split, so
+        memory use does not grow with the number of samples.
+        """
+        from streaming_dataset import build_streaming_dataset, fit_tokenizer_streaming
+        
+        manifest = load_shard_manifest(shard_dir)
+        self.categories = manifest['categories']
+        self.reverse_categories = manifest['reverse_categories']
+        shard_paths = list_tsv_shards(shard_dir)
+        
+        self.tokenizer, _ = fit_tokenizer_streaming(
+            shard_paths, self.max_words, oov_token='<OOV>',
+            index_buckets=STREAMING_TRAIN_BUCKETS, num_buckets=STREAMING_BUCKETS
+        )
+        
+        def split(buckets, shuffle_buffer):
+            return build_streaming_dataset(
+                shard_paths, self.tokenizer, self.max_length, batch_size,
+                shuffle_buffer=shuffle_buffer, index_buckets=buckets, num_buckets=STREAMING_BUCKETS
+            )
+        
+        print(f"Streaming {manifest['num_samples']} samples from {len(shard_paths)} shards")
+        print(f"Categories: {list(self.categories.keys())}")
+        print(f"Vocabulary size: {len(self.tokenizer.word_index)}")
+        
+        return (split(STREAMING_TRAIN_BUCKETS, 10000),
+                split(STREAMING_VAL_BUCKETS, 0),
+                split(STREAMING_TEST_BUCKETS, 0))
+    
+    def fit_tokenizer(self, texts: List[str]) -> 'Tokenizer':
+        """Fit a new tokenizer on the training texts only"""
+        from tensorflow.keras.preprocessing.text import Tokenizer
+        
+        # Normalize the same way as the data generators
+        texts = normalize_texts(texts)
+        
         self.tokenizer = Tokenizer(num_words=self.max_words, oov_token='<OOV>')
         self.tokenizer.fit_on_texts(texts)
         
-        # Convert texts to sequences
-        sequences = self.tokenizer.texts_to_sequences(texts)
+        return self.tokenizer
+    
+    def transform_texts(self, texts: List[str], batch_size: int = TRANSFORM_BATCH_SIZE) -> np.ndarray:
+        """Convert texts to padded sequences with the fitted tokenizer
+        
+        Each distinct text is tokenized once and cached for as long as the
+        tokenizer is unchanged, so repeated texts and repeated calls (val,
+        test, the TFLite representative dataset) cost a dictionary lookup.
+        New texts are converted in batches of ``batch_size``.
+        """
+        if self.tokenizer is None:
+            raise ValueError("Tokenizer not fitted yet")
+        
+        from tensorflow.keras.preprocessing.sequence import pad_sequences
+        
+        if self._sequence_cache_tokenizer is not self.tokenizer:
+            self._sequence_cache = {}
+            self._sequence_cache_tokenizer = self.tokenizer
+        cache = self._sequence_cache
+        
+        texts = normalize_texts(texts)
+        missing = [text for text in dict.fromkeys(texts) if text not in cache]
+        
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            sequences = self.tokenizer.texts_to_sequences(batch)
+            padded = pad_sequences(sequences, maxlen=self.max_length, padding='post', truncating='post')
+            cache.update(zip(batch, padded))
+        
+        if not texts:
+            return np.zeros((0, self.max_length), dtype=np.int32)
+        return np.stack([cache[text] for text in texts])
+    
+    def preprocess_data(self, texts: List[str], labels: List[int], fit: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Preprocess text data for training
+        
+        Pass ``fit=True`` for the training split only; validation and test
+        splits must be transformed with the tokenizer fitted on it.
+        """
+        if fit:
+            self.fit_tokenizer(texts)
+            self._calibration_texts = (texts, labels)
         
-        # Pad sequences
-        X = pad_sequences(sequences, maxlen=self.max_length, padding='post', truncating='post')
+        X = self.transform_texts(texts)
         
         # Convert labels to numpy array
         y = np.array(labels)
@@ -66,14 +215,31 @@ class MedicalChatbotTrainer:
         
         return X, y
     
-    def build_model(self, num_classes: int) -> Sequential:
+    def build_model(self, num_classes: int) -> 'Sequential':
         """Build the neural network model"""
+        import tensorflow as tf
+        from tensorflow.keras.layers import Dense, Dropout, Embedding, GlobalMaxPooling1D, LSTM
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.optimizers import Adam
+        
+        if self.bucketed:
+            # Any sequence length; masked LSTM steps repeat the last real
+            # output, so the max pooling below ignores the padding
+            input_layers = [
+                # float32 like the non-bucketed model's input; the Embedding casts it
+                tf.keras.Input(shape=(None,)),
+                Embedding(input_dim=self.max_words, output_dim=128, mask_zero=True)
+            ]
+        else:
+            input_layers = [Embedding(input_dim=self.max_words, output_dim=128, input_length=self.max_length)]
+        
         model = Sequential([
             # Embedding layer
-            Embedding(input_dim=self.max_words, output_dim=128, input_length=self.max_length),
+            *input_layers,
             
             # LSTM layer for sequence processing
-            LSTM(64, return_sequences=True, dropout=0.3, recurrent_dropout=0.3),
+            LSTM(64, return_sequences=True, dropout=0.3,
+                 **self.training_config.lstm_options(recurrent_dropout=0.3)),
             
             # Global max pooling to get fixed-size representation
             GlobalMaxPooling1D(),
@@ -83,14 +249,16 @@ class MedicalChatbotTrainer:
             Dropout(0.5),
             Dense(64, activation='relu'),
             Dropout(0.3),
-            Dense(num_classes, activation='softmax')
+            # Kept in float32 under mixed precision
+            Dense(num_classes, activation='softmax', dtype='float32')
         ])
         
         # Compile model
         model.compile(
             optimizer=Adam(learning_rate=0.001),
             loss='sparse_categorical_crossentropy',
-            metrics=['accuracy']
+            metrics=['accuracy'],
+            jit_compile=self.training_config.jit_compile
         )
         
         self.model = model
@@ -99,7 +267,16 @@ class MedicalChatbotTrainer:
     def train_model(self, X_train: np.ndarray, y_train: np.ndarray, 
                    X_val: np.ndarray, y_val: np.ndarray, 
                    epochs: int = 50, batch_size: int = 32) -> Dict:
-        """Train the model"""
+        """Train the model
+        
+        ``X_train``/``X_val`` may also be batched tf.data datasets (see
+        load_streaming_data), in which case ``y_train``/``y_val`` are None.
+        """
+        import tensorflow as tf
+        from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+        
+        from fast_training import EpochTimer
+        
         # Callbacks for training
         callbacks = [
             EarlyStopping(
@@ -116,31 +293,65 @@ class MedicalChatbotTrainer:
                 verbose=1
             )
         ]
+        self.epoch_timer = EpochTimer()
+        callbacks.append(self.epoch_timer)
+        self._calibration_data = (X_train, y_train)
+        
+        if self.bucketed:
+            if isinstance(X_train, tf.data.Dataset):
+                raise ValueError("Bucketed batching needs in-memory arrays; streaming batches are already padded")
+            X_train, X_val = bucketed_datasets(X_train, y_train, X_val, y_val, batch_size, self.num_buckets)
         
         # Train the model
         print("Training the model...")
-        self.history = self.model.fit(
-            X_train, y_train,
-            validation_data=(X_val, y_val),
-            epochs=epochs,
-            batch_size=batch_size,
-            callbacks=callbacks,
-            verbose=1
-        )
+        if isinstance(X_train, tf.data.Dataset):
+            self.history = self.model.fit(
+                X_train,
+                validation_data=X_val,
+                epochs=epochs,
+                callbacks=callbacks,
+                verbose=1
+            )
+        else:
+            self.history = self.model.fit(
+                X_train, y_train,
+                validation_data=(X_val, y_val),
+                epochs=epochs,
+                batch_size=batch_size,
+                callbacks=callbacks,
+                verbose=1
+            )
+        
+        record_epoch_times('train_medical_chatbot_model', self.training_config, self.epoch_timer)
         
         return self.history.history
     
-    def evaluate_model(self, X_test: np.ndarray, y_test: np.ndarray) -> Dict:
-        """Evaluate the trained model"""
+    def evaluate_model(self, X_test: np.ndarray, y_test: np.ndarray = None) -> Dict:
+        """Evaluate the trained model (``X_test`` may be a batched tf.data dataset)"""
         if self.model is None:
             raise ValueError("Model not trained yet")
         
-        # Make predictions
-        y_pred_probs = self.model.predict(X_test)
-        y_pred = np.argmax(y_pred_probs, axis=1)
+        import tensorflow as tf
+        from sklearn.metrics import classification_report, confusion_matrix
+        
+        if isinstance(X_test, tf.data.Dataset):
+            # Predict batch by batch so the test inputs are never materialized
+            y_true = []
+            y_pred_batches = []
+            for X_batch, y_batch in X_test:
+                y_pred_batches.append(self.model.predict_on_batch(X_batch))
+                y_true.append(y_batch.numpy())
+            y_pred_probs = np.concatenate(y_pred_batches)
+            test_loss, test_accuracy = self.model.evaluate(X_test, verbose=0)
+            y_test = np.concatenate(y_true)
+        else:
+            # Make predictions
+            y_pred_probs = self.model.predict(X_test)
+            
+            # Calculate metrics
+            test_loss, test_accuracy = self.model.evaluate(X_test, y_test, verbose=0)
         
-        # Calculate metrics
-        test_loss, test_accuracy = self.model.evaluate(X_test, y_test, verbose=0)
+        y_pred = np.argmax(y_pred_probs, axis=1)
         
         # Generate classification report
         class_names = list(self.categories.keys())
@@ -167,6 +378,12 @@ class MedicalChatbotTrainer:
             'probabilities': y_pred_probs
         }
     
+    def inference_model(self) -> 'tf.keras.Model':
+        """The trained model with a fixed input length, as saved and converted"""
+        if not self.bucketed:
+            return self.model
+        return fixed_length_model(self.model, self.max_length)
+    
     def save_model_and_tokenizer(self, model_path: str = 'medical_chatbot_model.h5',
                                 tokenizer_path: str = 'tokenizer.json',
                                 labels_path: str = 'labels.json'):
@@ -175,7 +392,7 @@ class MedicalChatbotTrainer:
             raise ValueError("Model not trained yet")
         
         # Save model
-        self.model.save(model_path)
+        self.inference_model().save(model_path)
         print(f"Model saved to {model_path}")
         
         # Save tokenizer
@@ -193,33 +410,101 @@ class MedicalChatbotTrainer:
             json.dump(labels_data, f, indent=2)
         print(f"Labels saved to {labels_path}")
     
-    def convert_to_tflite(self, tflite_path: str = 'medical_chatbot_model.tflite'):
+    def load_model_and_tokenizer(self, model_path: str = 'medical_chatbot_model.h5',
+                                 tokenizer_path: str = 'tokenizer.json',
+                                 labels_path: str = 'labels.json'):
+        """Load what save_model_and_tokenizer wrote, e.g. to convert without retraining"""
+        import tensorflow as tf
+        from tensorflow.keras.preprocessing.text import tokenizer_from_json
+        
+        self.model = tf.keras.models.load_model(model_path)
+        with open(tokenizer_path, 'r', encoding='utf-8') as f:
+            self.tokenizer = tokenizer_from_json(f.read())
+        with open(labels_path, 'r', encoding='utf-8') as f:
+            labels_data = json.load(f)
+        self.categories = labels_data['categories']
+        self.reverse_categories = labels_data['reverse_categories']
+        
+        # Calibration texts must be padded to the length the model was saved with
+        self.max_length = self.model.inputs[0].shape[1]
+        
+        # A model trained with bfloat16 mixed precision still needs its float32 export copy
+        if any(layer.compute_dtype == 'bfloat16' for layer in self.model.layers):
+            self.training_config = TrainingConfig(fast=True, mixed_precision='bf16')
+        
+        print(f"Loaded model from {model_path}")
+    
+    def save_training_results(self, evaluation_results: Dict, path: str = TRAINING_RESULTS_FILE):
+        """Save the training history and confusion matrix so `plot` can redraw them"""
+        results = {
+            'categories': self.categories,
+            'history': {name: [float(value) for value in values] for name, values in self.history.history.items()},
+            'test_accuracy': float(evaluation_results['test_accuracy']),
+            'confusion_matrix': np.asarray(evaluation_results['confusion_matrix']).tolist()
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"Training results saved to {path}")
+    
+    def load_training_results(self, path: str = TRAINING_RESULTS_FILE) -> Dict:
+        """Load save_training_results output (history and confusion matrix)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            results = json.load(f)
+        self.categories = results['categories']
+        results['confusion_matrix'] = np.array(results['confusion_matrix'])
+        return results
+    
+    def build_calibration_set(self, size: int = DEFAULT_CALIBRATION_SIZE,
+                              cache: DatasetCache = None, dtype=np.float32) -> CalibrationSet:
+        """Stratified calibration samples from the training split, as ``dtype``
+        
+        Texts are tokenized once (and cached on disk when ``cache`` is
+        given); pre-tokenized or streamed training data is sampled directly.
+        """
+        if self._calibration_texts is not None:
+            texts, labels = self._calibration_texts
+            return CalibrationSet.from_texts(
+                texts, labels, self.transform_texts, size, cache=cache,
+                tokenizer_state={
+                    'word_index': self.tokenizer.word_index,
+                    'num_words': self.tokenizer.num_words,
+                    'max_length': self.max_length
+                },
+                dtype=dtype
+            )
+        
+        if self._calibration_data is None:
+            raise ValueError("Model not trained yet")
+        
+        import tensorflow as tf
+        
+        X_train, y_train = self._calibration_data
+        if isinstance(X_train, tf.data.Dataset):
+            return CalibrationSet.from_dataset(X_train, size, dtype=dtype)
+        return CalibrationSet.from_arrays(X_train, y_train, size, dtype=dtype)
+    
+    def convert_to_tflite(self, tflite_path: str = 'medical_chatbot_model.tflite',
+                          calibration_size: int = DEFAULT_CALIBRATION_SIZE, cache: DatasetCache = None):
         """Convert trained model to TensorFlow Lite format"""
         if self.model is None:
             raise ValueError("Model not trained yet")
         
-        # Create a representative dataset for quantization
-        # This is needed for full integer quantization
-        def representative_dataset():
-            # Load some sample data for quantization
-            with open('medical_chatbot_training_data.json', 'r') as f:
-                data = json.load(f)
-            
-            texts = [item['text'] for item in data['training_data'][:100]]
-            sequences = self.tokenizer.texts_to_sequences(texts)
-            X = pad_sequences(sequences, maxlen=self.max_length, padding='post')
-            
-            for i in range(len(X)):
-                yield [X[i:i+1].astype(np.float32)]
+        import tensorflow as tf
+        
+        export_model = float32_model(self.inference_model(), self.training_config)
+        
+        # Representative dataset for full integer quantization, built once
+        calibration = self.build_calibration_set(calibration_size, cache, dtype=model_input_dtype(export_model))
+        print(f"Calibrating with {len(calibration)} stratified training samples")
         
         # Convert to TFLite
-        converter = tf.lite.TFLiteConverter.from_keras_model(self.model)
+        converter = tf.lite.TFLiteConverter.from_keras_model(export_model)
         
         # Optimize for mobile
         converter.optimizations = [tf.lite.Optimize.DEFAULT]
         
         # Set representative dataset for quantization
-        converter.representative_dataset = representative_dataset
+        converter.representative_dataset = calibration.representative_dataset
         converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
         converter.inference_input_type = tf.uint8
         converter.inference_output_type = tf.uint8
@@ -236,12 +521,14 @@ class MedicalChatbotTrainer:
         
         return tflite_path
     
-    def plot_training_history(self, save_path: str = 'training_history.png'):
-        """Plot training history"""
-        if self.history is None:
-            raise ValueError("Model not trained yet")
+    def plot_training_history(self, save_path: str = 'training_history.png', history: Dict = None):
+        """Plot training history (of this run, or ``history`` loaded from a previous one)"""
+        if history is None:
+            if self.history is None:
+                raise ValueError("Model not trained yet")
+            history = self.history.history
         
-        history = self.history.history
+        import matplotlib.pyplot as plt
         
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 4))
         
@@ -268,6 +555,9 @@ class MedicalChatbotTrainer:
     
     def plot_confusion_matrix(self, cm: np.ndarray, save_path: str = 'confusion_matrix.png'):
         """Plot confusion matrix"""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        
         class_names = list(self.categories.keys())
         
         plt.figure(figsize=(12, 10))
@@ -283,37 +573,71 @@ class MedicalChatbotTrainer:
         plt.show()
         print(f"Confusion matrix saved to {save_path}")
 
-def main():
-    """Main training function"""
-    # Initialize trainer
-    trainer = MedicalChatbotTrainer(max_words=5000, max_length=50)
-    
-    # Load data
-    texts, labels = trainer.load_data()
+def split_train_val_test(X, y) -> Tuple:
+    """Split samples positionally into 64% train, 16% validation and 20% test
     
+    Works on lists and arrays alike; slicing a memory-mapped array returns
+    views, so no data is copied.
+    """
     # Split data (80% train, 20% test)
-    split_point = int(0.8 * len(texts))
-    X_train_texts = texts[:split_point]
-    y_train = labels[:split_point]
-    X_test_texts = texts[split_point:]
-    y_test = labels[split_point:]
+    split_point = int(0.8 * len(X))
+    X_train_all = X[:split_point]
+    y_train_all = y[:split_point]
+    X_test = X[split_point:]
+    y_test = y[split_point:]
     
     # Further split training data for validation (80% train, 20% validation)
-    val_split = int(0.8 * len(X_train_texts))
-    X_train = X_train_texts[:val_split]
-    X_val = X_train_texts[val_split:]
-    y_train_final = y_train[:val_split]
-    y_val = y_train[val_split:]
+    val_split = int(0.8 * len(X_train_all))
+    X_train = X_train_all[:val_split]
+    X_val = X_train_all[val_split:]
+    y_train = y_train_all[:val_split]
+    y_val = y_train_all[val_split:]
     
     print(f"Training samples: {len(X_train)}")
     print(f"Validation samples: {len(X_val)}")
-    print(f"Test samples: {len(X_test_texts)}")
+    print(f"Test samples: {len(X_test)}")
+    
+    return X_train, y_train, X_val, y_val, X_test, y_test
+
+def resolve_max_length(npy_dataset: str = None, shard_dir: str = None, data_file: str = DEFAULT_DATA_FILE) -> int:
+    """Padded length to train with
+    
+    A pre-tokenized dataset fixes the length it was written at. Otherwise
+    the length is chosen from the token lengths of the chatbot texts that
+    will be trained on (the TSV shards or ``data_file``). training_info.json
+    is not used, because its analysis covers the classifier's dataset.
+    """
+    if npy_dataset:
+        return load_shard_manifest(npy_dataset)['max_length']
+    
+    if shard_dir:
+        texts = (sample['text'] for sample in iter_tsv_samples(list_tsv_shards(shard_dir)))
+    else:
+        with open(data_file, 'r', encoding='utf-8') as f:
+            texts = [item['text'] for item in json.load(f)['training_data']]
     
-    # Preprocess data
-    X_train_processed, y_train_processed = trainer.preprocess_data(X_train, y_train_final)
+    analysis = analyze_sequence_lengths(texts, baseline_max_length=DEFAULT_MAX_LENGTH)
+    print(format_analysis(analysis))
+    return analysis['max_sequence_length']
+
+def load_and_preprocess(trainer: MedicalChatbotTrainer) -> Tuple[np.ndarray, ...]:
+    """Load the JSON dataset and split it into preprocessed train/val/test arrays"""
+    # Load data
+    texts, labels = trainer.load_data()
+    
+    X_train, y_train_final, X_val, y_val, X_test_texts, y_test = split_train_val_test(texts, labels)
+    
+    # Fit the tokenizer on the training split only, then reuse it for validation and test
+    X_train_processed, y_train_processed = trainer.preprocess_data(X_train, y_train_final, fit=True)
     X_val_processed, y_val_processed = trainer.preprocess_data(X_val, y_val)
     X_test_processed, y_test_processed = trainer.preprocess_data(X_test_texts, y_test)
     
+    return (X_train_processed, y_train_processed, X_val_processed, y_val_processed,
+            X_test_processed, y_test_processed)
+
+def train_and_evaluate(trainer: MedicalChatbotTrainer, X_train, y_train, X_val, y_val,
+                       X_test, y_test) -> Dict:
+    """Build, train and evaluate the model on arrays or tf.data datasets"""
     # Build model
     num_classes = len(trainer.categories)
     print(f"Building model for {num_classes} classes...")
@@ -322,19 +646,40 @@ def main():
     
     # Train model
     history = trainer.train_model(
-        X_train_processed, y_train_processed,
-        X_val_processed, y_val_processed,
+        X_train, y_train,
+        X_val, y_val,
         epochs=50, batch_size=16
     )
     
     # Evaluate model
-    evaluation_results = trainer.evaluate_model(X_test_processed, y_test_processed)
+    return trainer.evaluate_model(X_test, y_test)
+
+def train_command(args):
+    """Train, evaluate, save, convert and plot"""
+    # Initialize trainer (configure_training must run before the model is built)
+    if args.bucketed and args.streaming:
+        raise ValueError("--bucketed needs in-memory data; streaming batches are already padded")
+    
+    trainer = MedicalChatbotTrainer(max_words=5000, max_length=resolve_max_length(args.npy_dataset, args.streaming),
+                                    training_config=configure_training(args.fast, args.mixed_precision),
+                                    bucketed=args.bucketed, num_buckets=args.num_buckets)
+    print(f"Padding sequences to {trainer.max_length} tokens")
+    
+    if args.streaming:
+        train_dataset, val_dataset, test_dataset = trainer.load_streaming_data(args.streaming, batch_size=16)
+        evaluation_results = train_and_evaluate(trainer, train_dataset, None, val_dataset, None, test_dataset, None)
+    elif args.npy_dataset:
+        X, y = trainer.load_npy_data(args.npy_dataset)
+        evaluation_results = train_and_evaluate(trainer, *split_train_val_test(X, y))
+    else:
+        evaluation_results = train_and_evaluate(trainer, *load_and_preprocess(trainer))
     
     # Save model and tokenizer
     trainer.save_model_and_tokenizer()
+    trainer.save_training_results(evaluation_results)
     
     # Convert to TensorFlow Lite
-    trainer.convert_to_tflite()
+    trainer.convert_to_tflite(calibration_size=args.calibration_size, cache=cache_from_args(args))
     
     # Plot training history
     trainer.plot_training_history()
@@ -348,8 +693,61 @@ def main():
     print("- medical_chatbot_model.tflite (TensorFlow Lite model)")
     print("- tokenizer.json (Text tokenizer)")
     print("- labels.json (Category labels)")
+    print(f"- {TRAINING_RESULTS_FILE} (History and confusion matrix for `plot`)")
     print("- training_history.png (Training plots)")
     print("- confusion_matrix.png (Confusion matrix)")
 
+def convert_command(args):
+    """Re-run the int8 TFLite conversion of the saved model"""
+    # The length comes from the saved model's input once it is loaded
+    trainer = MedicalChatbotTrainer(max_words=5000)
+    trainer.load_model_and_tokenizer()
+    
+    # Calibrate on the same training split the model was trained on
+    texts, labels = trainer.load_data()
+    X_train, y_train = split_train_val_test(texts, labels)[:2]
+    trainer._calibration_texts = (X_train, y_train)
+    
+    trainer.convert_to_tflite(calibration_size=args.calibration_size, cache=cache_from_args(args))
+
+def plot_command(args):
+    """Redraw the plots of the last training run without loading TensorFlow"""
+    trainer = MedicalChatbotTrainer()
+    results = trainer.load_training_results(args.results)
+    trainer.plot_training_history(history=results['history'])
+    trainer.plot_confusion_matrix(results['confusion_matrix'])
+
+def main():
+    """Main training function"""
+    parser = argparse.ArgumentParser(description="Train the medical chatbot classifier")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    train_parser = subparsers.add_parser('train', help="Train, evaluate and convert (default)")
+    input_group = train_parser.add_mutually_exclusive_group()
+    input_group.add_argument('--streaming', metavar='SHARD_DIR',
+                             help=f"Stream TSV shards from SHARD_DIR instead of loading {DEFAULT_DATA_FILE}")
+    input_group.add_argument('--npy-dataset', metavar='DIR',
+                             help="Memory-map pre-tokenized data written by prepare_data.py --npy-dataset")
+    add_fast_training_arguments(train_parser, recurrent_dropout=True)
+    add_bucketing_arguments(train_parser)
+    
+    convert_parser = subparsers.add_parser('convert', help="Convert the saved model to int8 TFLite again")
+    
+    for subparser in (train_parser, convert_parser):
+        subparser.add_argument('--calibration-size', type=int, default=DEFAULT_CALIBRATION_SIZE,
+                               help="Training samples used for int8 calibration")
+        add_cache_arguments(subparser)
+    
+    plot_parser = subparsers.add_parser('plot', help="Redraw the plots of the last training run")
+    plot_parser.add_argument('--results', default=TRAINING_RESULTS_FILE, help="Saved training results")
+    
+    # Without a subcommand the script trains, as it always has
+    argv = sys.argv[1:]
+    if not argv or argv[0] not in COMMANDS + ('-h', '--help'):
+        argv = ['train'] + argv
+    args = parser.parse_args(argv)
+    
+    {'train': train_command, 'convert': convert_command, 'plot': plot_command}[args.command](args)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
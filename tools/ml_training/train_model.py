@@ -4,11 +4,12 @@ TensorFlow Lite Model Training Script for VitalAid
 Trains a medical chatbot model using the prepared data
 """
 
+import argparse
 import json
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Dense, Dropout, LSTM
+from tensorflow.keras.layers import Dense, Dropout, Embedding, GlobalAveragePooling1D, LSTM, Masking
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 import os
@@ -16,55 +17,34 @@ import re
 import random
 from datetime import datetime
 
+from bucketed_batching import DEFAULT_NUM_BUCKETS, add_bucketing_arguments, bucketed_datasets, fixed_length_model
+from fast_training import (EpochTimer, TrainingConfig, add_fast_training_arguments, configure_training,
+                           float32_model, record_epoch_times)
+from conversation_tokenizer import MAX_SEQUENCE_LENGTH, load_data, tokenize_texts
+from sequence_length import TRAINING_INFO_PATH, load_max_sequence_length
+from tflite_conversion import add_conversion_arguments, conversion_report, convert_keras_model
+
 # Configuration
 VOCAB_SIZE = 1000
-MAX_SEQUENCE_LENGTH = 50
 EMBEDDING_DIM = 128
 HIDDEN_UNITS = 256
 BATCH_SIZE = 32
 EPOCHS = 50
 DROPOUT_RATE = 0.3
+VALIDATION_SPLIT = 0.2
 
-def load_data():
-    """Load the prepared training data"""
-    print("Loading prepared data...")
-    
-    with open('data/conversations.json', 'r', encoding='utf-8') as f:
-        conversations = json.load(f)
-    
-    with open('data/vocabulary.json', 'r', encoding='utf-8') as f:
-        vocabulary = json.load(f)
-    
-    print(f"Loaded {len(conversations)} conversations")
-    print(f"Vocabulary size: {len(vocabulary)}")
-    
-    return conversations, vocabulary
+# Response model (--mode response): embedding + pooled classifier over the
+# known responses, small enough for single-query on-device inference
+RESPONSE_EMBEDDING_DIM = 64
+RESPONSE_HIDDEN_UNITS = 64
+RESPONSE_MODEL_PATH = '../assets/models/medical_response_model.tflite'
+RESPONSES_PATH = '../assets/models/responses.json'
 
-def tokenize_text(text, vocabulary, max_length=MAX_SEQUENCE_LENGTH):
-    """Convert text to sequence of token IDs"""
-    tokens = text.lower().split()
-    token_ids = []
-    
-    # Add START token
-    token_ids.append(vocabulary.get('<START>', 2))
-    
-    for token in tokens:
-        token_id = vocabulary.get(token, vocabulary.get('<UNK>', 1))
-        token_ids.append(token_id)
-    
-    # Add END token
-    token_ids.append(vocabulary.get('<END>', 3))
-    
-    # Pad or truncate to max_length
-    if len(token_ids) > max_length:
-        token_ids = token_ids[:max_length]
-    else:
-        token_ids.extend([vocabulary.get('<PAD>', 0)] * (max_length - len(token_ids)))
+def create_training_pairs(conversations, num_samples=1000, real_fraction=0.5):
+    """Create (input, response) text pairs from real and synthetic conversations
     
-    return np.array(token_ids)
-
-def create_synthetic_training_data(conversations, vocabulary, num_samples=1000):
-    """Create synthetic training data for the medical chatbot"""
+    The first ``real_fraction`` of the real conversations is used.
+    """
     print(f"Creating {num_samples} synthetic training samples...")
     
     # Common medical emergency patterns
@@ -91,17 +71,15 @@ def create_synthetic_training_data(conversations, vocabulary, num_samples=1000):
         ("severe allergic reaction", "Use epinephrine auto-injector if available. Call emergency services immediately. Monitor breathing and pulse."),
     ]
     
-    # Create synthetic input-output pairs
-    X = []
-    y = []
+    # Collect input-output text pairs, tokenized in one batch at the end
+    input_texts = []
+    output_texts = []
     
     # Add real conversation data if available
-    for conv in conversations[:len(conversations)//2]:  # Use first half of real data
+    for conv in conversations[:int(len(conversations) * real_fraction)]:
         if 'user_input' in conv and 'bot_response' in conv:
-            input_tokens = tokenize_text(conv['user_input'], vocabulary)
-            output_tokens = tokenize_text(conv['bot_response'], vocabulary)
-            X.append(input_tokens)
-            y.append(output_tokens)
+            input_texts.append(conv['user_input'])
+            output_texts.append(conv['bot_response'])
     
     # Generate synthetic medical emergency conversations
     for i in range(num_samples):
@@ -123,61 +101,122 @@ def create_synthetic_training_data(conversations, vocabulary, num_samples=1000):
         input_text = random.choice(variations)
         output_text = answer
         
-        # Tokenize
-        input_tokens = tokenize_text(input_text, vocabulary)
-        output_tokens = tokenize_text(output_text, vocabulary)
-        
-        X.append(input_tokens)
-        y.append(output_tokens)
+        input_texts.append(input_text)
+        output_texts.append(output_text)
         
         # Add some variations with slight modifications
         if random.random() < 0.3:  # 30% chance for variation
             input_text = input_text.replace("what should", "what do I").replace("how to", "how do I")
-            input_tokens = tokenize_text(input_text, vocabulary)
-            output_tokens = tokenize_text(output_text, vocabulary)
             
-            X.append(input_tokens)
-            y.append(output_tokens)
+            input_texts.append(input_text)
+            output_texts.append(output_text)
     
-    X = np.array(X)
-    y = np.array(y)
+    return input_texts, output_texts
+
+def create_synthetic_training_data(conversations, vocabulary, num_samples=1000, max_length=MAX_SEQUENCE_LENGTH):
+    """Create synthetic training data for the medical chatbot"""
+    input_texts, output_texts = create_training_pairs(conversations, num_samples)
+    
+    X = tokenize_texts(input_texts, vocabulary, max_length)
+    y = tokenize_texts(output_texts, vocabulary, max_length)
     
     print(f"Created training data: X shape {X.shape}, y shape {y.shape}")
     return X, y
 
-def create_model():
-    """Create the neural network model"""
+def create_response_training_data(conversations, vocabulary, num_samples=1000, max_length=MAX_SEQUENCE_LENGTH):
+    """Create (token IDs, response index) training data for the response model
+    
+    Every real conversation is used, so each known response can be
+    retrieved. Token IDs outside the model's VOCAB_SIZE become <UNK>.
+    """
+    input_texts, output_texts = create_training_pairs(conversations, num_samples, real_fraction=1.0)
+    
+    responses = list(dict.fromkeys(output_texts))
+    response_index = {response: idx for idx, response in enumerate(responses)}
+    
+    X = tokenize_texts(input_texts, vocabulary, max_length)
+    X[X >= VOCAB_SIZE] = vocabulary.get('<UNK>', 1)
+    y = np.fromiter((response_index[text] for text in output_texts), dtype=np.int32, count=len(output_texts))
+    
+    print(f"Created response training data: X shape {X.shape}, {len(responses)} responses")
+    return X, y, responses
+
+def create_model(training_config=None, bucketed=False, max_length=MAX_SEQUENCE_LENGTH):
+    """Create the neural network model
+    
+    A ``bucketed`` model takes any sequence length and masks the padding.
+    """
     print("Creating neural network model...")
     
-    model = Sequential([
-        LSTM(HIDDEN_UNITS, input_shape=(MAX_SEQUENCE_LENGTH, 1), return_sequences=True),
+    training_config = training_config or TrainingConfig()
+    lstm_options = training_config.lstm_options()
+    
+    if bucketed:
+        input_layers = [
+            Masking(mask_value=0.0, input_shape=(None, 1)),
+            LSTM(HIDDEN_UNITS, return_sequences=True, **lstm_options)
+        ]
+    else:
+        input_layers = [
+            LSTM(HIDDEN_UNITS, input_shape=(max_length, 1), return_sequences=True, **lstm_options)
+        ]
+    
+    model = Sequential(input_layers + [
         Dropout(DROPOUT_RATE),
-        LSTM(HIDDEN_UNITS//2, return_sequences=False),
+        LSTM(HIDDEN_UNITS//2, return_sequences=False, **lstm_options),
         Dropout(DROPOUT_RATE),
         Dense(256, activation='relu'),
         Dropout(DROPOUT_RATE),
         Dense(128, activation='relu'),
-        Dense(VOCAB_SIZE, activation='softmax')
+        # Keep the softmax in float32 under mixed precision
+        Dense(VOCAB_SIZE, activation='softmax', dtype='float32')
     ])
     
     model.compile(
         optimizer=Adam(learning_rate=0.001),
         loss='sparse_categorical_crossentropy',
-        metrics=['accuracy']
+        metrics=['accuracy'],
+        jit_compile=training_config.jit_compile
     )
     
     print("Model created successfully")
     model.summary()
     return model
 
-def train_model(model, X, y):
-    """Train the model"""
-    print("Starting model training...")
+def create_response_model(num_responses, training_config=None, bucketed=False, max_length=MAX_SEQUENCE_LENGTH):
+    """Create the response model: token embeddings, average pooling and a softmax over responses
     
-    # Reshape data for LSTM (add channel dimension)
-    X = X.reshape(X.shape[0], X.shape[1], 1)
+    Uses only TFLite builtin ops and is a small fraction of the size of the
+    sequence model. A ``bucketed`` model takes any sequence length.
+    """
+    print("Creating response model...")
+    
+    training_config = training_config or TrainingConfig()
+    
+    model = Sequential([
+        # int32 token IDs in, so the TFLite model takes the tokenizer output directly
+        tf.keras.Input(shape=(None if bucketed else max_length,), dtype='int32'),
+        Embedding(input_dim=VOCAB_SIZE, output_dim=RESPONSE_EMBEDDING_DIM, mask_zero=True),
+        GlobalAveragePooling1D(),
+        Dense(RESPONSE_HIDDEN_UNITS, activation='relu'),
+        Dropout(DROPOUT_RATE),
+        # Keep the softmax in float32 under mixed precision
+        Dense(num_responses, activation='softmax', dtype='float32')
+    ])
+    
+    model.compile(
+        optimizer=Adam(learning_rate=0.005),
+        loss='sparse_categorical_crossentropy',
+        metrics=['accuracy'],
+        jit_compile=training_config.jit_compile
+    )
     
-    # Callbacks
+    print("Model created successfully")
+    model.summary()
+    return model
+
+def create_callbacks(epoch_timer=None):
+    """Create the training callbacks shared by both model modes"""
     early_stopping = EarlyStopping(
         monitor='val_loss',
         patience=10,
@@ -191,33 +230,74 @@ def train_model(model, X, y):
         min_lr=1e-6
     )
     
+    callbacks = [early_stopping, reduce_lr]
+    if epoch_timer is not None:
+        callbacks.append(epoch_timer)
+    return callbacks
+
+def train_model(model, X, y, epoch_timer=None, reshape=True, bucketed=False, num_buckets=DEFAULT_NUM_BUCKETS):
+    """Train the model
+    
+    The sequence model takes one float channel per timestep, so X is
+    reshaped for it; the response model takes token IDs (``reshape=False``).
+    ``bucketed`` batches samples of similar length together (the model
+    must be built with ``bucketed=True``).
+    """
+    print("Starting model training...")
+    
+    if reshape:
+        # Reshape data for LSTM (add channel dimension)
+        X = X.reshape(X.shape[0], X.shape[1], 1)
+    
+    if bucketed:
+        # Same split as validation_split: the last 20% of the samples
+        split_at = int(len(X) * (1 - VALIDATION_SPLIT))
+        train_dataset, val_dataset = bucketed_datasets(X[:split_at], y[:split_at], X[split_at:], y[split_at:],
+                                                       BATCH_SIZE, num_buckets)
+        return model.fit(
+            train_dataset,
+            epochs=EPOCHS,
+            validation_data=val_dataset,
+            callbacks=create_callbacks(epoch_timer),
+            verbose=1
+        )
+    
     # Train model
     history = model.fit(
         X, y,
         batch_size=BATCH_SIZE,
         epochs=EPOCHS,
-        validation_split=0.2,
-        callbacks=[early_stopping, reduce_lr],
+        validation_split=VALIDATION_SPLIT,
+        callbacks=create_callbacks(epoch_timer),
         verbose=1
     )
     
     return history
 
-def convert_to_tflite(model, output_path):
+def convert_to_tflite(model, output_path, builtin_only=False):
     """Convert Keras model to TensorFlow Lite"""
     print("Converting model to TensorFlow Lite...")
     
-    # Convert to TFLite
+    # Convert to TFLite (builtin_only: no Flex delegate needed in the app)
+    tflite_model = convert_keras_model(model, builtin_only=builtin_only)
+    
+    # Save model
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    
+    print(f"TFLite model saved to {output_path}")
+    return len(tflite_model)
+
+def convert_response_model_to_tflite(model, output_path):
+    """Convert the response model to TFLite with builtin ops only and dynamic range quantization"""
+    print("Converting response model to TensorFlow Lite...")
+    
     converter = tf.lite.TFLiteConverter.from_keras_model(model)
-    converter.target_spec.supported_ops = [
-        tf.lite.OpsSet.TFLITE_BUILTINS,
-        tf.lite.OpsSet.SELECT_TF_OPS
-    ]
-    converter._experimental_lower_tensor_list_ops = False
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
     
     tflite_model = converter.convert()
     
-    # Save model
     with open(output_path, 'wb') as f:
         f.write(tflite_model)
     
@@ -238,44 +318,108 @@ def ensure_directories_exist():
 
 def main():
     """Main training pipeline"""
+    parser = argparse.ArgumentParser(description="Train the VitalAid chatbot model")
+    parser.add_argument('--mode', choices=['sequence', 'response'], default='sequence',
+                        help="sequence: LSTM over raw token IDs (original model); "
+                             "response: embedding model choosing one of the known responses")
+    parser.add_argument('--max-sequence-length', type=int,
+                        help="Padded sequence length (default: the length prepare_data.py recorded in "
+                             f"{TRAINING_INFO_PATH}, else {MAX_SEQUENCE_LENGTH})")
+    add_fast_training_arguments(parser)
+    add_bucketing_arguments(parser)
+    add_conversion_arguments(parser)
+    args = parser.parse_args()
+    
+    max_sequence_length = args.max_sequence_length or load_max_sequence_length() or MAX_SEQUENCE_LENGTH
+    
     print("=== VitalAid TensorFlow Lite Model Training ===")
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Configuration: VOCAB_SIZE={VOCAB_SIZE}, MAX_SEQUENCE_LENGTH={MAX_SEQUENCE_LENGTH}")
+    print(f"Configuration: VOCAB_SIZE={VOCAB_SIZE}, MAX_SEQUENCE_LENGTH={max_sequence_length}")
     print()
     
     # Ensure required directories exist
     ensure_directories_exist()
     
+    # Must run before any model is built (sets the global dtype policy)
+    training_config = configure_training(args.fast, args.mixed_precision)
+    epoch_timer = EpochTimer()
+    
     # Load data
     conversations, vocabulary = load_data()
     
-    # Create training data
-    X, y = create_synthetic_training_data(conversations, vocabulary, num_samples=1000)
-    
-    # Create and train model
-    model = create_model()
-    history = train_model(model, X, y)
-    
-    # Convert to TFLite
-    output_path = '../assets/models/medical_chatbot.tflite'
-    model_size = convert_to_tflite(model, output_path)
-    
-    # Save training info
-    training_info = {
-        'model_info': {
+    if args.mode == 'response':
+        # Create training data
+        X, y, responses = create_response_training_data(conversations, vocabulary, num_samples=1000,
+                                                        max_length=max_sequence_length)
+        
+        # Create and train model
+        model = create_response_model(len(responses), training_config, args.bucketed, max_sequence_length)
+        history = train_model(model, X, y, epoch_timer, reshape=False, bucketed=args.bucketed,
+                              num_buckets=args.num_buckets)
+        epoch_timing = record_epoch_times('train_model.response', training_config, epoch_timer)
+        
+        # Convert to TFLite; the app maps the predicted index through responses.json
+        output_path = RESPONSE_MODEL_PATH
+        export_model = float32_model(model, training_config)
+        if args.bucketed:
+            # The inference tooling pads to the model's input length, so export it fixed
+            export_model = fixed_length_model(export_model, max_sequence_length)
+        model_size = convert_response_model_to_tflite(export_model, output_path)
+        with open(RESPONSES_PATH, 'w', encoding='utf-8') as f:
+            json.dump(responses, f, indent=2, ensure_ascii=False)
+        print(f"Responses saved to {RESPONSES_PATH}")
+        
+        model_info = {
+            'mode': 'response',
             'vocab_size': VOCAB_SIZE,
-            'max_sequence_length': MAX_SEQUENCE_LENGTH,
+            'max_sequence_length': max_sequence_length,
+            'embedding_dim': RESPONSE_EMBEDDING_DIM,
+            'hidden_units': RESPONSE_HIDDEN_UNITS,
+            'dropout_rate': DROPOUT_RATE,
+            'num_responses': len(responses)
+        }
+    else:
+        # Create training data
+        X, y = create_synthetic_training_data(conversations, vocabulary, num_samples=1000,
+                                              max_length=max_sequence_length)
+        
+        # Create and train model
+        model = create_model(training_config, args.bucketed, max_sequence_length)
+        history = train_model(model, X, y, epoch_timer, bucketed=args.bucketed, num_buckets=args.num_buckets)
+        epoch_timing = record_epoch_times('train_model', training_config, epoch_timer)
+        
+        # Convert to TFLite
+        output_path = '../assets/models/medical_chatbot.tflite'
+        export_model = float32_model(model, training_config)
+        if args.bucketed:
+            export_model = fixed_length_model(export_model, max_sequence_length)
+        model_size = convert_to_tflite(export_model, output_path, builtin_only=args.builtin_ops)
+        if args.conversion_report:
+            conversion_report(export_model, 'medical_chatbot')
+        
+        model_info = {
+            'mode': 'sequence',
+            'vocab_size': VOCAB_SIZE,
+            'max_sequence_length': max_sequence_length,
             'embedding_dim': EMBEDDING_DIM,
             'hidden_units': HIDDEN_UNITS,
             'dropout_rate': DROPOUT_RATE
-        },
+        }
+    
+    # Save training info
+    training_info = {
+        'model_info': model_info,
         'training_info': {
             'total_samples': len(X),
             'batch_size': BATCH_SIZE,
             'epochs_trained': len(history.history['loss']),
             'final_train_loss': float(history.history['loss'][-1]),
             'final_val_loss': float(history.history['val_loss'][-1]),
-            'model_size_bytes': model_size
+            'model_size_bytes': model_size,
+            'tflite_builtin_ops_only': args.builtin_ops,
+            'bucketed_batching': args.bucketed,
+            'training_configuration': training_config.describe(),
+            'epoch_timing': epoch_timing
         },
         'training_timestamp': datetime.now().isoformat()
     }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Incremental Vocabulary Builder for VitalAid
+Counts tokens in chunks (optionally across processes) and updates vocabularies in place
+"""
+
+import argparse
+import json
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from dataset_shards import iter_tsv_samples, list_tsv_shards
+from text_normalization import tokenize
+
+SPECIAL_TOKENS = {
+    "<PAD>": 0,
+    "<UNK>": 1,
+    "<START>": 2,
+    "<END>": 3
+}
+
+def split_tokens(text: str) -> List[str]:
+    """Split on whitespace only, for texts that are already normalized"""
+    return text.split()
+
+def counts_path_for(vocab_path: str) -> str:
+    """Path of the word counts stored next to a vocabulary file"""
+    root, ext = os.path.splitext(vocab_path)
+    return f"{root}_counts{ext}"
+
+def _count_chunk(texts: List[str], tokenize: Callable[[str], List[str]]) -> Counter:
+    """Count the tokens of one chunk of texts"""
+    counts = Counter()
+    for text in texts:
+        counts.update(tokenize(text))
+    return counts
+
+def _chunks(texts: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    """Split an iterable of texts into lists of at most chunk_size texts"""
+    iterator = iter(texts)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+class StreamingVocabularyBuilder:
+    def __init__(self, tokenize: Callable[[str], List[str]] = tokenize, min_count: int = 1,
+                 max_size: Optional[int] = None, base_vocabulary: Optional[Dict[str, int]] = None,
+                 base_counts: Optional[Dict[str, int]] = None):
+        self.tokenize = tokenize
+        self.min_count = min_count
+        self.max_size = max_size
+        self.base_vocabulary = dict(base_vocabulary or SPECIAL_TOKENS)
+        self.counts = Counter(base_counts or {})
+
+    @classmethod
+    def load(cls, vocab_path: str, **kwargs) -> 'StreamingVocabularyBuilder':
+        """Resume from a saved vocabulary and its word counts
+
+        Existing words keep their IDs, so models trained on the old
+        vocabulary stay valid after an update.
+        """
+        with open(vocab_path, 'r', encoding='utf-8') as f:
+            vocabulary = json.load(f)
+
+        counts = {}
+        counts_path = counts_path_for(vocab_path)
+        if os.path.exists(counts_path):
+            with open(counts_path, 'r', encoding='utf-8') as f:
+                counts = json.load(f)
+        else:
+            print(f"No word counts found at {counts_path}; existing words are kept, "
+                  f"new words are ranked by new data only")
+
+        return cls(base_vocabulary=vocabulary, base_counts=counts, **kwargs)
+
+    def merge(self, counts: Counter):
+        """Merge a partial counter (e.g. from another process)"""
+        self.counts.update(counts)
+
+    def count_texts(self, texts: Iterable[str], chunk_size: int = 10000, workers: int = 1) -> Counter:
+        """Count tokens in ``texts`` chunk by chunk and merge them in
+
+        Only one chunk per worker (plus the merged counts) is held at a time,
+        so ``texts`` can be a generator over an arbitrarily large corpus.
+        Partial counters are merged in chunk order, which keeps the result
+        identical to a serial count.
+        """
+        new_counts = Counter()
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for chunk in _chunks(texts, chunk_size):
+                    pending.append(executor.submit(_count_chunk, chunk, self.tokenize))
+                    if len(pending) >= 2 * workers:
+                        new_counts.update(pending.popleft().result())
+                while pending:
+                    new_counts.update(pending.popleft().result())
+        else:
+            for chunk in _chunks(texts, chunk_size):
+                new_counts.update(_count_chunk(chunk, self.tokenize))
+
+        self.merge(new_counts)
+        return new_counts
+
+    def build(self, by_frequency: bool = True) -> Dict[str, int]:
+        """Build the vocabulary from the base vocabulary and merged counts
+
+        Words already in the base vocabulary keep their IDs. New words with
+        at least ``min_count`` occurrences are appended, most frequent first
+        (or in first-seen order), until ``max_size`` is reached.
+        """
+        vocab = dict(self.base_vocabulary)
+        candidates = self.counts.most_common() if by_frequency else self.counts.items()
+
+        for word, count in candidates:
+            if self.max_size is not None and len(vocab) >= self.max_size:
+                break
+            if count >= self.min_count and word not in vocab:
+                vocab[word] = len(vocab)
+
+        return vocab
+
+    def save(self, vocabulary: Dict[str, int], vocab_path: str):
+        """Save the vocabulary and the word counts needed for later updates"""
+        os.makedirs(os.path.dirname(vocab_path) or '.', exist_ok=True)
+
+        with open(vocab_path, 'w', encoding='utf-8') as f:
+            json.dump(vocabulary, f, indent=2, ensure_ascii=False)
+
+        with open(counts_path_for(vocab_path), 'w', encoding='utf-8') as f:
+            json.dump(dict(self.counts), f, ensure_ascii=False)
+
+def iter_dataset_texts(data_path: str) -> Iterator[str]:
+    """Yield texts from a JSON dataset file or a TSV shard directory"""
+    if os.path.isdir(data_path):
+        for sample in iter_tsv_samples(list_tsv_shards(data_path)):
+            yield sample['text']
+        return
+
+    with open(data_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data['training_data']
+    for item in data:
+        yield item['text']
+
+def main():
+    """Build or update a vocabulary from a dataset"""
+    parser = argparse.ArgumentParser(description="Build or incrementally update a vocabulary")
+    parser.add_argument('data', help="JSON dataset file or TSV shard directory")
+    parser.add_argument('--vocab', default='data/vocabulary.json', help="Vocabulary file to write")
+    parser.add_argument('--update', action='store_true',
+                        help="Add the new data to the existing vocabulary instead of rebuilding it")
+    parser.add_argument('--min-count', type=int, default=2, help="Minimum count for new words")
+    parser.add_argument('--max-size', type=int, default=10000, help="Maximum vocabulary size")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Texts per counting chunk")
+    parser.add_argument('--workers', type=int, default=1, help="Processes used for counting")
+    args = parser.parse_args()
+
+    options = {'min_count': args.min_count, 'max_size': args.max_size}
+    if args.update and os.path.exists(args.vocab):
+        builder = StreamingVocabularyBuilder.load(args.vocab, **options)
+    else:
+        builder = StreamingVocabularyBuilder(**options)
+
+    previous_size = len(builder.base_vocabulary)
+    new_counts = builder.count_texts(iter_dataset_texts(args.data), chunk_size=args.chunk_size,
+                                     workers=args.workers)
+    vocabulary = builder.build()
+    builder.save(vocabulary, args.vocab)
+
+    print(f"Counted {sum(new_counts.values())} tokens ({len(new_counts)} distinct) from {args.data}")
+    print(f"Vocabulary saved to: {args.vocab}")
+    print(f"Vocabulary size: {len(vocabulary)} ({len(vocabulary) - previous_size} new words)")
+
+if __name__ == "__main__":
+    main()